@@ -0,0 +1,64 @@
+"""
+Monte Carlo Portfolio Retirement Simulator engine.
+
+Import this package to run simulations in-process:
+
+    from swr import SimulationConfig, simulate
+
+    results = simulate(SimulationConfig(portfolio=2, withdrawal_rate=0.04))
+    print(results.metrics.prob_depletion)
+
+``SWR_Monte_Carlo.py`` is the command-line wrapper around the same API.
+
+The names below are imported from their modules on first use, so importing
+``swr`` (or the CLI) does not load the whole engine up front.
+"""
+
+from importlib import import_module
+
+__version__ = '3.2'
+
+__all__ = [
+    'PORTFOLIOS',
+    'PreparedPortfolio',
+    'SimulationConfig',
+    'SimulationMetrics',
+    'SWRSolution',
+    'SimulationResults',
+    'build_portfolio',
+    'compute_metrics',
+    'generate_returns',
+    'prepare_portfolio',
+    'run_simulation_with_rebalancing',
+    'simulate',
+    'solve_safe_withdrawal_rate',
+]
+
+# Public name -> defining module, resolved lazily by __getattr__
+_EXPORTS = {
+    'PORTFOLIOS': 'presets',
+    'PreparedPortfolio': 'engine',
+    'SimulationConfig': 'engine',
+    'SimulationMetrics': 'metrics',
+    'SWRSolution': 'solver',
+    'SimulationResults': 'engine',
+    'build_portfolio': 'engine',
+    'compute_metrics': 'metrics',
+    'generate_returns': 'returns',
+    'prepare_portfolio': 'engine',
+    'run_simulation_with_rebalancing': 'engine',
+    'simulate': 'engine',
+    'solve_safe_withdrawal_rate': 'solver',
+}
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
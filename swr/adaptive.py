@@ -0,0 +1,197 @@
+"""
+Adaptive run length: simulate batches of paths until the confidence
+intervals of the depletion probability and chosen ending-value percentiles
+are narrow enough, or a path cap is reached.
+
+Batches are whole seed blocks of the capped run, so a run that stops at
+``n`` paths uses exactly the draws of ``simulate()`` with
+``simulations=n`` and the same seed. Interval half-widths come from the
+batch-means standard errors in ``swr.metrics``: absolute for the depletion
+probability (0.001 = ±0.1 percentage points), relative to the estimate for
+dollar percentiles. A percentile below the lower confidence bound of the
+depletion probability is a depleted path's sub-dollar residue at that
+confidence; it counts as settled however its block estimates scatter.
+"""
+
+from dataclasses import dataclass, replace
+from statistics import NormalDist
+
+import numpy as np
+
+from .engine import (
+    _collect_chunks,
+    _merge_worker_profiles,
+    _silent,
+    _simulate_chunk_task,
+    prepare_portfolio,
+)
+from .metrics import (
+    DEPLETION_THRESHOLD,
+    batch_standard_error,
+    block_statistics,
+    compute_metrics,
+    control_variate_adjust,
+    sorted_percentiles,
+)
+from .profiling import profile_phase
+from .returns import SEED_BLOCK_SIZE
+
+DEFAULT_BATCH_SIZE = 10_000
+DEFAULT_PERCENTILES = (5, 50)
+# Batch-means standard errors need a handful of blocks before they mean anything
+MIN_BLOCKS = 10
+
+
+@dataclass
+class TrackedMetric:
+    """One tracked estimate and its confidence interval when the run stopped."""
+    name: str
+    estimate: float
+    half_width: float
+    target: float
+    is_dollars: bool
+    in_depleted_tail: bool = False
+
+    @property
+    def met(self):
+        return self.in_depleted_tail or bool(self.half_width <= self.target)
+
+    def format(self, value):
+        return f"${value:,.0f}" if self.is_dollars else f"{value:.3%}"
+
+
+@dataclass
+class AdaptiveRun:
+    """How ``simulate_to_precision`` chose its run length."""
+    target_half_width: float
+    confidence: float
+    max_paths: int
+    batch_size: int
+    n_paths: int
+    n_batches: int
+    tracked: list
+
+    @property
+    def converged(self):
+        return all(metric.met for metric in self.tracked)
+
+
+def track_precision(final_values, control_values, prepared, percentiles, target_half_width, z):
+    """``TrackedMetric`` for the depletion probability and each ending-value percentile."""
+    depleted = (final_values < DEPLETION_THRESHOLD).astype(np.float64)
+    if control_values is not None:
+        depleted = control_variate_adjust(depleted, control_values, prepared.exp_nominal_return)
+    depletion = TrackedMetric(
+        name='prob_depletion',
+        estimate=float(np.clip(depleted.mean(), 0, 1)),
+        half_width=z * batch_standard_error(block_statistics(depleted, 'mean')),
+        target=target_half_width,
+        is_dollars=False,
+    )
+    tracked = [depletion]
+    estimates = sorted_percentiles(np.sort(final_values), percentiles) if len(percentiles) else []
+    for percentile, estimate in zip(percentiles, estimates):
+        estimate = float(estimate)
+        tracked.append(TrackedMetric(
+            name=f'p{percentile:g}_end_nominal',
+            estimate=estimate,
+            half_width=z * batch_standard_error(block_statistics(final_values, percentile)),
+            # Depleted percentiles sit at a sub-dollar residue; hold them to a dollar
+            target=target_half_width * max(abs(estimate), DEPLETION_THRESHOLD),
+            is_dollars=True,
+            in_depleted_tail=bool(depletion.estimate - depletion.half_width > percentile / 100),
+        ))
+    return tracked
+
+
+def _batch_chunks(config, start, stop):
+    """Chunks of one batch: ``config.chunk_size``, or the batch split over the workers in whole seed blocks."""
+    chunk_size = config.chunk_size
+    if chunk_size is None:
+        per_worker = -(-(stop - start) // config.workers)
+        chunk_size = -(-per_worker // SEED_BLOCK_SIZE) * SEED_BLOCK_SIZE
+    return [(lo, min(lo + chunk_size, stop)) for lo in range(start, stop, chunk_size)]
+
+
+def simulate_to_precision(config, target_half_width, percentiles=DEFAULT_PERCENTILES,
+                          batch_size=DEFAULT_BATCH_SIZE, confidence=0.95, prepared=None, log=None,
+                          profiler=None):
+    """Simulate batches of ``batch_size`` paths until every tracked interval is narrow enough.
+
+    ``config.simulations`` is the path cap. Tracked are the depletion
+    probability (half-width ``target_half_width``, absolute) and the
+    ending-value ``percentiles`` (half-width ``target_half_width`` times the
+    estimate), at ``confidence``. Returns the ``SimulationResults`` of the
+    paths simulated, with ``config.simulations`` set to that count and the
+    stopping record in ``results.adaptive``.
+    """
+    if config.streaming:
+        raise ValueError("adaptive runs need per-path final values; streaming runs keep none")
+    if batch_size < 1 or batch_size % SEED_BLOCK_SIZE:
+        raise ValueError(f"batch_size must be a positive multiple of {SEED_BLOCK_SIZE:,}")
+    if target_half_width <= 0:
+        raise ValueError("target_half_width must be positive")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    log = log or _silent
+    with profile_phase(profiler, 'setup'):
+        if prepared is None:
+            prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+        entropy = config.seed if config.seed is not None else np.random.SeedSequence().entropy
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    max_paths = config.simulations
+    min_paths = min(MIN_BLOCKS * SEED_BLOCK_SIZE, max_paths)
+
+    log(f"Running batches of {batch_size:,} paths until the {confidence:.0%} interval half-width is "
+        f"within {target_half_width:.3%} (cap {max_paths:,} paths)...")
+    pool = None
+    if config.workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(max_workers=config.workers)
+    chunks, chunk_results = [], []
+    n_paths = n_batches = 0
+    try:
+        while True:
+            stop = min(n_paths + batch_size, max_paths)
+            batch = _batch_chunks(config, n_paths, stop)
+            child = profiler.child() if profiler is not None and pool is not None else profiler
+            tasks = [(config, prepared, entropy, start, chunk_stop, False, child) for start, chunk_stop in batch]
+            if pool is not None:
+                outputs = _merge_worker_profiles(pool.map(_simulate_chunk_task, *zip(*tasks)), profiler)
+            else:
+                outputs = (_simulate_chunk_task(*task)[0] for task in tasks)
+            chunks += batch
+            chunk_results += list(outputs)
+            n_paths, n_batches = stop, n_batches + 1
+
+            final_values = np.concatenate([chunk[0] for chunk in chunk_results])
+            control_values = (np.concatenate([chunk[-1] for chunk in chunk_results])
+                              if config.control_variate else None)
+            with profile_phase(profiler, 'metrics'):
+                tracked = track_precision(final_values, control_values, prepared, percentiles,
+                                          target_half_width, z)
+            widths = ", ".join(f"{metric.name} ±{metric.format(metric.half_width)}" for metric in tracked)
+            log(f"  {n_paths:,} paths: {widths}")
+            if n_paths >= max_paths or (n_paths >= min_paths and all(metric.met for metric in tracked)):
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    results = _collect_chunks(replace(config, simulations=n_paths), prepared, chunks, chunk_results)
+    results.seed = entropy
+    results.profile = profiler
+    log("Calculating performance metrics...")
+    with profile_phase(profiler, 'metrics'):
+        results.metrics = compute_metrics(results)
+    results.adaptive = AdaptiveRun(
+        target_half_width=target_half_width,
+        confidence=confidence,
+        max_paths=max_paths,
+        batch_size=batch_size,
+        n_paths=n_paths,
+        n_batches=n_batches,
+        tracked=tracked,
+    )
+    return results
@@ -0,0 +1,286 @@
+"""
+Batch scenario runner: evaluate a grid of configurations on shared return
+draws, with the rebalancing kernel vectorized across a scenario axis.
+
+A scenario file (JSON, TOML, or YAML with PyYAML installed) holds
+``defaults`` plus an explicit ``scenarios`` list and/or a ``grid`` whose
+cartesian product is added; every entry is a set of ``SimulationConfig``
+fields (decimals, as in the API) and may carry a ``name``::
+
+    [defaults]
+    simulations = 50000
+    seed = 42
+
+    [grid]
+    portfolio = [2, 3]
+    withdrawal_rate = [0.03, 0.035, 0.04]
+    strategy = ["constant", "dynamic"]
+
+Scenarios that differ only in withdrawal rate, dynamic floor/ceiling,
+strategy (and its parameters), engine or starting value share one set of
+draws, generated once per chunk of paths. Within that, scenarios with the
+same engine, strategy and starting value run as one kernel call: consecutive blocks of paths are
+the scenarios and the kernel repeats the returns for each block, so N
+withdrawal rates cost one pass over the returns instead of N. Seeded
+results match ``simulate()`` for each scenario exactly.
+"""
+
+import json
+from dataclasses import asdict, dataclass, fields, replace
+from itertools import product
+from pathlib import Path
+
+import numpy as np
+
+from .engine import (
+    KERNELS,
+    SimulationConfig,
+    _collect_chunks,
+    _silent,
+    iter_chunks,
+    prepare_portfolio,
+)
+from .metrics import calculate_max_drawdown, compute_metrics
+from .strategies import strategy_for
+from .tables import Table
+
+# Fields a single kernel call takes per path, i.e. per scenario block
+VECTORIZED_FIELDS = ('withdrawal_rate', 'floor_pct', 'ceiling_pct')
+# Fields that change the kernel call but not the return draws
+KERNEL_FIELDS = ('strategy', 'engine', 'initial_value', 'guardrail_band', 'guardrail_adjustment',
+                 'vpw_return', 'spending_floor')
+# Fields that never change results
+EXECUTION_FIELDS = ('workers', 'chunk_size', 'control_variate')
+
+
+@dataclass
+class Scenario:
+    """A named configuration from a scenario file."""
+    name: str
+    config: SimulationConfig
+
+
+@dataclass
+class ScenarioRun:
+    """One scenario's ``SimulationResults`` (metrics only unless ``keep_paths``)."""
+    scenario: Scenario
+    results: 'SimulationResults'
+
+
+def read_scenario_file(path):
+    """Parse a ``.json``, ``.toml`` or ``.yaml``/``.yml`` scenario file into a dict."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == '.json':
+        return json.loads(path.read_text())
+    if suffix == '.toml':
+        try:
+            import tomllib
+        except ImportError as exc:  # Python < 3.11
+            raise ImportError("TOML scenario files need Python 3.11+; use JSON instead") from exc
+        return tomllib.loads(path.read_text())
+    if suffix in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError as exc:
+            raise ImportError("YAML scenario files need PyYAML (pip install pyyaml); use JSON or TOML") from exc
+        return yaml.safe_load(path.read_text())
+    raise ValueError(f"Unknown scenario file type {path.suffix!r} (use .json, .toml or .yaml)")
+
+
+def expand_scenarios(spec, base=None):
+    """``Scenario`` list from a parsed scenario file, each over ``base`` then the file's ``defaults``."""
+    base = base or SimulationConfig()
+    known = {field.name for field in fields(SimulationConfig)}
+    defaults = dict(spec.get('defaults') or {})
+    entries = [dict(entry) for entry in spec.get('scenarios') or []]
+    grid = spec.get('grid') or {}
+    if grid:
+        names = list(grid)
+        entries += [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+    if not entries:
+        entries = [{}]
+
+    scenarios = []
+    for entry in entries:
+        name = entry.pop('name', None) or ", ".join(f"{key}={value}" for key, value in entry.items()) or "base"
+        values = {**defaults, **entry}
+        unknown = sorted(set(values) - known)
+        if unknown:
+            raise ValueError(f"Scenario {name!r}: unknown field(s) {', '.join(unknown)}")
+        config = replace(base, **values)
+        if config.streaming:
+            raise ValueError(f"Scenario {name!r}: batch runs keep per-path results; streaming is not supported")
+        scenarios.append(Scenario(name=str(name), config=config))
+    return scenarios
+
+
+def load_scenarios(path, base=None):
+    """``expand_scenarios`` for a scenario file on disk."""
+    return expand_scenarios(read_scenario_file(path), base)
+
+
+def _draws_key(config):
+    """Config fields that determine the return draws (and prepared portfolio)."""
+    excluded = VECTORIZED_FIELDS + KERNEL_FIELDS + EXECUTION_FIELDS
+    return tuple((name, value) for name, value in asdict(config).items() if name not in excluded)
+
+
+def _kernel_key(config):
+    return tuple(getattr(config, name) for name in KERNEL_FIELDS)
+
+
+def _scenario_chunk_task(configs, prepared, entropy, start, stop):
+    """Paths [start, stop) for every config of one draws group.
+
+    Returns one ``_collect_chunks`` chunk tuple per config, in order. Returns
+    are drawn once; each kernel group runs as one call over a scenario axis.
+    """
+    from .returns import chunk_returns
+
+    first = configs[0]
+    n_paths = stop - start
+    multi_asset_returns, annual_sp500_returns = chunk_returns(first, prepared, start, stop, entropy)
+    control_values = None
+    if any(config.control_variate for config in configs):
+        control_values = (multi_asset_returns @ prepared.weights).mean(axis=0, dtype=np.float64)
+
+    groups = {}
+    for index, config in enumerate(configs):
+        groups.setdefault(_kernel_key(config), []).append(index)
+
+    outputs = [None] * len(configs)
+    for indices in groups.values():
+        config = configs[indices[0]]
+        kernel = KERNELS[config.engine]
+        n_total = n_paths * len(indices)
+        per_path = {name: np.repeat([getattr(configs[i], name) for i in indices], n_paths)
+                    for name in VECTORIZED_FIELDS}
+        final_values, withdrawals_history, values_over_time = kernel(
+            n_total, config.years, config.initial_value, per_path['withdrawal_rate'],
+            prepared.weights, multi_asset_returns, strategy=strategy_for(config),
+            floor_pct=per_path['floor_pct'], ceiling_pct=per_path['ceiling_pct'],
+            inflation_rate=config.inflation_rate
+        )
+        final_sp500_values, _, sp500_values_over_time = kernel(
+            n_total, config.years, config.initial_value, per_path['withdrawal_rate'],
+            np.array([1.0]), annual_sp500_returns[:, :, np.newaxis], strategy=strategy_for(config),
+            floor_pct=per_path['floor_pct'], ceiling_pct=per_path['ceiling_pct'],
+            inflation_rate=config.inflation_rate
+        )
+        sp500_max_drawdowns = calculate_max_drawdown(sp500_values_over_time)
+        del sp500_values_over_time
+
+        for block, index in enumerate(indices):
+            paths = slice(block * n_paths, (block + 1) * n_paths)
+            outputs[index] = (
+                final_values[paths], withdrawals_history[:, paths], values_over_time[:, paths],
+                final_sp500_values[paths], sp500_max_drawdowns[paths], None,
+                control_values if configs[index].control_variate else None,
+            )
+    return outputs
+
+
+def run_batch(scenarios, log=None, keep_paths=False):
+    """Run every ``Scenario``; return a ``ScenarioRun`` per scenario, in order.
+
+    Scenarios are grouped by their return draws; each group's chunks (sized
+    and spread over processes by the group's first ``chunk_size`` /
+    ``workers``) draw returns once for all of its scenarios. Unseeded
+    groups draw fresh entropy, shared within the group. Per-path arrays are
+    released once a scenario's metrics are computed unless ``keep_paths``.
+    """
+    log = log or _silent
+    draw_groups = {}
+    for index, scenario in enumerate(scenarios):
+        draw_groups.setdefault(_draws_key(scenario.config), []).append(index)
+
+    runs = [None] * len(scenarios)
+    for group_number, indices in enumerate(draw_groups.values(), start=1):
+        configs = [scenarios[index].config for index in indices]
+        first = configs[0]
+        prepared = prepare_portfolio(first.portfolio, first.additional_fee, first.inflation_rate)
+        entropy = first.seed if first.seed is not None else np.random.SeedSequence().entropy
+        chunks = list(iter_chunks(first.simulations, first.effective_chunk_size))
+        n_kernel_groups = len({_kernel_key(config) for config in configs})
+        log(f"Draw group {group_number}/{len(draw_groups)}: {prepared.name}, {len(configs)} scenarios "
+            f"in {n_kernel_groups} vectorized pass(es) over {first.simulations:,} paths")
+
+        tasks = [(configs, prepared, entropy, start, stop) for start, stop in chunks]
+        if first.workers > 1 and len(chunks) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=min(first.workers, len(chunks))) as pool:
+                chunk_outputs = list(pool.map(_scenario_chunk_task, *zip(*tasks)))
+        else:
+            chunk_outputs = [_scenario_chunk_task(*task) for task in tasks]
+
+        for position, index in enumerate(indices):
+            config = configs[position]
+            results = _collect_chunks(config, prepared, chunks, [outputs[position] for outputs in chunk_outputs])
+            results.seed = entropy
+            results.metrics = compute_metrics(results)
+            if not keep_paths:
+                results = replace(results, final_portfolio_values=None, withdrawals_history=None,
+                                  portfolio_values_over_time=None, final_sp500_values=None,
+                                  sp500_max_drawdowns=None, control_values=None)
+            runs[index] = ScenarioRun(scenario=scenarios[index], results=results)
+        del chunk_outputs
+    return runs
+
+
+def build_batch_table(runs):
+    """One row per scenario: its inputs and numeric headline metrics."""
+    rows = []
+    for run in runs:
+        config, metrics = run.results.config, run.results.metrics
+        rows.append({
+            'scenario': run.scenario.name,
+            'portfolio': config.portfolio,
+            'portfolio_name': run.results.portfolio.name,
+            'strategy': config.strategy,
+            'withdrawal_rate': config.withdrawal_rate,
+            'floor_pct': config.floor_pct,
+            'ceiling_pct': config.ceiling_pct,
+            'years': config.years,
+            'initial_value': config.initial_value,
+            'simulations': metrics.n_paths,
+            'seed': run.results.seed,
+            'prob_depletion': metrics.prob_depletion,
+            'se_prob_depletion': metrics.standard_errors.get('prob_depletion', np.nan),
+            'avg_end_nominal': metrics.avg_end_nominal,
+            'med_end_nominal': metrics.med_end_nominal,
+            'p5_end_nominal': metrics.p5_end_nominal,
+            'p95_end_nominal': metrics.p95_end_nominal,
+            'med_end_real': metrics.med_end_real,
+            'p5_end_real': metrics.p5_end_real,
+            'median_max_drawdown': metrics.median_max_drawdown,
+            'p95_max_drawdown': metrics.p95_max_drawdown,
+            'median_failure_year': metrics.median_failure_year,
+            'sharpe_ratio': metrics.sharpe_ratio,
+            'prob_beat_sp500_nominal': metrics.prob_beat_sp500_nominal,
+            'withdrawal_year1_median': metrics.withdrawals_median[0],
+            'withdrawal_final_median': metrics.withdrawals_median[-1],
+        })
+    return Table.from_rows(rows)
+
+
+def export_batch(runs, output_dir, name, export_format='csv'):
+    """Write the combined table as ``batch_<name>_v3.csv`` or ``.parquet``; return the file names."""
+    table = build_batch_table(runs)
+    output_dir.mkdir(exist_ok=True)
+    file_name = f'batch_{name}_v3.{export_format}'
+    if export_format == 'parquet':
+        from . import __version__
+        from .columnar import write_dataframe_parquet
+
+        metadata = {
+            'swr_version': __version__,
+            'table': 'batch',
+            'scenarios': [{'name': run.scenario.name, 'seed': run.results.seed,
+                           'config': asdict(run.results.config)} for run in runs],
+        }
+        write_dataframe_parquet(table.to_pandas(), metadata, output_dir / file_name)
+    else:
+        table.to_csv(output_dir / file_name)
+    return [file_name]
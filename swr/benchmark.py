@@ -0,0 +1,344 @@
+"""
+Benchmark suite: wall time and peak memory of return generation, the
+rebalancing kernels, metrics and CSV export across a matrix of problem sizes
+and portfolio presets.
+
+    python -m swr.benchmark run --output benchmarks/baseline.json
+    python -m swr.benchmark run --quick --output current.json
+    python -m swr.benchmark compare benchmarks/baseline.json current.json
+    python -m swr.benchmark startup
+
+``run`` writes a JSON file; ``compare`` matches cases by name and size and
+exits with status 1 if any case is slower (or uses more memory) than the
+baseline by more than the threshold. ``startup`` runs the CLI in fresh
+interpreters and exits with status 1 if a command exceeds its wall-time
+budget or imports a module the default path must not need; it wraps the
+same ``check_startup`` that ``tests/test_startup.py`` asserts on.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from . import __version__
+from .engine import KERNELS, SP500_WEIGHTS, SimulationConfig, prepare_portfolio, run_simulation_fused, simulate
+from .metrics import compute_metrics
+from .report import export_csv
+from .returns import generate_chunk_returns
+
+SCHEMA_VERSION = 1
+
+DEFAULT_SIMULATIONS = (10_000, 100_000)
+DEFAULT_YEARS = (30, 50)
+DEFAULT_PORTFOLIOS = (1, 2, 3, 4)
+QUICK_SIMULATIONS = (2_000,)
+QUICK_YEARS = (30,)
+DEFAULT_REPEAT = 3
+
+# A case regresses when it is this much slower / larger than the baseline
+DEFAULT_TIME_THRESHOLD = 0.15
+DEFAULT_MEMORY_THRESHOLD = 0.10
+# Cases faster than this are too noisy to flag on time alone
+MIN_COMPARABLE_SECONDS = 0.005
+
+# CLI commands timed by ``startup``, each with its wall-time budget in seconds
+# (interpreter start to exit, fastest of the repeats)
+STARTUP_COMMANDS = {
+    'list-portfolios': (['--list-portfolios'], 0.4),
+    'small-run': (['--simulations', '1000', '--years', '10', '--seed', '0'], 0.6),
+}
+# Modules the default CLI path must not import
+HEAVY_MODULES = ('pandas', 'scipy', 'pyarrow')
+DEFAULT_STARTUP_REPEAT = 5
+_PACKAGE_PARENT = Path(__file__).resolve().parent.parent
+# Runs the CLI with its outputs redirected to argv[1], then reports the heavy modules loaded
+_STARTUP_SCRIPT = """
+import sys
+from pathlib import Path
+from swr import cli
+cli.OUTPUT_DIR = Path(sys.argv[1])
+status = cli.main(sys.argv[2:])
+print('HEAVY_MODULES=' + ','.join(name for name in {heavy!r} if name in sys.modules))
+sys.exit(status)
+"""
+
+
+def _benchmark_cases(config, output_dir):
+    """Yield (name, setup) pairs; ``setup()`` returns the zero-argument callable to time.
+
+    Inputs a case needs (pre-drawn returns, simulated paths) are built in
+    ``setup`` so they are excluded from the timing.
+    """
+    prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+    n, years, seed = config.simulations, config.years, config.seed
+
+    for fat_tails in (False, True):
+        name = 'rng/fat_tails' if fat_tails else 'rng/normal'
+        yield name, lambda fat_tails=fat_tails: (
+            lambda: generate_chunk_returns(prepared, years, n, 0, n, seed, fat_tails=fat_tails)
+        )
+
+    def kernel_setup(engine, strategy):
+        returns, _ = generate_chunk_returns(prepared, years, n, 0, n, seed)
+        return lambda: KERNELS[engine](
+            n, years, config.initial_value, config.withdrawal_rate, prepared.weights, returns,
+            strategy=strategy, inflation_rate=config.inflation_rate
+        )
+
+    for engine in KERNELS:
+        for strategy in ('constant', 'dynamic'):
+            yield f'kernel/{engine}/{strategy}', lambda e=engine, s=strategy: kernel_setup(e, s)
+
+    def benchmark_pair_setup(engine):
+        """Portfolio plus S&P 500 benchmark, as ``simulate_chunk`` runs them."""
+        returns, sp500_returns = generate_chunk_returns(prepared, years, n, 0, n, seed)
+        if engine == 'fused':
+            return lambda: run_simulation_fused(
+                n, years, config.initial_value, config.withdrawal_rate,
+                [(prepared.weights, returns), (SP500_WEIGHTS, sp500_returns)], inflation_rate=config.inflation_rate
+            )
+        return lambda: [
+            KERNELS[engine](n, years, config.initial_value, config.withdrawal_rate, weights, asset_returns,
+                            inflation_rate=config.inflation_rate)
+            for weights, asset_returns in ((prepared.weights, returns), (SP500_WEIGHTS, sp500_returns[:, :, np.newaxis]))
+        ]
+
+    for engine in KERNELS:
+        yield f'portfolio+sp500/{engine}', lambda e=engine: benchmark_pair_setup(e)
+
+    def metrics_setup():
+        results = simulate(config, prepared=prepared)
+        return lambda: compute_metrics(results)
+
+    def export_setup():
+        results = simulate(config, prepared=prepared)
+        return lambda: export_csv(results, output_dir)
+
+    yield 'metrics', metrics_setup
+    yield 'export/csv', export_setup
+
+
+def _measure(setup, repeat):
+    """Return (per-run seconds, peak traced MB) for the callable built by ``setup``."""
+    func = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times, peak / 2**20
+
+
+def case_key(result):
+    """Identity of a benchmark case across files."""
+    return f"{result['name']}[p{result['portfolio']} n{result['simulations']} y{result['years']}]"
+
+
+def run_benchmarks(simulations=DEFAULT_SIMULATIONS, years=DEFAULT_YEARS, portfolios=DEFAULT_PORTFOLIOS,
+                   repeat=DEFAULT_REPEAT, seed=0, log=None):
+    """Run every case over the size matrix; return the JSON-serialisable report dict."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix='swr-benchmark-') as output_dir:
+        for portfolio in portfolios:
+            for n_years in years:
+                for n_sims in simulations:
+                    config = SimulationConfig(portfolio=portfolio, years=n_years, simulations=n_sims, seed=seed)
+                    for name, setup in _benchmark_cases(config, Path(output_dir)):
+                        times, peak_mb = _measure(setup, repeat)
+                        result = {
+                            'name': name, 'portfolio': portfolio, 'simulations': n_sims, 'years': n_years,
+                            'seconds': min(times), 'times': times, 'peak_mb': peak_mb,
+                        }
+                        results.append(result)
+                        if log:
+                            log(f"{case_key(result):45s} {result['seconds']:9.4f} s {peak_mb:9.1f} MB")
+    return {
+        'schema': SCHEMA_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'swr': __version__,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+        },
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare_benchmarks(baseline, current, time_threshold=DEFAULT_TIME_THRESHOLD,
+                       memory_threshold=DEFAULT_MEMORY_THRESHOLD):
+    """Match cases between two reports; return a list of comparison rows.
+
+    Each row has the case key, both timings and peak memories, their ratios
+    (current / baseline) and ``regression`` set when either ratio exceeds its
+    threshold. Cases present in only one report are skipped.
+    """
+    baseline_cases = {case_key(result): result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        reference = baseline_cases.get(case_key(result))
+        if reference is None:
+            continue
+        time_ratio = result['seconds'] / reference['seconds'] if reference['seconds'] > 0 else 1.0
+        memory_ratio = result['peak_mb'] / reference['peak_mb'] if reference['peak_mb'] > 0 else 1.0
+        slower = (time_ratio > 1 + time_threshold
+                  and max(result['seconds'], reference['seconds']) >= MIN_COMPARABLE_SECONDS)
+        rows.append({
+            'case': case_key(result),
+            'baseline_seconds': reference['seconds'], 'seconds': result['seconds'], 'time_ratio': time_ratio,
+            'baseline_peak_mb': reference['peak_mb'], 'peak_mb': result['peak_mb'], 'memory_ratio': memory_ratio,
+            'regression': slower or memory_ratio > 1 + memory_threshold,
+        })
+    return rows
+
+
+def check_startup(commands=STARTUP_COMMANDS, repeat=DEFAULT_STARTUP_REPEAT, scale=1.0):
+    """Time each CLI command in a fresh interpreter; return one result dict per command.
+
+    ``scale`` multiplies every budget (for slow machines). A result fails
+    when its fastest run exceeds the budget, the command exits non-zero, or
+    it imported any of ``HEAVY_MODULES``.
+    """
+    script = _STARTUP_SCRIPT.format(heavy=HEAVY_MODULES)
+    results = []
+    with tempfile.TemporaryDirectory(prefix='swr-startup-') as output_dir:
+        for name, (argv, budget) in commands.items():
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                # From the directory holding this swr package, which ``-c`` puts first on sys.path
+                process = subprocess.run([sys.executable, '-c', script, output_dir, *argv],
+                                         capture_output=True, text=True, cwd=_PACKAGE_PARENT)
+                times.append(time.perf_counter() - start)
+            lines = process.stdout.strip().splitlines()
+            heavy = lines[-1].partition('=')[2] if lines and lines[-1].startswith('HEAVY_MODULES=') else ''
+            results.append({
+                'name': name,
+                'seconds': min(times),
+                'budget': budget * scale,
+                'returncode': process.returncode,
+                'heavy_modules': [module for module in heavy.split(',') if module],
+                'error': process.stderr.strip().splitlines()[-1] if process.returncode else '',
+            })
+    for result in results:
+        result['passed'] = (result['returncode'] == 0 and not result['heavy_modules']
+                            and result['seconds'] <= result['budget'])
+    return results
+
+
+def _print_startup(results):
+    print(f"{'Command':20s} {'Best s':>8s} {'Budget s':>9s}  Status")
+    for result in results:
+        problems = []
+        if result['returncode']:
+            problems.append(f"exit {result['returncode']}: {result['error']}")
+        if result['heavy_modules']:
+            problems.append(f"imported {', '.join(result['heavy_modules'])}")
+        if result['seconds'] > result['budget']:
+            problems.append("over budget")
+        status = "; ".join(problems) if problems else "OK"
+        print(f"{result['name']:20s} {result['seconds']:8.3f} {result['budget']:9.3f}  {status}")
+
+
+def _print_comparison(rows):
+    print(f"{'Case':45s} {'Base s':>9s} {'Now s':>9s} {'Ratio':>6s} {'Base MB':>9s} {'Now MB':>9s} {'Ratio':>6s}")
+    for row in rows:
+        flag = "  REGRESSION" if row['regression'] else ""
+        print(f"{row['case']:45s} {row['baseline_seconds']:9.4f} {row['seconds']:9.4f} {row['time_ratio']:6.2f} "
+              f"{row['baseline_peak_mb']:9.1f} {row['peak_mb']:9.1f} {row['memory_ratio']:6.2f}{flag}")
+
+
+def _int_list(text):
+    return tuple(int(value) for value in text.split(','))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m swr.benchmark', description='SWR Monte Carlo benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Run the benchmark matrix and write a JSON report')
+    run.add_argument('--output', type=Path, default=Path('benchmark.json'),
+                     help='JSON report path (default: benchmark.json)')
+    run.add_argument('--simulations', type=_int_list, default=None,
+                     help='Comma-separated path counts (default: 10000,100000)')
+    run.add_argument('--years', type=_int_list, default=None,
+                     help='Comma-separated horizons (default: 30,50)')
+    run.add_argument('--portfolios', type=_int_list, default=DEFAULT_PORTFOLIOS,
+                     help='Comma-separated portfolio presets (default: 1,2,3,4)')
+    run.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                     help='Timed runs per case; the fastest is reported (default: 3)')
+    run.add_argument('--quick', action='store_true',
+                     help='Small matrix (2000 paths, 30 years) for a smoke check')
+
+    compare = commands.add_parser('compare', help='Flag regressions of a report against a baseline')
+    compare.add_argument('baseline', type=Path)
+    compare.add_argument('current', type=Path)
+    compare.add_argument('--time-threshold', type=float, default=DEFAULT_TIME_THRESHOLD * 100,
+                         help='Allowed slowdown %% before a case is flagged (default: 15)')
+    compare.add_argument('--memory-threshold', type=float, default=DEFAULT_MEMORY_THRESHOLD * 100,
+                         help='Allowed peak memory growth %% before a case is flagged (default: 10)')
+
+    startup = commands.add_parser('startup', help='Check CLI startup time and imports against their budgets')
+    startup.add_argument('--repeat', type=int, default=DEFAULT_STARTUP_REPEAT,
+                         help='Runs per command; the fastest is checked (default: 5)')
+    startup.add_argument('--budget-scale', type=float, default=1.0,
+                         help='Multiply every budget, e.g. 2 on a slow CI machine (default: 1)')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == 'run':
+        simulations = args.simulations or (QUICK_SIMULATIONS if args.quick else DEFAULT_SIMULATIONS)
+        years = args.years or (QUICK_YEARS if args.quick else DEFAULT_YEARS)
+        report = run_benchmarks(simulations, years, args.portfolios, args.repeat, log=print)
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nBenchmark report written to: {args.output}")
+        return 0
+
+    if args.command == 'startup':
+        results = check_startup(repeat=args.repeat, scale=args.budget_scale)
+        _print_startup(results)
+        failures = [result for result in results if not result['passed']]
+        if failures:
+            print(f"\n{len(failures)} of {len(results)} commands failed their startup budget")
+            return 1
+        print(f"\nAll {len(results)} commands within their startup budget")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text())
+    rows = compare_benchmarks(baseline, current, args.time_threshold / 100, args.memory_threshold / 100)
+    _print_comparison(rows)
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f"\n{len(regressions)} of {len(rows)} cases regressed against {args.baseline}")
+        return 1
+    print(f"\nNo regressions in {len(rows)} cases")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Content-addressed on-disk cache of simulation results.
+
+Entries are keyed by a SHA-256 of the normalized ``SimulationConfig`` (minus
+``workers`` and ``chunk_size``, which never change seeded results), the
+prepared portfolio arrays and the engine version. Each entry is one
+compressed ``.npz`` holding the metrics behind every report and CSV plus the
+per-path final values, so a hit skips simulation entirely. Only seeded runs
+are cached; an unseeded run asks for fresh randomness.
+
+Least recently used entries (by file mtime, refreshed on every hit) are
+evicted once the cache grows past ``max_bytes``.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+from dataclasses import asdict, fields
+from pathlib import Path
+
+import numpy as np
+
+from . import __version__
+from .engine import SimulationResults, prepare_portfolio, simulate
+from .metrics import SimulationMetrics
+
+# Bump when the entry layout or simulation output changes within a release
+CACHE_FORMAT = 3
+DEFAULT_CACHE_MAX_BYTES = 1 << 30
+# Config fields that do not affect seeded results
+_KEY_EXCLUDED_FIELDS = ('workers', 'chunk_size')
+_PATH_ARRAYS = ('final_portfolio_values', 'final_sp500_values', 'sp500_max_drawdowns')
+
+
+def default_cache_dir():
+    """``$XDG_CACHE_HOME/swr``, falling back to ``~/.cache/swr``."""
+    return Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'swr'
+
+
+def cache_key(config, prepared=None):
+    """Hex digest identifying the results of a seeded ``config``."""
+    if prepared is None:
+        prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+    normalized = {name: value for name, value in asdict(config).items() if name not in _KEY_EXCLUDED_FIELDS}
+    portfolio = {
+        'weights': prepared.weights.tolist(),
+        'mean_returns_after_fees': prepared.mean_returns_after_fees.tolist(),
+        'cov_matrix': prepared.cov_matrix.tolist(),
+        'std_devs': prepared.std_devs.tolist(),
+        'sp500_mean_after_fees': prepared.sp500_mean_after_fees,
+    }
+    payload = {'swr': __version__, 'format': CACHE_FORMAT, 'config': normalized, 'portfolio': portfolio}
+    if config.history_file is not None:
+        from .historical import file_digest
+
+        # Key on the file's contents, not just its name
+        payload['history'] = file_digest(config.history_file)
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _pack_metrics(metrics):
+    """Split ``SimulationMetrics`` into JSON scalars and named arrays."""
+    scalars, arrays = {}, {}
+    for field in fields(SimulationMetrics):
+        value = getattr(metrics, field.name)
+        if field.name == 'path_percentiles':
+            for percentile, band in value.items():
+                arrays[f'metrics.path_percentiles.{percentile}'] = band
+        elif field.name == 'goal_probabilities':
+            scalars[field.name] = {str(goal): float(prob) for goal, prob in value.items()}
+        elif isinstance(value, np.ndarray):
+            arrays[f'metrics.{field.name}'] = value
+        else:
+            scalars[field.name] = value.item() if isinstance(value, np.generic) else value
+    return scalars, arrays
+
+
+def _unpack_metrics(scalars, archive):
+    values = dict(scalars)
+    values['goal_probabilities'] = {int(goal): prob for goal, prob in scalars['goal_probabilities'].items()}
+    values['path_percentiles'] = {}
+    for name in archive.files:
+        if name.startswith('metrics.path_percentiles.'):
+            values['path_percentiles'][int(name.rsplit('.', 1)[1])] = archive[name]
+        elif name.startswith('metrics.'):
+            values[name.split('.', 1)[1]] = archive[name]
+    values['path_percentiles'] = dict(sorted(values['path_percentiles'].items()))
+    return SimulationMetrics(**values)
+
+
+class ResultCache:
+    """Directory of ``<key>.npz`` entries with size-bounded LRU eviction."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.directory = Path(directory) if directory is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return self.directory / f'{key}.npz'
+
+    def get(self, config, prepared=None):
+        """Cached ``SimulationResults`` for ``config``, or None on a miss or unseeded config."""
+        if config.seed is None:
+            return None
+        if prepared is None:
+            prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+        key = cache_key(config, prepared)
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                meta = json.loads(str(archive['meta']))
+                if meta['key'] != key:
+                    return None
+                metrics = _unpack_metrics(meta['metrics'], archive)
+                arrays = {name: archive[name] for name in _PATH_ARRAYS if name in archive.files}
+        except (OSError, KeyError, ValueError):
+            return None
+        os.utime(path)  # Mark as recently used
+        return SimulationResults(config=config, portfolio=prepared, seed=meta['seed'], metrics=metrics, **arrays)
+
+    def put(self, results):
+        """Store a seeded run's metrics and final values; return the entry path (None if uncacheable)."""
+        config = results.config
+        if config.seed is None or results.metrics is None:
+            return None
+        key = cache_key(config, results.portfolio)
+        scalars, arrays = _pack_metrics(results.metrics)
+        for name in _PATH_ARRAYS:
+            value = getattr(results, name)
+            if value is not None:
+                arrays[name] = value
+        meta = {'key': key, 'seed': results.seed, 'metrics': scalars}
+        arrays['meta'] = np.array(json.dumps(meta))
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        # Write then rename so readers never see a partial entry
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(buffer.getvalue())
+        os.replace(tmp_name, self._path(key))
+        self.evict()
+        return self._path(key)
+
+    def entries(self):
+        """(path, size, mtime) for every entry, least recently used first."""
+        found = []
+        for path in self.directory.glob('*.npz'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            found.append((path, stat.st_size, stat.st_mtime))
+        return sorted(found, key=lambda entry: entry[2])
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits ``max_bytes``."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            path.unlink(missing_ok=True)
+
+
+def cached_simulate(config, cache, prepared=None, log=None, profiler=None):
+    """``simulate()`` through ``cache``: return a hit if present, else run and store.
+
+    A hit carries the metrics, seed and final values but no per-path
+    history (``portfolio_values_over_time`` etc. are None).
+    """
+    if prepared is None:
+        prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+    if config.seed is None and log:
+        log("Result cache skipped: only seeded runs are cached")
+    results = cache.get(config, prepared)
+    if results is not None:
+        if log:
+            log(f"Loaded cached results ({cache_key(config, prepared)[:12]}); simulation skipped")
+        return results
+    results = simulate(config, prepared=prepared, log=log, profiler=profiler)
+    if cache.put(results) is not None and log:
+        log(f"Stored results in cache {cache.directory}")
+    return results
@@ -0,0 +1,172 @@
+"""
+Checkpoint and resume for long runs: every completed chunk of paths is
+saved to a directory, so a preempted run continues where it stopped.
+
+    checkpoint = Checkpoint('ckpt')                   # new run (clears an older checkpoint)
+    results = simulate(config, checkpoint=checkpoint)
+    # ... after preemption, same config:
+    results = simulate(config, checkpoint=Checkpoint('ckpt', resume=True))
+
+Chunks are the unit of work saved. A chunk's draws come from per-block
+streams spawned from the run's entropy (``swr.returns.block_rng``), so the
+entropy in the manifest is the whole random-number state: a resumed run
+derives exactly the generators the remaining chunks would have used and its
+results are bit-identical to an uninterrupted run, for any worker count.
+
+Each completed chunk's per-path arrays are raw ``.npy`` files, written into
+a temporary directory that is then renamed to ``chunk_<index>``, so a chunk
+on disk is always complete. Streaming runs save the merged
+``PathAccumulator`` instead (``accumulator_<chunks covered>``, the previous
+one removed once the new one is in place). ``checkpoint.json`` identifies
+the run (a ``swr.cache.cache_key`` of the config with its entropy, plus the
+chunk size) and is written before the first chunk.
+"""
+
+import json
+import os
+import shutil
+from dataclasses import asdict, replace
+from pathlib import Path
+
+import numpy as np
+
+from . import __version__
+
+MANIFEST_NAME = 'checkpoint.json'
+# Bump when the directory layout or manifest fields change
+CHECKPOINT_FORMAT = 1
+# Chunk size the CLI uses for checkpointed runs without --chunk-size
+DEFAULT_CHECKPOINT_CHUNK_SIZE = 100_000
+# Entries of a ``_simulate_chunk_task`` result tuple, in order
+CHUNK_ARRAYS = ('final_portfolio_values', 'withdrawals_history', 'portfolio_values_over_time',
+                'final_sp500_values', 'sp500_max_drawdowns', 'sp500_values_over_time', 'control_values')
+
+
+def write_arrays(directory, arrays, meta=None):
+    """Write ``.npy`` files (and ``meta.json``) to a temporary directory, then rename it to ``directory``."""
+    directory = Path(directory)
+    tmp_dir = directory.with_name(f'.{directory.name}.{os.getpid()}.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    for name, array in arrays.items():
+        np.save(tmp_dir / f'{name}.npy', array)
+    if meta is not None:
+        (tmp_dir / 'meta.json').write_text(json.dumps(meta))
+    os.replace(tmp_dir, directory)
+    return directory
+
+
+def read_arrays(directory, names=None):
+    """``(arrays, meta)`` from a ``write_arrays`` directory (``meta`` None without ``meta.json``)."""
+    directory = Path(directory)
+    paths = sorted(directory.glob('*.npy')) if names is None else [directory / f'{name}.npy' for name in names]
+    arrays = {path.stem: np.load(path) for path in paths if path.exists()}
+    meta_path = directory / 'meta.json'
+    meta = json.loads(meta_path.read_text()) if meta_path.exists() else None
+    return arrays, meta
+
+
+class Checkpoint:
+    """A run's checkpoint directory; pass it to ``simulate(..., checkpoint=...)``.
+
+    With ``resume`` the directory must hold a checkpoint (ValueError if
+    not), and ``check`` / ``simulate`` require the same run; otherwise the
+    run starts over and any older checkpoint there is cleared.
+    """
+
+    def __init__(self, directory, resume=False):
+        self.directory = Path(directory)
+        self.resume = resume
+        self.manifest = None
+        if resume:
+            try:
+                self.manifest = json.loads((self.directory / MANIFEST_NAME).read_text())
+            except FileNotFoundError:
+                raise ValueError(f"No checkpoint to resume in {self.directory}") from None
+            if self.manifest.get('format') != CHECKPOINT_FORMAT:
+                raise ValueError(f"Unsupported checkpoint format {self.manifest.get('format')!r} "
+                                 f"(expected {CHECKPOINT_FORMAT})")
+
+    @staticmethod
+    def _identity(config, prepared, entropy):
+        from .cache import cache_key
+
+        return {'key': cache_key(replace(config, seed=entropy), prepared),
+                'chunk_size': config.effective_chunk_size}
+
+    def check(self, config, prepared):
+        """Raise ValueError unless the checkpoint being resumed is a run of ``config``."""
+        if not self.resume:
+            return
+        entropy = self.manifest['entropy']
+        if config.seed is not None and config.seed != entropy:
+            raise ValueError(f"{self.directory} checkpoints a run with seed {entropy}, not {config.seed}")
+        identity = self._identity(config, prepared, entropy)
+        if identity['chunk_size'] != self.manifest['chunk_size']:
+            raise ValueError(f"{self.directory} checkpoints chunks of {self.manifest['chunk_size']:,} paths; "
+                             f"resume with that chunk size")
+        if identity['key'] != self.manifest['key']:
+            raise ValueError(f"{self.directory} checkpoints a different run (configuration, portfolio or "
+                             f"swr version changed)")
+
+    def begin(self, config, prepared):
+        """Entropy of the run: the checkpointed one, or a new run's (written to a fresh manifest)."""
+        if self.resume:
+            self.check(config, prepared)
+            return self.manifest['entropy']
+        entropy = config.seed if config.seed is not None else np.random.SeedSequence().entropy
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / MANIFEST_NAME).unlink(missing_ok=True)
+        for stale in self._entries('chunk_') + self._entries('accumulator_'):
+            shutil.rmtree(stale)
+        self.manifest = {
+            'format': CHECKPOINT_FORMAT,
+            'swr_version': __version__,
+            'entropy': entropy,
+            'n_chunks': config.n_chunks,
+            **self._identity(config, prepared, entropy),
+            'config': asdict(config),
+        }
+        tmp_path = self.directory / f'{MANIFEST_NAME}.tmp'
+        tmp_path.write_text(json.dumps(self.manifest, indent=2))
+        os.replace(tmp_path, self.directory / MANIFEST_NAME)
+        return entropy
+
+    def _entries(self, prefix):
+        return sorted(path for path in self.directory.glob(f'{prefix}*')
+                      if path.is_dir() and path.name[len(prefix):].isdigit())
+
+    def _chunk_dir(self, index):
+        return self.directory / f'chunk_{index:06d}'
+
+    def completed_chunks(self):
+        """Indices of the chunks saved so far."""
+        return [int(path.name[len('chunk_'):]) for path in self._entries('chunk_')]
+
+    def save_chunk(self, index, chunk):
+        """Save a ``_simulate_chunk_task`` result tuple (None entries are skipped)."""
+        write_arrays(self._chunk_dir(index),
+                     {name: array for name, array in zip(CHUNK_ARRAYS, chunk) if array is not None})
+
+    def load_chunk(self, index):
+        """The result tuple saved by ``save_chunk``."""
+        arrays, _ = read_arrays(self._chunk_dir(index), CHUNK_ARRAYS)
+        return tuple(arrays.get(name) for name in CHUNK_ARRAYS)
+
+    def save_accumulator(self, accumulator, n_chunks):
+        """Save a streaming run's ``PathAccumulator`` covering its first ``n_chunks`` chunks."""
+        older = self._entries('accumulator_')
+        arrays, scalars = accumulator.state()
+        write_arrays(self.directory / f'accumulator_{n_chunks:06d}', arrays, scalars)
+        for path in older:
+            shutil.rmtree(path)
+
+    def load_accumulator(self):
+        """``(accumulator, chunks covered)`` of the latest save, or ``(None, 0)``."""
+        from .streaming import PathAccumulator
+
+        saved = self._entries('accumulator_')
+        if not saved:
+            return None, 0
+        arrays, scalars = read_arrays(saved[-1])
+        return PathAccumulator.from_state(arrays, scalars), int(saved[-1].name[len('accumulator_'):])
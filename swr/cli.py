@@ -0,0 +1,569 @@
+"""
+Command-line entry point: argument parsing, console output and CSV export
+around the importable engine.
+"""
+
+import argparse
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+from .engine import SimulationConfig, prepare_portfolio, simulate
+from .presets import PORTFOLIOS
+from .profiling import PhaseProfiler, profile_phase
+from .returns import SEED_BLOCK_SIZE
+from .strategies import STRATEGIES, strategy_for
+from .report import (
+    export_csv,
+    export_swr_csv,
+    portfolio_name_safe,
+    print_batch_report,
+    print_precision_check,
+    print_profile,
+    print_report,
+    print_sensitivity_report,
+    print_swr_report,
+)
+
+# outputs/ lives next to SWR_Monte_Carlo.py
+OUTPUT_DIR = Path(__file__).resolve().parent.parent / "outputs"
+
+USAGE_EXAMPLES = """
+# List all available portfolios
+python SWR_Monte_Carlo.py --list-portfolios
+
+# Run Classic Three-Fund Bogleheads (constant dollar withdrawal)
+python SWR_Monte_Carlo.py --portfolio 2
+
+# Run with Vanguard Dynamic Spending strategy
+python SWR_Monte_Carlo.py --portfolio 2 --withdrawal-strategy dynamic
+
+# Customize dynamic spending bounds (3% floor, 6% ceiling)
+python SWR_Monte_Carlo.py --portfolio 2 --withdrawal-strategy dynamic \\
+  --dynamic-floor 3.0 --dynamic-ceiling 6.0
+
+# Run Golden Butterfly with 4% withdrawal rate
+python SWR_Monte_Carlo.py --portfolio 3 --withdrawal-rate 4.0
+
+# Run with fat-tail mode and 0.25% advisor fee
+python SWR_Monte_Carlo.py --portfolio 4 --fat-tails --advisor-fee 0.25
+
+# 1M paths in memory-bounded blocks of 50,000
+python SWR_Monte_Carlo.py --portfolio 2 --simulations 1000000 --chunk-size 50000
+
+# Reproducible 1M-path run sharded across 8 cores
+python SWR_Monte_Carlo.py --portfolio 2 --simulations 1000000 --workers 8 --seed 42
+
+# Closed-form annual stepping (same results, several times faster)
+python SWR_Monte_Carlo.py --portfolio 2 --engine annual
+
+# Portfolio and S&P 500 in one fused loop, benchmark correlated with the portfolio
+python SWR_Monte_Carlo.py --portfolio 2 --engine fused --benchmark-correlation 0.9
+
+# Resample actual annual returns in multi-year blocks (CSV: year, tickers, SP500)
+python SWR_Monte_Carlo.py --portfolio 2 --return-source block_bootstrap --history-file returns.csv
+
+# 2M paths in float32, checked against float64 on the same seed
+python SWR_Monte_Carlo.py --portfolio 2 --simulations 2000000 --dtype float32 --validate-precision
+
+# Per-phase time/memory breakdown written to outputs/profile_*.json
+python SWR_Monte_Carlo.py --portfolio 2 --profile --profile-years
+
+# Repeat dashboard scenarios from the result cache (seeded runs only)
+python SWR_Monte_Carlo.py --portfolio 2 --withdrawal-rate 4.0 --seed 42 --cache
+
+# Raw per-path annual values and withdrawals as memory-mapped .npy files
+python SWR_Monte_Carlo.py --portfolio 2 --seed 42 --save-paths
+
+# 50M paths that survive preemption: rerun with --resume to continue from the last saved chunk
+python SWR_Monte_Carlo.py --portfolio 2 --simulations 50000000 --streaming --checkpoint-dir ckpt
+python SWR_Monte_Carlo.py --portfolio 2 --simulations 50000000 --streaming --checkpoint-dir ckpt --resume
+
+# 100M paths over 8 machines or containers (shard 1/8 ... 8/8), then merged on one
+python SWR_Monte_Carlo.py --portfolio 2 --simulations 100000000 --seed 42 --shard 1/8
+python SWR_Monte_Carlo.py merge outputs/shard_*.npz
+
+# Typed Parquet tables with run metadata, plus every path in row groups of 50,000
+python SWR_Monte_Carlo.py --portfolio 2 --seed 42 --format parquet --include-paths --chunk-size 50000
+
+# Antithetic draws plus a control variate, with standard errors in the report
+python SWR_Monte_Carlo.py --portfolio 2 --simulations 25000 --sampling antithetic --control-variate
+
+# Stop as soon as depletion and P5/P50 are within ±0.1% (95% CI), at most 1M paths
+python SWR_Monte_Carlo.py --portfolio 2 --target-ci 0.1 --simulations 1000000 --seed 42
+
+# Grid of presets x withdrawal rates x strategies on shared draws, one combined table
+python SWR_Monte_Carlo.py --scenarios grid.toml --simulations 50000 --seed 42
+
+# Highest withdrawal rate with 95% and 90% success (one set of draws)
+python SWR_Monte_Carlo.py --portfolio 2 --solve-swr --target-success 95 90 --seed 42 --engine annual
+
+# How depletion probability moves with each mean, volatility, correlation, inflation and fee
+python SWR_Monte_Carlo.py --portfolio 2 --withdrawal-rate 4.0 --sensitivity --seed 42 --engine annual
+
+# 30-year simulation with $2M starting value
+python SWR_Monte_Carlo.py --portfolio 2 --years 30 --initial 2000000
+
+# Compare constant vs dynamic strategies
+python SWR_Monte_Carlo.py --portfolio 2 --withdrawal-rate 4.0
+python SWR_Monte_Carlo.py --portfolio 2 --withdrawal-rate 4.0 --withdrawal-strategy dynamic
+
+# Guyton-Klinger guardrails (cut or raise spending 10% outside a 20% band)
+python SWR_Monte_Carlo.py --portfolio 2 --withdrawal-rate 4.5 --withdrawal-strategy guardrails
+
+# Variable percentage withdrawal over a 40-year horizon
+python SWR_Monte_Carlo.py --portfolio 2 --years 40 --withdrawal-strategy vpw --vpw-return 3.5
+"""
+
+
+# --- 3. COMMAND LINE ARGUMENT PARSING ---
+def build_parser():
+    parser = argparse.ArgumentParser(description='Monte Carlo Retirement Simulator',
+                                     epilog='Combine --shard files with: SWR_Monte_Carlo.py merge FILE [FILE ...]')
+    parser.add_argument('--portfolio', type=int, choices=[1, 2, 3, 4], default=1,
+                        help='Portfolio preset (1=Dividend-Focused, 2=Three-Fund, 3=Golden Butterfly, 4=Modern Bogleheads)')
+    parser.add_argument('--withdrawal-rate', type=float, default=3.0,
+                        help='Annual withdrawal rate as percentage (default: 3.0 = 3%%)')
+    parser.add_argument('--withdrawal-strategy', type=str, choices=list(STRATEGIES), default='constant',
+                        help='Withdrawal strategy: constant (fixed inflation-adjusted), dynamic (Vanguard Dynamic '
+                             'Spending), guardrails (Guyton-Klinger), vpw (variable percentage withdrawal), rmd '
+                             '(balance / years left) or floor_upside (rate of balance above an inflation-adjusted '
+                             'floor)')
+    parser.add_argument('--dynamic-floor', type=float, default=2.5,
+                        help='Dynamic spending floor percentage below inflation-adjusted spending (default: 2.5%%)')
+    parser.add_argument('--dynamic-ceiling', type=float, default=5.0,
+                        help='Dynamic spending ceiling percentage above inflation-adjusted spending (default: 5.0%%)')
+    parser.add_argument('--guardrail-band', type=float, default=20.0,
+                        help='Guardrails: adjust spending when its rate of the balance is this many percent above '
+                             'or below the initial rate (default: 20%%)')
+    parser.add_argument('--guardrail-adjustment', type=float, default=10.0,
+                        help='Guardrails: percentage cut or raise at a guardrail (default: 10%%)')
+    parser.add_argument('--vpw-return', type=float, default=4.0,
+                        help='VPW: real return percentage the payout annuity assumes (default: 4.0%%)')
+    parser.add_argument('--spending-floor', type=float, default=3.0,
+                        help='Floor and upside: inflation-adjusted floor as a percentage of the initial value '
+                             '(default: 3.0%%)')
+    parser.add_argument('--years', type=int, default=50,
+                        help='Simulation duration in years (default: 50)')
+    parser.add_argument('--initial', type=float, default=1_000_000,
+                        help='Initial portfolio value (default: 1000000)')
+    parser.add_argument('--simulations', type=int, default=100_000,
+                        help='Number of simulation paths (default: 100000)')
+    parser.add_argument('--fat-tails', action='store_true',
+                        help='Enable fat-tail mode (multivariate Student t-distribution)')
+    parser.add_argument('--advisor-fee', type=float, default=0.00,
+                        help='Additional advisor/platform fee %% (default: 0.00, example: 0.25 for 0.25%%)')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Simulate paths in independent blocks of this many paths to bound peak memory '
+                             '(default: all paths in one block)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes to shard path chunks across (default: 1)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Random seed; results are identical for a given seed regardless of '
+                             '--workers and --chunk-size (default: fresh entropy, printed in the report)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Keep no per-path history: fold each year into mergeable quantile sketches '
+                             '(O(paths) memory, percentiles within 0.2%%)')
+    parser.add_argument('--engine', type=str, choices=['monthly', 'annual', 'fused'], default='monthly',
+                        help='Rebalancing kernel: monthly (iterate every month), annual (closed-form year '
+                             'steps, same results to floating-point tolerance, several times faster) or fused '
+                             '(annual steps for the portfolio and S&P 500 in one loop, the benchmark without '
+                             'per-asset work; same results as annual)')
+    parser.add_argument('--dtype', type=str, choices=['float64', 'float32'], default='float64',
+                        help='Floating-point precision for returns, balances and path history; float32 halves '
+                             'memory per path (default: float64)')
+    parser.add_argument('--sampling', type=str, choices=['standard', 'antithetic', 'qmc'], default='standard',
+                        help='Return sampling: standard (independent draws), antithetic (mirrored path pairs) '
+                             'or qmc (scrambled Sobol points through the Cholesky factor) (default: standard)')
+    parser.add_argument('--control-variate', action='store_true',
+                        help='Adjust depletion probability, average ending value and goal probabilities with '
+                             'each path\'s mean portfolio return, whose expectation is known analytically')
+    parser.add_argument('--benchmark-correlation', type=float, default=None, metavar='RHO',
+                        help='Correlate the S&P 500 benchmark\'s return shocks with the portfolio\'s '
+                             '(-1 to 1), so "beats S&P 500" compares paths in the same market '
+                             '(default: independent draws)')
+    parser.add_argument('--return-source', type=str, default='parametric',
+                        choices=['parametric', 'bootstrap', 'block_bootstrap', 'rolling'],
+                        help='Where returns come from: parametric (the preset means, volatilities and '
+                             'correlations), or --history-file resampled by single year (bootstrap), in runs '
+                             'of consecutive years (block_bootstrap) or replayed from every start year '
+                             '(rolling) (default: parametric)')
+    parser.add_argument('--history-file', type=str, default=None, metavar='FILE',
+                        help='CSV (optional year column, one column per ticker plus SP500, decimal returns '
+                             'before fund expenses) or .npy with a .json sidecar of its columns')
+    parser.add_argument('--block-length', type=float, default=5.0, metavar='YEARS',
+                        help='Mean run length for --return-source block_bootstrap (default: 5)')
+    parser.add_argument('--validate-precision', action='store_true',
+                        help='With --dtype float32, rerun in float64 on the same seed and flag headline '
+                             'metrics that differ beyond tolerance (exit status 1 on failure)')
+    parser.add_argument('--cache', action='store_true',
+                        help='Reuse results of identical seeded runs from an on-disk cache '
+                             '(default location: ~/.cache/swr; not with --solve-swr)')
+    parser.add_argument('--cache-dir', type=Path, default=None,
+                        help='Cache directory (implies --cache)')
+    parser.add_argument('--cache-max-mb', type=float, default=1024,
+                        help='Evict least recently used cache entries beyond this size (default: 1024)')
+    parser.add_argument('--save-paths', action='store_true',
+                        help='Write every path\'s annual values, withdrawals and final values to memory-mapped '
+                             '.npy files with a JSON manifest (default location: outputs/raw_paths_*_v3/)')
+    parser.add_argument('--paths-dir', type=Path, default=None,
+                        help='Directory for --save-paths output (implies --save-paths)')
+    parser.add_argument('--checkpoint-dir', type=Path, default=None,
+                        help='Save every completed chunk of paths (default chunk size with this option: '
+                             '100000) and the run\'s seed to this directory, clearing an older checkpoint')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the run checkpointed in --checkpoint-dir, simulating only the chunks '
+                             'not yet saved; results are identical to an uninterrupted run')
+    parser.add_argument('--shard', type=parse_shard, default=None, metavar='I/N',
+                        help='Simulate only shard I of N (1 to N) of the seeded run\'s paths and write its '
+                             'sketches and counts to outputs/shard_*.npz, for the merge command (which takes '
+                             '--format)')
+    parser.add_argument('--format', type=str, choices=['csv', 'parquet'], default='csv',
+                        help='Export format for outputs/: csv (formatted tables) or parquet (typed numeric '
+                             'columns with run metadata; needs pyarrow) (default: csv)')
+    parser.add_argument('--include-paths', action='store_true',
+                        help='With --format parquet, also write every path\'s annual values and withdrawals '
+                             'to paths_raw_*.parquet, one row group per chunk of paths')
+    parser.add_argument('--profile', action='store_true',
+                        help='Record wall time and peak memory per phase (setup, rng, simulations, metrics, '
+                             'report, export) and write profile_*.json next to the CSVs')
+    parser.add_argument('--profile-years', action='store_true',
+                        help='With --profile, also record the time spent on each simulated year')
+    parser.add_argument('--target-ci', type=float, default=None,
+                        help='Simulate batches of paths until the 95%% confidence interval half-width of the '
+                             'depletion probability (percentage points) and --ci-percentiles (%% of the '
+                             'estimate) is within this many percent; --simulations becomes the path cap')
+    parser.add_argument('--ci-percentiles', type=float, nargs='+', default=[5.0, 50.0],
+                        help='Ending-value percentiles tracked by --target-ci (default: 5 50)')
+    parser.add_argument('--batch-size', type=int, default=10_000,
+                        help='Paths per --target-ci batch, a multiple of 1000 (default: 10000)')
+    parser.add_argument('--scenarios', type=Path, default=None,
+                        help='Run every scenario in a JSON/TOML/YAML file (defaults, scenarios list and/or grid '
+                             'of SimulationConfig fields over these CLI options) on shared draws and write one '
+                             'combined batch_*.csv table')
+    parser.add_argument('--solve-swr', action='store_true',
+                        help='Solve for the highest withdrawal rate meeting each --target-success level, '
+                             'reusing one set of random returns for every candidate rate')
+    parser.add_argument('--target-success', type=float, nargs='+', default=[95.0],
+                        help='Success probabilities %% for --solve-swr (default: 95)')
+    parser.add_argument('--sensitivity', action='store_true',
+                        help='Finite-difference sensitivity of the depletion probability to every asset mean and '
+                             'volatility, correlation, inflation and the advisor fee, with all bumped scenarios '
+                             'on one set of draws')
+    parser.add_argument('--list-portfolios', action='store_true',
+                        help='List all available portfolios and exit')
+    return parser
+
+
+def parse_shard(value):
+    """``'I/N'`` (1-based) to a 0-based ``(index, count)``."""
+    try:
+        number, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, e.g. 1/8, not {value!r}") from None
+    if not 1 <= number <= count:
+        raise argparse.ArgumentTypeError(f"shard number must be between 1 and N, not {value!r}")
+    return number - 1, count
+
+
+def build_merge_parser():
+    parser = argparse.ArgumentParser(prog='SWR_Monte_Carlo.py merge',
+                                     description='Combine every --shard file of one run into the standard '
+                                                 'results, withdrawals and paths outputs')
+    parser.add_argument('files', type=Path, nargs='+', metavar='FILE',
+                        help='Shard files (outputs/shard_*.npz), one per shard, in any order')
+    parser.add_argument('--format', type=str, choices=['csv', 'parquet'], default='csv',
+                        help='Export format for outputs/ (default: csv)')
+    return parser
+
+
+def merge_main(argv):
+    """``merge`` command: combine shard files into one run's report and exports."""
+    from .shards import merge_shards, read_shard
+
+    parser = build_merge_parser()
+    args = parser.parse_args(argv)
+    try:
+        results = merge_shards([read_shard(path) for path in args.files], log=print)
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+    print_report(results)
+    if args.format == 'parquet':
+        from .columnar import export_parquet
+
+        files = export_parquet(results, OUTPUT_DIR)
+    else:
+        files = export_csv(results, OUTPUT_DIR)
+    print(f"\nMerged results exported to: {OUTPUT_DIR}/")
+    for name in files:
+        print(f"  - {name}")
+    return 0
+
+
+def config_from_args(args):
+    """Build a ``SimulationConfig`` from parsed CLI arguments (percentages to decimals)."""
+    return SimulationConfig(
+        portfolio=args.portfolio,
+        withdrawal_rate=args.withdrawal_rate / 100,  # Convert from % to decimal
+        strategy=args.withdrawal_strategy,
+        floor_pct=args.dynamic_floor / 100,  # Convert from % to decimal
+        ceiling_pct=args.dynamic_ceiling / 100,  # Convert from % to decimal
+        guardrail_band=args.guardrail_band / 100,
+        guardrail_adjustment=args.guardrail_adjustment / 100,
+        vpw_return=args.vpw_return / 100,
+        spending_floor=args.spending_floor / 100,
+        years=args.years,
+        initial_value=args.initial,
+        simulations=args.simulations,
+        fat_tails=args.fat_tails,
+        additional_fee=args.advisor_fee / 100,  # Convert from % to decimal
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        seed=args.seed,
+        streaming=args.streaming,
+        engine=args.engine,
+        dtype=args.dtype,
+        sampling=args.sampling,
+        control_variate=args.control_variate,
+        benchmark_correlation=args.benchmark_correlation,
+        return_source=args.return_source,
+        history_file=args.history_file,
+        block_length=args.block_length,
+    )
+
+
+def print_portfolio_list():
+    print("\n" + "="*70)
+    print("AVAILABLE PORTFOLIO PRESETS")
+    print("="*70 + "\n")
+    for num, portfolio in PORTFOLIOS.items():
+        print(f"Portfolio {num}: {portfolio['name']}")
+        print(f"Description: {portfolio['description']}")
+        print(f"Assets:")
+        total_er = 0
+        for ticker, params in portfolio['assets'].items():
+            print(f"  {ticker:5s}: {params['weight']:5.1%} | {params['name']}")
+            total_er += params['er'] * params['weight']
+        print(f"Blended Expense Ratio: {total_er:.4%}")
+        print()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ['merge']:
+        return merge_main(argv[1:])
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # List portfolios and exit if requested
+    if args.list_portfolios:
+        print_portfolio_list()
+        return 0
+
+    if args.profile_years and not args.profile:
+        parser.error("--profile-years requires --profile")
+    profiler = PhaseProfiler(sample_years=args.profile_years) if args.profile else None
+    with profile_phase(profiler, 'setup'):
+        try:
+            config = config_from_args(args)
+            if config.return_source != 'parametric':
+                from .historical import check_history
+
+                check_history(config)
+        except ValueError as exc:
+            parser.error(str(exc))
+    if args.validate_precision and config.dtype != 'float32':
+        parser.error("--validate-precision requires --dtype float32")
+    if args.solve_swr and not strategy_for(config).uses_withdrawal_rate:
+        parser.error(f"--solve-swr needs a strategy that uses --withdrawal-rate, not {config.strategy}")
+    if args.solve_swr and (args.cache or args.cache_dir is not None):
+        parser.error("--solve-swr cannot be combined with --cache (solver runs are not cached)")
+    save_paths = args.save_paths or args.paths_dir is not None
+    if save_paths and (args.solve_swr or config.streaming):
+        parser.error("--save-paths cannot be combined with --solve-swr or --streaming")
+    if save_paths and (args.cache or args.cache_dir is not None):
+        parser.error("--save-paths cannot be combined with --cache (cached results keep no path history)")
+    if args.include_paths:
+        if args.format != 'parquet':
+            parser.error("--include-paths requires --format parquet")
+        if args.solve_swr or config.streaming or args.cache or args.cache_dir is not None:
+            parser.error("--include-paths needs per-path history; it cannot be combined with "
+                         "--solve-swr, --streaming or --cache")
+    if args.target_ci is not None:
+        if args.target_ci <= 0:
+            parser.error("--target-ci must be positive")
+        if args.batch_size < 1 or args.batch_size % SEED_BLOCK_SIZE:
+            parser.error(f"--batch-size must be a positive multiple of {SEED_BLOCK_SIZE}")
+        if not all(0 < percentile < 100 for percentile in args.ci_percentiles):
+            parser.error("--ci-percentiles values must be between 0 and 100")
+        if args.solve_swr or config.streaming or save_paths or args.cache or args.cache_dir is not None:
+            parser.error("--target-ci cannot be combined with --solve-swr, --streaming, --save-paths or --cache")
+    if args.sensitivity:
+        if (args.solve_swr or args.target_ci is not None or args.scenarios is not None or save_paths or args.cache
+                or args.cache_dir is not None or args.include_paths or args.validate_precision or config.streaming):
+            parser.error("--sensitivity cannot be combined with --solve-swr, --target-ci, --scenarios, --save-paths, "
+                         "--cache, --include-paths, --validate-precision or --streaming")
+        if config.sampling != 'standard' or config.control_variate or config.return_source != 'parametric':
+            parser.error("--sensitivity needs parametric returns with standard sampling and no control variate")
+    if args.scenarios is not None:
+        if (args.solve_swr or args.target_ci is not None or save_paths or args.cache or args.cache_dir is not None
+                or args.include_paths or args.validate_precision or config.streaming):
+            parser.error("--scenarios cannot be combined with --solve-swr, --target-ci, --save-paths, --cache, "
+                         "--include-paths, --validate-precision or --streaming")
+    checkpoint = None
+    if args.resume and args.checkpoint_dir is None:
+        parser.error("--resume requires --checkpoint-dir")
+    if args.checkpoint_dir is not None:
+        if (args.solve_swr or args.target_ci is not None or args.scenarios is not None or args.sensitivity
+                or save_paths or args.cache or args.cache_dir is not None):
+            parser.error("--checkpoint-dir cannot be combined with --solve-swr, --target-ci, --scenarios, "
+                         "--sensitivity, --save-paths or --cache")
+        from .checkpoint import DEFAULT_CHECKPOINT_CHUNK_SIZE, Checkpoint
+
+        if args.chunk_size is None:
+            config = replace(config, chunk_size=DEFAULT_CHECKPOINT_CHUNK_SIZE)
+        try:
+            checkpoint = Checkpoint(args.checkpoint_dir, resume=args.resume)
+            checkpoint.check(config, prepare_portfolio(config.portfolio, config.additional_fee,
+                                                       config.inflation_rate))
+        except ValueError as exc:
+            parser.error(str(exc))
+    if args.shard is not None:
+        if (args.solve_swr or args.target_ci is not None or args.scenarios is not None or args.sensitivity
+                or save_paths or args.cache or args.cache_dir is not None or args.checkpoint_dir is not None
+                or args.include_paths or args.validate_precision):
+            parser.error("--shard cannot be combined with --solve-swr, --target-ci, --scenarios, --sensitivity, "
+                         "--save-paths, --cache, --checkpoint-dir, --include-paths or --validate-precision")
+        if args.format != 'csv':
+            parser.error("--shard always writes .npz shard files; pass --format to the merge command instead")
+        if config.seed is None:
+            parser.error("--shard requires --seed, so that every shard simulates part of the same run")
+        if config.control_variate:
+            parser.error("--shard keeps only sketches and counts; it cannot be combined with --control-variate")
+        from .shards import shard_paths
+
+        try:
+            shard_paths(config.simulations, *args.shard)
+        except ValueError as exc:
+            parser.error(f"--shard: {exc}")
+    precision_check = None
+    if args.scenarios is not None:
+        from .batch import build_batch_table, export_batch, load_scenarios, run_batch
+
+        try:
+            scenarios = load_scenarios(args.scenarios, base=config)
+        except (OSError, ValueError, TypeError) as exc:
+            parser.error(f"--scenarios: {exc}")
+        with profile_phase(profiler, 'batch'):
+            runs = run_batch(scenarios, log=print)
+        with profile_phase(profiler, 'report'):
+            print_batch_report(build_batch_table(runs))
+        with profile_phase(profiler, 'export'):
+            files = export_batch(runs, OUTPUT_DIR, args.scenarios.stem, args.format)
+        portfolio = runs[0].results.portfolio
+    elif args.sensitivity:
+        from .sensitivity import analyze_sensitivity, export_sensitivity
+
+        with profile_phase(profiler, 'sensitivity'):
+            analysis = analyze_sensitivity(config, log=print)
+        portfolio = analysis.portfolio
+        with profile_phase(profiler, 'report'):
+            print_sensitivity_report(analysis)
+        with profile_phase(profiler, 'export'):
+            files = export_sensitivity(analysis, OUTPUT_DIR, args.format)
+    elif args.shard is not None:
+        from .shards import simulate_shard, write_shard
+
+        index, count = args.shard
+        with profile_phase(profiler, 'shard'):
+            shard = simulate_shard(config, index, count, log=print, profiler=profiler)
+        portfolio = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+        with profile_phase(profiler, 'export'):
+            width = len(str(count))
+            files = [f'shard_{portfolio_name_safe(portfolio.name)}_{index + 1:0{width}d}of{count}_v3.npz']
+            write_shard(shard, OUTPUT_DIR / files[0])
+        print(f"\nShard {index + 1}/{count}: {shard.stop - shard.start:,} of {config.simulations:,} paths; "
+              f"merge all {count} shard files with: SWR_Monte_Carlo.py merge FILE [FILE ...]")
+    elif args.solve_swr:
+        if not all(0 < target < 100 for target in args.target_success):
+            parser.error("--target-success values must be between 0 and 100")
+        from .solver import solve_safe_withdrawal_rate
+
+        targets = [target / 100 for target in args.target_success]  # Convert from % to decimal
+        with profile_phase(profiler, 'solve'):
+            solution = solve_safe_withdrawal_rate(config, targets, log=print)
+        portfolio = solution.portfolio
+        with profile_phase(profiler, 'report'):
+            print_swr_report(solution)
+        with profile_phase(profiler, 'export'):
+            if args.format == 'parquet':
+                from .columnar import export_swr_parquet
+
+                files = export_swr_parquet(solution, OUTPUT_DIR)
+            else:
+                files = export_swr_csv(solution, OUTPUT_DIR)
+    else:
+        if args.cache or args.cache_dir is not None:
+            from .cache import ResultCache, cached_simulate
+
+            cache = ResultCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 2**20))
+            results = cached_simulate(config, cache, log=print, profiler=profiler)
+        elif args.target_ci is not None:
+            from .adaptive import simulate_to_precision
+
+            results = simulate_to_precision(config, args.target_ci / 100,  # Convert from % to decimal
+                                            percentiles=args.ci_percentiles, batch_size=args.batch_size,
+                                            log=print, profiler=profiler)
+        elif save_paths:
+            from .paths import PathStore
+
+            prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+            paths_dir = args.paths_dir or OUTPUT_DIR / f'raw_paths_{portfolio_name_safe(prepared.name)}_v3'
+            path_store = PathStore.create(paths_dir, config)
+            results = simulate(config, prepared=prepared, log=print, profiler=profiler, path_store=path_store)
+            print(f"Per-path arrays memory-mapped in {paths_dir}/")
+        elif checkpoint is not None:
+            results = simulate(config, log=print, profiler=profiler, checkpoint=checkpoint)
+            print(f"Checkpoint in {checkpoint.directory}/")
+        else:
+            results = simulate(config, log=print, profiler=profiler)
+        portfolio = results.portfolio
+        with profile_phase(profiler, 'report'):
+            print_report(results)
+        if args.validate_precision:
+            from .precision import validate_precision
+
+            precision_check = validate_precision(results, log=print)
+            print_precision_check(precision_check)
+        with profile_phase(profiler, 'export'):
+            if args.format == 'parquet':
+                from .columnar import export_parquet
+
+                files = export_parquet(results, OUTPUT_DIR, include_paths=args.include_paths)
+            else:
+                files = export_csv(results, OUTPUT_DIR)
+
+    if profiler is not None:
+        profile_name = f'profile_{portfolio_name_safe(portfolio.name)}_v3.json'
+        profiler.write_json(OUTPUT_DIR / profile_name, argv=argv)
+        print_profile(profiler.to_dict())
+        files.append(profile_name)
+
+    print("\n" + "="*70)
+    print("EXPORT COMPLETE")
+    print("="*70)
+    print(f"\nResults exported to: {OUTPUT_DIR}/")
+    for name in files:
+        print(f"  - {name}")
+
+    print("\n" + "="*70)
+    print("USAGE EXAMPLES")
+    print("="*70)
+    print(USAGE_EXAMPLES)
+
+    print("\n" + "="*70)
+    print("Simulation complete!")
+    print("="*70)
+    if precision_check is not None and not precision_check.passed:
+        return 1
+    return 0
@@ -0,0 +1,197 @@
+"""
+Parquet export: the section 9 tables as typed numeric columns, plus run
+metadata, for loading into a warehouse without re-parsing dollar strings.
+
+Every file carries the run in its schema metadata under the ``swr`` key
+(JSON: engine version, portfolio, seed and the full ``SimulationConfig``).
+With ``include_paths`` every path's annual values and withdrawals are
+written one row per path, in row groups of ``config.effective_chunk_size``
+paths; each column is a contiguous year row of the path arrays, so memory-
+mapped (``--save-paths``) results are read one chunk at a time.
+
+Needs ``pyarrow`` (``pip install pyarrow``), imported on first use.
+"""
+
+import json
+from dataclasses import asdict
+
+import numpy as np
+
+from . import __version__
+from .report import build_paths_table, build_withdrawals_table, portfolio_name_safe
+
+EXPORT_FORMATS = ('csv', 'parquet')
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow)") from exc
+    return pyarrow
+
+
+def run_metadata(config, prepared, seed, table):
+    """JSON-ready description of the run stored with every exported table."""
+    return {
+        'swr_version': __version__,
+        'table': table,
+        'portfolio': {
+            'name': prepared.name,
+            'assets': prepared.asset_names,
+            'weights': prepared.weights.tolist(),
+            'blended_er': prepared.blended_er,
+            'total_fee': prepared.total_fee,
+        },
+        'seed': seed,
+        'strategy': config.strategy,
+        'engine': config.engine,
+        'config': asdict(config),
+    }
+
+
+def _with_metadata(table, metadata):
+    return table.replace_schema_metadata({'swr': json.dumps(metadata)})
+
+
+# Result rows with a standard error -> their SimulationMetrics field
+_STANDARD_ERROR_ROWS = {
+    'avg_end_value': 'avg_end_nominal',
+    'median_end_value': 'med_end_nominal',
+    'p5_end_value': 'p5_end_nominal',
+    'prob_depletion': 'prob_depletion',
+}
+
+
+def build_results_columns(metrics):
+    """Headline metrics as (name, nominal, real, standard error) numbers.
+
+    ``real`` is null where it does not apply, ``standard_error`` where none
+    was estimated.
+    """
+    nan = float('nan')
+    rows = [
+        ('avg_end_value', metrics.avg_end_nominal, metrics.avg_end_real),
+        ('median_end_value', metrics.med_end_nominal, metrics.med_end_real),
+        ('p5_end_value', metrics.p5_end_nominal, metrics.p5_end_real),
+        ('p95_end_value', metrics.p95_end_nominal, metrics.p95_end_real),
+        ('prob_depletion', metrics.prob_depletion, nan),
+        ('median_max_drawdown', metrics.median_max_drawdown, nan),
+        ('p95_max_drawdown', metrics.p95_max_drawdown, nan),
+        ('prob_beat_sp500_nominal', metrics.prob_beat_sp500_nominal, nan),
+        ('prob_beat_sp500_real', metrics.prob_beat_sp500_real, nan),
+        ('median_failure_year', metrics.median_failure_year, nan),
+        ('sharpe_ratio', metrics.sharpe_ratio, nan),
+        ('sortino_ratio', metrics.sortino_ratio, nan),
+        ('sp500_median_end_value', metrics.sp500_median_end_nominal, metrics.sp500_median_end_real),
+        ('sp500_median_max_drawdown', metrics.sp500_median_max_drawdown, nan),
+    ]
+    rows += [(f'prob_goal_{goal}', prob, nan) for goal, prob in metrics.goal_probabilities.items()]
+    names, nominal, real = zip(*rows)
+    standard_errors = [metrics.standard_errors.get(_STANDARD_ERROR_ROWS.get(name), nan) for name in names]
+    return {
+        'metric': list(names),
+        'nominal': np.array(nominal, dtype=np.float64),
+        'real': np.array(real, dtype=np.float64),
+        'standard_error': np.array(standard_errors, dtype=np.float64),
+    }
+
+
+def _write_table(pa, columns, metadata, path):
+    """Write a dict of columns; NaNs become nulls."""
+    arrays = {name: pa.array(values, from_pandas=True) for name, values in columns.items()}
+    pa.parquet.write_table(_with_metadata(pa.table(arrays), metadata), path)
+
+
+def write_dataframe_parquet(frame, metadata, path):
+    """Write a pandas DataFrame with ``metadata`` under the ``swr`` schema key."""
+    pa = _pyarrow()
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    pa.parquet.write_table(_with_metadata(table, metadata), path)
+
+
+def write_path_parquet(results, path, row_group_size=None):
+    """Write one row per path (annual values, withdrawals, final values) in row groups.
+
+    ``row_group_size`` defaults to ``config.effective_chunk_size``.
+    """
+    pa = _pyarrow()
+    config = results.config
+    if results.portfolio_values_over_time is None or results.withdrawals_history is None:
+        raise ValueError("path export needs per-path history (not available for streaming or cached runs)")
+    n_years = config.years
+    row_group_size = row_group_size or config.effective_chunk_size
+    fields = [pa.field('path', pa.int64())]
+    fields += [pa.field(f'value_y{year}', pa.from_numpy_dtype(results.portfolio_values_over_time.dtype))
+               for year in range(n_years + 1)]
+    fields += [pa.field(f'withdrawal_y{year}', pa.from_numpy_dtype(results.withdrawals_history.dtype))
+               for year in range(1, n_years + 1)]
+    fields += [pa.field(name, pa.from_numpy_dtype(getattr(results, name).dtype))
+               for name in ('final_portfolio_values', 'final_sp500_values', 'sp500_max_drawdowns')]
+    metadata = run_metadata(config, results.portfolio, results.seed, 'paths_raw')
+    schema = pa.schema(fields, metadata={'swr': json.dumps(metadata)})
+
+    with pa.parquet.ParquetWriter(path, schema) as writer:
+        for start in range(0, config.simulations, row_group_size):
+            stop = min(start + row_group_size, config.simulations)
+            columns = [pa.array(np.arange(start, stop, dtype=np.int64))]
+            columns += [pa.array(np.asarray(row[start:stop])) for row in results.portfolio_values_over_time]
+            columns += [pa.array(np.asarray(row[start:stop])) for row in results.withdrawals_history]
+            columns += [pa.array(np.asarray(getattr(results, name)[start:stop]))
+                        for name in ('final_portfolio_values', 'final_sp500_values', 'sp500_max_drawdowns')]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+
+
+def export_parquet(results, output_dir, include_paths=False):
+    """Parquet counterpart of ``export_csv``; return the file names.
+
+    Writes ``results_*``, ``withdrawals_*`` and ``paths_*`` (percentile
+    bands) and, with ``include_paths``, ``paths_raw_*`` with every path.
+    """
+    pa = _pyarrow()
+    config, metrics = results.config, results.metrics
+    output_dir.mkdir(exist_ok=True)
+    name_safe = portfolio_name_safe(results.portfolio.name)
+
+    files = [
+        f'results_{name_safe}_v3.parquet',
+        f'withdrawals_{name_safe}_v3.parquet',
+        f'paths_{name_safe}_v3.parquet',
+    ]
+    tables = [
+        ('results', build_results_columns(metrics)),
+        ('withdrawals', dict(build_withdrawals_table(metrics).items())),
+        ('paths', dict(build_paths_table(metrics, config.inflation_rate).items())),
+    ]
+    for name, (table, columns) in zip(files, tables):
+        _write_table(pa, columns, run_metadata(config, results.portfolio, results.seed, table), output_dir / name)
+    if include_paths:
+        files.append(f'paths_raw_{name_safe}_v3.parquet')
+        write_path_parquet(results, output_dir / files[-1])
+    return files
+
+
+def export_swr_parquet(solution, output_dir):
+    """Parquet counterpart of ``export_swr_csv``; return the file names."""
+    pa = _pyarrow()
+    output_dir.mkdir(exist_ok=True)
+    name_safe = portfolio_name_safe(solution.portfolio.name)
+    files = [f'swr_{name_safe}_{solution.config.strategy}_v3.parquet']
+    # Rates no rate in the search interval reaches are written as NaN, flagged by ``feasible``
+    rates = {}
+    for name in ('rate', 'ci_low', 'ci_high'):
+        values = np.array([getattr(swr, name) for swr in solution.rates])
+        rates[name] = np.where(np.isfinite(values), values, np.nan)
+    columns = {
+        'target_success': np.array([swr.target_success for swr in solution.rates]),
+        'max_swr': rates['rate'],
+        'ci_low': rates['ci_low'],
+        'ci_high': rates['ci_high'],
+        'at_search_limit': np.array([swr.at_search_limit for swr in solution.rates]),
+        'feasible': np.array([swr.feasible for swr in solution.rates]),
+        'year1_withdrawal': solution.config.initial_value * rates['rate'],
+    }
+    metadata = run_metadata(solution.config, solution.portfolio, solution.seed, 'swr')
+    _write_table(pa, columns, metadata, output_dir / files[0])
+    return files
@@ -0,0 +1,1027 @@
+"""
+Simulation engine: run configuration, prepared portfolio arrays and the
+rebalancing kernels (the original monthly loop and a closed-form year step).
+
+Nothing here parses arguments, prints or writes files, so a sweep driver can
+import the engine once and call ``simulate()`` thousands of times in the same
+process. Prepared portfolio arrays are cached per (preset, fee, inflation).
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from .presets import (
+    ADDITIONAL_FEE,
+    BLACK_SWAN_MODE,
+    DYNAMIC_CEILING_PCT,
+    DYNAMIC_FLOOR_PCT,
+    INFLATION_RATE,
+    INITIAL_VALUE,
+    N_SIMULATIONS,
+    N_YEARS,
+    PORTFOLIOS,
+    SP500_PROXY,
+    WITHDRAWAL_RATE,
+    arithmetic_to_geometric,
+)
+from .strategies import STRATEGIES, WithdrawalPlan, get_strategy, strategy_for
+
+# Rebalancing kernels: 'monthly' iterates every month, 'annual' steps whole
+# years in closed form (same results to floating-point tolerance), 'fused'
+# takes the annual steps for the portfolio and the S&P 500 benchmark in one
+# loop, the single-asset benchmark without an asset axis or rebalance
+SIMULATION_ENGINES = ('monthly', 'annual', 'fused')
+# Floating-point precision of returns, balances and path history
+SIMULATION_DTYPES = ('float64', 'float32')
+# Return sampling: independent draws or a variance-reduction sampler (see swr.returns)
+SAMPLING_METHODS = ('standard', 'antithetic', 'qmc')
+# Where returns come from: the parametric model, or a table of historical
+# annual returns resampled by year, in blocks, or replayed (see swr.historical)
+RETURN_SOURCES = ('parametric', 'bootstrap', 'block_bootstrap', 'rolling')
+
+
+# --- RUN CONFIGURATION ---
+@dataclass(frozen=True)
+class SimulationConfig:
+    """Inputs for one Monte Carlo run.
+
+    Rates, fees and dynamic bounds are decimals (0.03 = 3%); the CLI takes
+    percentages and converts them.
+    """
+    portfolio: int = 1
+    withdrawal_rate: float = WITHDRAWAL_RATE
+    strategy: str = 'constant'
+    floor_pct: float = DYNAMIC_FLOOR_PCT
+    ceiling_pct: float = DYNAMIC_CEILING_PCT
+    years: int = N_YEARS
+    initial_value: float = INITIAL_VALUE
+    simulations: int = N_SIMULATIONS
+    fat_tails: bool = BLACK_SWAN_MODE
+    additional_fee: float = ADDITIONAL_FEE
+    inflation_rate: float = INFLATION_RATE
+    chunk_size: Optional[int] = None
+    workers: int = 1
+    seed: Optional[int] = None
+    streaming: bool = False
+    engine: str = 'monthly'
+    dtype: str = 'float64'
+    sampling: str = 'standard'
+    control_variate: bool = False
+    benchmark_correlation: Optional[float] = None
+    return_source: str = 'parametric'
+    history_file: Optional[str] = None
+    block_length: float = 5.0
+    guardrail_band: float = 0.20
+    guardrail_adjustment: float = 0.10
+    vpw_return: float = 0.04
+    spending_floor: float = 0.03
+
+    def __post_init__(self):
+        if self.portfolio not in PORTFOLIOS:
+            raise ValueError(f"Unknown portfolio preset {self.portfolio!r} "
+                             f"(choose from {sorted(PORTFOLIOS)})")
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Unknown withdrawal strategy {self.strategy!r} "
+                             f"(choose from {', '.join(STRATEGIES)})")
+        if self.engine not in SIMULATION_ENGINES:
+            raise ValueError(f"Unknown simulation engine {self.engine!r} "
+                             f"(choose from {', '.join(SIMULATION_ENGINES)})")
+        if self.dtype not in SIMULATION_DTYPES:
+            raise ValueError(f"Unknown dtype {self.dtype!r} "
+                             f"(choose from {', '.join(SIMULATION_DTYPES)})")
+        if self.sampling not in SAMPLING_METHODS:
+            raise ValueError(f"Unknown sampling method {self.sampling!r} "
+                             f"(choose from {', '.join(SAMPLING_METHODS)})")
+        if self.benchmark_correlation is not None and not -1 <= self.benchmark_correlation <= 1:
+            raise ValueError("benchmark_correlation must be between -1 and 1 (or None for independent draws)")
+        if self.return_source not in RETURN_SOURCES:
+            raise ValueError(f"Unknown return source {self.return_source!r} "
+                             f"(choose from {', '.join(RETURN_SOURCES)})")
+        if self.return_source == 'parametric':
+            if self.history_file is not None:
+                raise ValueError("history_file needs a historical return_source "
+                                 "(bootstrap, block_bootstrap or rolling)")
+        else:
+            if self.history_file is None:
+                raise ValueError(f"return_source {self.return_source!r} needs a history_file")
+            parametric_only = [name for name, used in (
+                ('fat_tails', self.fat_tails), ('sampling', self.sampling != 'standard'),
+                ('control_variate', self.control_variate),
+                ('benchmark_correlation', self.benchmark_correlation is not None)) if used]
+            if parametric_only:
+                raise ValueError(f"{', '.join(parametric_only)} only apply to parametric returns, "
+                                 f"not return_source {self.return_source!r}")
+        if not 0 < self.guardrail_band < 1 or not 0 < self.guardrail_adjustment < 1:
+            raise ValueError("guardrail_band and guardrail_adjustment must be between 0 and 1")
+        if self.vpw_return <= -1:
+            raise ValueError("vpw_return must be above -100%")
+        if self.spending_floor < 0:
+            raise ValueError("spending_floor must be non-negative")
+        if self.block_length < 1:
+            raise ValueError("block_length must be at least 1 year")
+        if self.control_variate and self.streaming:
+            raise ValueError("control_variate needs per-path results; streaming runs keep none")
+        if self.years < 1:
+            raise ValueError("years must be at least 1")
+        if self.simulations < 1:
+            raise ValueError("simulations must be at least 1")
+        if self.chunk_size is not None and self.chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1 (or None for a single block)")
+        if self.workers < 1:
+            raise ValueError("workers must be at least 1")
+        if self.seed is not None and self.seed < 0:
+            raise ValueError("seed must be a non-negative integer")
+
+    @property
+    def effective_chunk_size(self):
+        """Paths per block: ``chunk_size``, or an even split over the workers.
+
+        With several workers and no explicit chunk size the paths are split
+        into four chunks per worker (whole seed blocks) for load balancing.
+        """
+        if self.chunk_size is not None:
+            return self.chunk_size
+        if self.workers == 1:
+            return self.simulations
+        from .returns import SEED_BLOCK_SIZE
+        per_chunk = -(-self.simulations // (4 * self.workers))
+        return -(-per_chunk // SEED_BLOCK_SIZE) * SEED_BLOCK_SIZE
+
+    @property
+    def n_chunks(self):
+        """Number of path blocks ``simulate()`` runs."""
+        return -(-self.simulations // self.effective_chunk_size)
+
+
+# --- 4. PREPARE ASSETS FOR SIMULATION ---
+@dataclass(frozen=True, eq=False)
+class PreparedPortfolio:
+    """Per-portfolio arrays derived once from a preset and the fee/inflation inputs.
+
+    Instances are shared between runs, so the arrays are read-only.
+    """
+    name: str
+    description: str
+    assets: dict
+    asset_names: list
+    mean_returns: np.ndarray
+    std_devs: np.ndarray
+    weights: np.ndarray
+    expense_ratios: np.ndarray
+    correlation: np.ndarray
+    geometric_returns: np.ndarray
+    mean_returns_after_fees: np.ndarray
+    cov_matrix: np.ndarray
+    cholesky: np.ndarray
+    blended_er: float
+    additional_fee: float
+    total_fee: float
+    inflation_rate: float
+    exp_nominal_return: float
+    exp_real_return: float
+    sp500_mean_after_fees: float
+
+    @property
+    def gross_return(self):
+        """Expected nominal portfolio return before any fees."""
+        return self.exp_nominal_return + self.total_fee
+
+
+def build_portfolio(portfolio, additional_fee=ADDITIONAL_FEE, inflation_rate=INFLATION_RATE):
+    """Derive the simulation arrays for a portfolio definition dict (see presets)."""
+    assets_config = portfolio['assets']
+    asset_names = list(assets_config.keys())
+    mean_returns = np.array([assets_config[a]['arith_mean'] for a in asset_names])
+    std_devs = np.array([assets_config[a]['sd'] for a in asset_names])
+    weights = np.array([assets_config[a]['weight'] for a in asset_names])
+    expense_ratios = np.array([assets_config[a]['er'] for a in asset_names])
+    correlation = np.asarray(portfolio['correlation'], dtype=np.float64)
+
+    # Convert to geometric returns
+    geometric_returns = np.array([arithmetic_to_geometric(assets_config[a]['arith_mean'], assets_config[a]['sd'])
+                                  for a in asset_names])
+
+    # Calculate blended expense ratio
+    blended_er = np.sum(expense_ratios * weights)
+    total_fee = blended_er + additional_fee
+
+    # Adjust returns for fees
+    mean_returns_after_fees = geometric_returns - total_fee
+
+    # Build covariance matrix
+    cov_matrix = np.outer(std_devs, std_devs) * correlation
+    # Lower factor L (L @ L.T = cov_matrix) for correlated shocks, factored once per portfolio
+    cholesky = np.linalg.cholesky(cov_matrix)
+
+    portfolio_exp_nominal_return = np.sum(mean_returns_after_fees * weights)
+    portfolio_exp_real_return = (1 + portfolio_exp_nominal_return) / (1 + inflation_rate) - 1
+
+    sp500_mean_after_fees = SP500_PROXY['mean'] - SP500_PROXY['er'] - additional_fee
+
+    arrays = (mean_returns, std_devs, weights, expense_ratios, correlation,
+              geometric_returns, mean_returns_after_fees, cov_matrix, cholesky)
+    for array in arrays:
+        array.flags.writeable = False
+
+    return PreparedPortfolio(
+        name=portfolio['name'],
+        description=portfolio['description'],
+        assets=assets_config,
+        asset_names=asset_names,
+        mean_returns=mean_returns,
+        std_devs=std_devs,
+        weights=weights,
+        expense_ratios=expense_ratios,
+        correlation=correlation,
+        geometric_returns=geometric_returns,
+        mean_returns_after_fees=mean_returns_after_fees,
+        cov_matrix=cov_matrix,
+        cholesky=cholesky,
+        blended_er=float(blended_er),
+        additional_fee=additional_fee,
+        total_fee=float(total_fee),
+        inflation_rate=inflation_rate,
+        exp_nominal_return=float(portfolio_exp_nominal_return),
+        exp_real_return=float(portfolio_exp_real_return),
+        sp500_mean_after_fees=sp500_mean_after_fees,
+    )
+
+
+@lru_cache(maxsize=None)
+def prepare_portfolio(portfolio=1, additional_fee=ADDITIONAL_FEE, inflation_rate=INFLATION_RATE):
+    """Cached ``build_portfolio`` for a preset number from ``PORTFOLIOS``."""
+    return build_portfolio(PORTFOLIOS[portfolio], additional_fee, inflation_rate)
+
+
+# --- 5. SIMULATION WITH REBALANCING ---
+def run_simulation_with_rebalancing(n_sims, n_years, initial_value, withdrawal_rate,
+                                    weights, multi_asset_returns, strategy='constant',
+                                    floor_pct=DYNAMIC_FLOOR_PCT, ceiling_pct=DYNAMIC_CEILING_PCT,
+                                    inflation_rate=INFLATION_RATE, recorder=None, progress=None):
+    """Monthly simulation with annual rebalancing to target weights.
+
+    Withdrawals follow ``strategy``: a name registered in ``swr.strategies``
+    or a ``WithdrawalStrategy``, asked once a year (January, after returns)
+    for every path's spending. The original two rules:
+
+    CONSTANT DOLLAR (traditional SWR):
+    - Year 1: Withdraw (initial_value * withdrawal_rate) / 12 each month
+    - Year 2+: Withdraw same amount adjusted for inflation
+
+    DYNAMIC SPENDING (Vanguard):
+    - Calculate raw spending: current_portfolio * withdrawal_rate
+    - Calculate floor: last_year_spending * (1 + inflation) * (1 - floor_pct)
+    - Calculate ceiling: last_year_spending * (1 + inflation) * (1 + ceiling_pct)
+    - Use raw if between floor/ceiling, otherwise use bound
+
+    Process each month:
+    1. Apply returns to FULL portfolio balance during month
+    2. Withdraw at END of month (after returns)
+    3. Rebalance annually (December)
+
+    Returns ``(final_values, annual_withdrawals, annual_values)``. Each
+    year-end is handed to ``recorder.record_year(year_index, values,
+    withdrawals)``; the default ``AnnualPathRecorder`` keeps every path's
+    annual history (pass one built over existing arrays, e.g. memory-mapped
+    files, to write the history there). With any other recorder (e.g. a
+    streaming accumulator) no per-path history is kept and the two history
+    arrays are None.
+    ``progress``, if given, is called with the year index after each year.
+
+    Balances and withdrawals take the dtype of ``multi_asset_returns``
+    (float64, or float32 to halve memory traffic).
+
+    ``withdrawal_rate``, ``floor_pct`` and ``ceiling_pct`` may be per-path
+    arrays. ``n_sims`` may be a multiple of the paths in
+    ``multi_asset_returns``: the returns then repeat for each consecutive
+    block of paths (a scenario axis, e.g. one block per withdrawal rate),
+    and each year's growth factors are computed once and shared.
+    """
+    n_assets = len(weights)
+    n_months = n_years * 12
+    dtype = multi_asset_returns.dtype
+    weights = np.asarray(weights, dtype=dtype)
+
+    # Initialize portfolio
+    asset_values = np.zeros((n_sims, n_assets), dtype=dtype)
+    asset_values[:] = initial_value * weights
+
+    # Year-end results go to the recorder; nothing is stored per month
+    if recorder is None:
+        recorder = AnnualPathRecorder(n_years, n_sims, initial_value, dtype)
+
+    # Annual withdrawal rule and its inputs
+    strategy = get_strategy(strategy)
+    plan = WithdrawalPlan(n_sims, n_years, initial_value, withdrawal_rate, floor_pct, ceiling_pct,
+                          inflation_rate, dtype)
+
+    # Track last year's spending for each simulation (for path-dependent rules)
+    last_year_spending = np.full(n_sims, plan.initial_withdrawal, dtype=dtype)
+
+    for month in range(n_months):
+        year_index = month // 12  # Which year are we in (for returns)
+        month_in_year = month % 12  # Which month within the year
+
+        # 1. APPLY RETURNS FIRST (during the month)
+        # Convert annual returns to monthly (geometric), once per year
+        if month_in_year == 0:
+            monthly_return = (1 + multi_asset_returns[year_index]) ** (1/12) - 1
+            monthly_growth = _repeat_paths(1 + monthly_return, n_sims, axis=0)
+        asset_values *= monthly_growth
+
+        # Get portfolio value after returns
+        portfolio_values = asset_values.sum(axis=1)
+
+        # 2. CALCULATE ANNUAL WITHDRAWAL at start of each year (January)
+        if month_in_year == 0:
+            year_withdrawals = np.zeros(n_sims, dtype=dtype)
+            annual_withdrawal_amounts = strategy.annual_withdrawals(
+                plan, year_index, portfolio_values, last_year_spending
+            )
+
+            # Update last year spending for next iteration
+            last_year_spending = annual_withdrawal_amounts
+
+        # 3. WITHDRAW at END of month (after returns)
+        monthly_withdrawal_amount = annual_withdrawal_amounts / 12
+        withdrawals = monthly_withdrawal_amount.copy()
+
+        # Cannot withdraw more than what's available
+        withdrawals = np.minimum(withdrawals, portfolio_values)
+        year_withdrawals += withdrawals
+
+        # Withdraw proportionally from each asset
+        for i in range(n_assets):
+            asset_values[:, i] -= withdrawals * weights[i]
+
+        # Set negative values to 0 (portfolio depleted)
+        asset_values[asset_values < 0] = 0
+
+        # Get portfolio value after withdrawal
+        portfolio_values = asset_values.sum(axis=1)
+
+        # 4. REBALANCE annually (at end of December, month 11, 23, 35, etc.)
+        if month_in_year == 11:
+            non_zero_mask = portfolio_values > 0
+            asset_values[non_zero_mask] = (portfolio_values[non_zero_mask, np.newaxis] * weights)
+
+            # Record end-of-year portfolio value and the year's withdrawals
+            recorder.record_year(year_index, portfolio_values, year_withdrawals)
+            if progress is not None:
+                progress(year_index)
+
+    final_portfolio_values = portfolio_values
+
+    if not isinstance(recorder, AnnualPathRecorder):
+        return final_portfolio_values, None, None
+    return final_portfolio_values, recorder.annual_withdrawals, recorder.annual_values
+
+
+def run_simulation_annual(n_sims, n_years, initial_value, withdrawal_rate,
+                          weights, multi_asset_returns, strategy='constant',
+                          floor_pct=DYNAMIC_FLOOR_PCT, ceiling_pct=DYNAMIC_CEILING_PCT,
+                          inflation_rate=INFLATION_RATE, recorder=None, progress=None):
+    """Year-step equivalent of ``run_simulation_with_rebalancing``.
+
+    Within a year every month applies the same growth factor g = (1 + r)**(1/12)
+    per asset and withdraws the same c = weight * annual_withdrawal / 12, so
+    after m months an asset holds a0 * g**m - c * (g**m - 1) / (g - 1). That
+    is monotone in m, so if it is non-negative after months 1 and 12 no
+    clamp or shortfall occurs and December follows in one step. Paths that
+    would hit zero during the year are stepped month by month exactly as in
+    the monthly loop; depleted paths stay at zero. Same arguments, recorder
+    protocol and return value as the monthly kernel; results agree to
+    floating-point tolerance, including the scenario-axis layout where
+    ``n_sims`` is a multiple of the return paths.
+    """
+    sleeve = _MultiAssetSleeve(weights, multi_asset_returns, n_sims, initial_value)
+    if recorder is None:
+        recorder = AnnualPathRecorder(n_years, n_sims, initial_value, sleeve.dtype)
+
+    strategy = get_strategy(strategy)
+    plan = WithdrawalPlan(n_sims, n_years, initial_value, withdrawal_rate, floor_pct, ceiling_pct,
+                          inflation_rate, sleeve.dtype)
+    last_year_spending = np.full(n_sims, plan.initial_withdrawal, dtype=sleeve.dtype)
+
+    for year_index in range(n_years):
+        # January value after returns sets balance-dependent withdrawals
+        january_values = sleeve.start_year(year_index)
+        annual_withdrawal_amounts = strategy.annual_withdrawals(plan, year_index, january_values, last_year_spending)
+        last_year_spending = annual_withdrawal_amounts
+
+        # Closed form through December (month by month where a path would run out), then rebalance
+        portfolio_values, year_withdrawals = sleeve.finish_year(annual_withdrawal_amounts / 12)
+        recorder.record_year(year_index, portfolio_values, year_withdrawals)
+        if progress is not None:
+            progress(year_index)
+
+    final_portfolio_values = sleeve.portfolio_values
+
+    if not isinstance(recorder, AnnualPathRecorder):
+        return final_portfolio_values, None, None
+    return final_portfolio_values, recorder.annual_withdrawals, recorder.annual_values
+
+
+def run_simulation_fused(n_sims, n_years, initial_value, withdrawal_rate, portfolios, strategy='constant',
+                         floor_pct=DYNAMIC_FLOOR_PCT, ceiling_pct=DYNAMIC_CEILING_PCT,
+                         inflation_rate=INFLATION_RATE, recorders=None, progress=None):
+    """Closed-form year steps for several portfolios in one loop over the years.
+
+    ``portfolios`` is a sequence of ``(weights, returns)``, e.g. the portfolio
+    and the S&P 500 benchmark. Returns are (n_years, paths, n_assets) as for
+    the other kernels; a single-asset portfolio (weights ``[1.0]``) may also
+    pass (n_years, paths). Every portfolio starts at ``initial_value`` and
+    applies the withdrawal rule to its own balances. Multi-asset portfolios
+    step exactly as in ``run_simulation_annual``; single-asset ones keep one
+    balance per path, with no asset axis, per-asset withdrawal or rebalance,
+    and give the annual kernel's results bit for bit.
+
+    ``recorders`` has one recorder (or None for an ``AnnualPathRecorder``)
+    per portfolio. Returns one ``(final_values, annual_withdrawals,
+    annual_values)`` per portfolio, the histories None for other recorders.
+    """
+    sleeves = [_SingleAssetSleeve(returns, n_sims, initial_value) if len(weights) == 1
+               else _MultiAssetSleeve(weights, returns, n_sims, initial_value)
+               for weights, returns in portfolios]
+    recorders = [recorder if recorder is not None else AnnualPathRecorder(n_years, n_sims, initial_value, sleeve.dtype)
+                 for sleeve, recorder in zip(sleeves, recorders or [None] * len(sleeves))]
+
+    strategy = get_strategy(strategy)
+    plans = [WithdrawalPlan(n_sims, n_years, initial_value, withdrawal_rate, floor_pct, ceiling_pct,
+                            inflation_rate, sleeve.dtype) for sleeve in sleeves]
+    last_year_spending = [np.full(n_sims, plan.initial_withdrawal, dtype=plan.dtype) for plan in plans]
+    for year_index in range(n_years):
+        for number, (sleeve, recorder) in enumerate(zip(sleeves, recorders)):
+            january_values = sleeve.start_year(year_index)
+            annual_withdrawal_amounts = strategy.annual_withdrawals(
+                plans[number], year_index, january_values, last_year_spending[number]
+            )
+            last_year_spending[number] = annual_withdrawal_amounts
+            portfolio_values, year_withdrawals = sleeve.finish_year(annual_withdrawal_amounts / 12)
+            recorder.record_year(year_index, portfolio_values, year_withdrawals)
+        if progress is not None:
+            progress(year_index)
+
+    outputs = []
+    for sleeve, recorder in zip(sleeves, recorders):
+        if isinstance(recorder, AnnualPathRecorder):
+            outputs.append((sleeve.portfolio_values, recorder.annual_withdrawals, recorder.annual_values))
+        else:
+            outputs.append((sleeve.portfolio_values, None, None))
+    return outputs
+
+
+def run_simulation_fused_single(n_sims, n_years, initial_value, withdrawal_rate,
+                                weights, multi_asset_returns, strategy='constant',
+                                floor_pct=DYNAMIC_FLOOR_PCT, ceiling_pct=DYNAMIC_CEILING_PCT,
+                                inflation_rate=INFLATION_RATE, recorder=None, progress=None):
+    """``run_simulation_fused`` for one portfolio, with the other kernels' signature."""
+    return run_simulation_fused(
+        n_sims, n_years, initial_value, withdrawal_rate, [(weights, multi_asset_returns)],
+        strategy=strategy, floor_pct=floor_pct, ceiling_pct=ceiling_pct, inflation_rate=inflation_rate,
+        recorders=[recorder], progress=progress
+    )[0]
+
+
+def _year_factors(annual_returns):
+    """Monthly growth g, g**12 - 1 and (g**12 - 1) / (g - 1) for annual returns (see ``run_simulation_annual``).
+
+    The 12-month factors go through log1p/expm1 to avoid cancellation near g = 1.
+    """
+    monthly_return = (1 + annual_returns) ** (1/12) - 1
+    growth = 1 + monthly_return
+    growth_12_minus_1 = np.expm1(12 * np.log1p(monthly_return))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity_12 = np.where(monthly_return == 0, 12.0, growth_12_minus_1 / monthly_return)
+    return growth, growth_12_minus_1, annuity_12
+
+
+class _MultiAssetSleeve:
+    """One portfolio's balances, stepped a year at a time by ``run_simulation_annual`` and ``run_simulation_fused``."""
+
+    def __init__(self, weights, returns, n_sims, initial_value):
+        # Asset-major layout (n_assets, n_sims): per-path sums and checks reduce
+        # over a short leading axis, which is far cheaper than axis=1 reductions
+        self.returns = returns
+        self.dtype = returns.dtype
+        self.n_sims = n_sims
+        self.column_weights = np.asarray(weights, dtype=self.dtype)[:, np.newaxis]
+        self.asset_values = np.empty((len(weights), n_sims), dtype=self.dtype)
+        self.asset_values[:] = initial_value * self.column_weights
+        self.portfolio_values = self.asset_values.sum(axis=0)
+
+    def start_year(self, year_index):
+        """Compute the year's growth factors; return the January values after returns."""
+        factors = _year_factors(np.ascontiguousarray(self.returns[year_index].T))
+        # Scenario blocks share the return paths
+        self.factors = [_repeat_paths(factor, self.n_sims, axis=1) for factor in factors]
+        return (self.asset_values * self.factors[0]).sum(axis=0)
+
+    def finish_year(self, monthly_withdrawal_amount):
+        """Grow and withdraw through December, then rebalance; return (year-end values, year withdrawals)."""
+        growth, growth_12_minus_1, annuity_12 = self.factors
+        asset_withdrawals = self.column_weights * monthly_withdrawal_amount
+        # Closed form for the whole year; valid where no asset goes negative
+        after_first_month = self.asset_values * growth - asset_withdrawals
+        after_year = self.asset_values * (1 + growth_12_minus_1) - asset_withdrawals * annuity_12
+        closed_form = (after_first_month.min(axis=0) >= 0) & (after_year.min(axis=0) >= 0)
+        # Depleted paths stay at zero with no withdrawals
+        stepped = ~closed_form & (self.portfolio_values > 0)
+
+        year_withdrawals = np.where(closed_form, monthly_withdrawal_amount * 12, 0.0)
+        if stepped.any():
+            after_year[:, stepped], year_withdrawals[stepped] = _step_months(
+                self.asset_values[:, stepped], growth[:, stepped], monthly_withdrawal_amount[stepped],
+                self.column_weights
+            )
+            closed_form |= stepped
+        self.asset_values = np.where(closed_form, after_year, 0.0)
+
+        self.portfolio_values = self.asset_values.sum(axis=0)
+        non_zero_mask = self.portfolio_values > 0
+        self.asset_values[:, non_zero_mask] = self.column_weights * self.portfolio_values[non_zero_mask]
+        return self.portfolio_values, year_withdrawals
+
+
+class _SingleAssetSleeve:
+    """A single-asset portfolio for ``run_simulation_fused``: one balance per path, nothing to rebalance."""
+
+    _UNIT_WEIGHT = np.ones((1, 1))
+
+    def __init__(self, returns, n_sims, initial_value):
+        self.returns = returns.reshape(returns.shape[:2])
+        self.dtype = returns.dtype
+        self.n_sims = n_sims
+        self.portfolio_values = np.full(n_sims, initial_value, dtype=self.dtype)
+
+    def start_year(self, year_index):
+        self.factors = [_repeat_paths(factor, self.n_sims, axis=0)
+                        for factor in _year_factors(self.returns[year_index])]
+        return self.portfolio_values * self.factors[0]
+
+    def finish_year(self, monthly_withdrawal_amount):
+        growth, growth_12_minus_1, annuity_12 = self.factors
+        values = self.portfolio_values
+        after_first_month = values * growth - monthly_withdrawal_amount
+        after_year = values * (1 + growth_12_minus_1) - monthly_withdrawal_amount * annuity_12
+        closed_form = (after_first_month >= 0) & (after_year >= 0)
+        stepped = ~closed_form & (values > 0)
+
+        year_withdrawals = np.where(closed_form, monthly_withdrawal_amount * 12, 0.0)
+        if stepped.any():
+            stepped_values, year_withdrawals[stepped] = _step_months(
+                values[np.newaxis, stepped], growth[np.newaxis, stepped], monthly_withdrawal_amount[stepped],
+                self._UNIT_WEIGHT.astype(self.dtype)
+            )
+            after_year[stepped] = stepped_values[0]
+            closed_form |= stepped
+        self.portfolio_values = np.where(closed_form, after_year, 0.0)
+        return self.portfolio_values, year_withdrawals
+
+
+def _repeat_paths(array, n_sims, axis):
+    """``array`` with its path ``axis`` repeated block-wise up to ``n_sims`` paths."""
+    n_return_paths = array.shape[axis]
+    if n_return_paths == n_sims:
+        return array
+    if n_sims % n_return_paths:
+        raise ValueError(f"n_sims ({n_sims}) must be a multiple of the return paths ({n_return_paths})")
+    reps = [1] * array.ndim
+    reps[axis] = n_sims // n_return_paths
+    return np.tile(array, reps)
+
+
+def _step_months(asset_values, growth, monthly_withdrawal_amount, column_weights):
+    """Twelve months of the monthly loop for a subset of paths (asset-major); returns (assets, year withdrawals)."""
+    year_withdrawals = np.zeros(asset_values.shape[1], dtype=asset_values.dtype)
+    for _ in range(12):
+        asset_values *= growth
+        withdrawals = np.minimum(monthly_withdrawal_amount, asset_values.sum(axis=0))
+        year_withdrawals += withdrawals
+        asset_values -= column_weights * withdrawals
+        np.maximum(asset_values, 0, out=asset_values)
+    return asset_values, year_withdrawals
+
+
+# Kernel for each ``SimulationConfig.engine``
+KERNELS = {
+    'monthly': run_simulation_with_rebalancing,
+    'annual': run_simulation_annual,
+    'fused': run_simulation_fused_single,
+}
+# Weights of the single-asset S&P 500 benchmark portfolio
+SP500_WEIGHTS = np.array([1.0])
+
+
+class AnnualPathRecorder:
+    """Keeps year-end values (n_years + 1, n_sims) and annual withdrawals (n_years, n_sims).
+
+    The arrays are allocated unless ``annual_values`` / ``annual_withdrawals``
+    are given, in which case year-ends are written into them in place (any
+    writable arrays of those shapes, including memmap slices).
+    """
+
+    def __init__(self, n_years, n_sims, initial_value, dtype=np.float64,
+                 annual_values=None, annual_withdrawals=None):
+        if annual_values is None:
+            annual_values = np.empty((n_years + 1, n_sims), dtype=dtype)
+        if annual_withdrawals is None:
+            annual_withdrawals = np.empty((n_years, n_sims), dtype=dtype)
+        self.annual_values = annual_values
+        self.annual_values[0] = initial_value
+        self.annual_withdrawals = annual_withdrawals
+
+    def record_year(self, year_index, portfolio_values, withdrawals):
+        self.annual_values[year_index + 1] = portfolio_values
+        self.annual_withdrawals[year_index] = withdrawals
+
+
+# --- RUN ---
+@dataclass
+class SimulationResults:
+    """Per-path output of ``simulate()`` plus the metrics derived from it.
+
+    Path arrays are shaped (years + 1, paths) for values and (years, paths)
+    for withdrawals, matching ``run_simulation_with_rebalancing``. The S&P 500
+    benchmark keeps only final values and max drawdowns per path;
+    ``sp500_values_over_time`` is None for chunked runs. ``seed`` is the
+    entropy the run was drawn from; pass it back as ``config.seed`` to
+    reproduce the run.
+
+    ``control_values`` (with ``config.control_variate``) is each path's mean
+    annual portfolio return at target weights, the control variate behind
+    the adjusted estimates in ``metrics``.
+
+    Streaming runs (``config.streaming``) keep no per-path arrays at all:
+    they are None and ``accumulator`` holds the merged ``PathAccumulator``.
+    Runs from ``swr.adaptive.simulate_to_precision`` record how their length
+    was chosen in ``adaptive``.
+    """
+    config: SimulationConfig
+    portfolio: PreparedPortfolio
+    final_portfolio_values: Optional[np.ndarray] = None
+    withdrawals_history: Optional[np.ndarray] = None
+    portfolio_values_over_time: Optional[np.ndarray] = None
+    final_sp500_values: Optional[np.ndarray] = None
+    sp500_max_drawdowns: Optional[np.ndarray] = None
+    sp500_values_over_time: Optional[np.ndarray] = None
+    control_values: Optional[np.ndarray] = None
+    accumulator: Optional['PathAccumulator'] = None
+    seed: Optional[int] = None
+    metrics: 'SimulationMetrics' = None
+    profile: Optional['PhaseProfiler'] = None
+    adaptive: Optional['AdaptiveRun'] = None
+
+
+def iter_chunks(n_sims, chunk_size):
+    """Yield (start, stop) path ranges of at most ``chunk_size`` paths."""
+    chunk_size = chunk_size or n_sims
+    for start in range(0, n_sims, chunk_size):
+        yield start, min(start + chunk_size, n_sims)
+
+
+def simulate_chunk(config, prepared, entropy, start, stop, profiler=None, path_store=None):
+    """Generate returns for paths [start, stop) and run portfolio and S&P 500 simulations.
+
+    Returns ``(final_values, annual_withdrawals, annual_values, final_sp500_values,
+    sp500_values_over_time, control_values)``, the last None unless
+    ``config.control_variate``; the return tensor and monthly matrices are
+    released when the call returns. ``profiler`` (a ``PhaseProfiler``)
+    times the rng, portfolio_simulation and sp500_simulation phases (the
+    fused engine runs both portfolios under portfolio_simulation). With a
+    ``swr.paths.PathStore`` the kernel records the portfolio history straight
+    into the store's files and the two history entries are views of them.
+    """
+    from .profiling import profile_phase, year_progress
+    from .returns import chunk_returns
+
+    n_paths = stop - start
+    with profile_phase(profiler, 'rng'):
+        multi_asset_returns, annual_sp500_returns = chunk_returns(config, prepared, start, stop, entropy)
+    control_values = None
+    if config.control_variate:
+        # Mean annual return at target weights; its expectation is prepared.exp_nominal_return
+        control_values = (multi_asset_returns @ prepared.weights).mean(axis=0, dtype=np.float64)
+
+    recorder = path_store.recorder(start, stop, config.initial_value) if path_store is not None else None
+    if config.engine == 'fused':
+        with profile_phase(profiler, 'portfolio_simulation'):
+            portfolio, sp500 = run_simulation_fused(
+                n_paths, config.years, config.initial_value, config.withdrawal_rate,
+                [(prepared.weights, multi_asset_returns), (SP500_WEIGHTS, annual_sp500_returns)],
+                strategy=strategy_for(config), floor_pct=config.floor_pct, ceiling_pct=config.ceiling_pct,
+                inflation_rate=config.inflation_rate, recorders=[recorder, None],
+                progress=year_progress(profiler, 'portfolio_simulation')
+            )
+        final_portfolio_values, withdrawals_history, portfolio_values_over_time = portfolio
+        final_sp500_values, _, sp500_values_over_time = sp500
+        return (final_portfolio_values, withdrawals_history, portfolio_values_over_time,
+                final_sp500_values, sp500_values_over_time, control_values)
+
+    kernel = KERNELS[config.engine]
+    with profile_phase(profiler, 'portfolio_simulation'):
+        final_portfolio_values, withdrawals_history, portfolio_values_over_time = kernel(
+            n_paths, config.years, config.initial_value, config.withdrawal_rate,
+            prepared.weights, multi_asset_returns, strategy=strategy_for(config),
+            floor_pct=config.floor_pct, ceiling_pct=config.ceiling_pct,
+            inflation_rate=config.inflation_rate, recorder=recorder,
+            progress=year_progress(profiler, 'portfolio_simulation')
+        )
+    del multi_asset_returns
+
+    sp500_returns_reshaped = annual_sp500_returns[:, :, np.newaxis]
+    with profile_phase(profiler, 'sp500_simulation'):
+        final_sp500_values, _, sp500_values_over_time = kernel(
+            n_paths, config.years, config.initial_value, config.withdrawal_rate,
+            SP500_WEIGHTS, sp500_returns_reshaped, strategy=strategy_for(config),
+            floor_pct=config.floor_pct, ceiling_pct=config.ceiling_pct,
+            inflation_rate=config.inflation_rate,
+            progress=year_progress(profiler, 'sp500_simulation')
+        )
+
+    return (final_portfolio_values, withdrawals_history, portfolio_values_over_time,
+            final_sp500_values, sp500_values_over_time, control_values)
+
+
+def accumulate_chunk(config, prepared, entropy, start, stop, accumulator=None, profiler=None):
+    """Streaming counterpart of ``simulate_chunk``: fold paths [start, stop) into a ``PathAccumulator``.
+
+    Year-ends go straight into the accumulator's sketches (a new one unless
+    ``accumulator`` is given), so besides the chunk's return tensor only
+    O(paths) running state is allocated.
+    """
+    from .profiling import profile_phase, year_progress
+    from .returns import chunk_returns
+    from .streaming import DrawdownRecorder, PathAccumulator, StreamingRecorder
+
+    n_paths = stop - start
+    with profile_phase(profiler, 'rng'):
+        multi_asset_returns, annual_sp500_returns = chunk_returns(config, prepared, start, stop, entropy)
+    if accumulator is None:
+        accumulator = PathAccumulator(config.years, config.initial_value, config.inflation_rate)
+
+    recorder = StreamingRecorder(accumulator, n_paths)
+    sp500_recorder = DrawdownRecorder(n_paths, config.initial_value)
+    if config.engine == 'fused':
+        with profile_phase(profiler, 'portfolio_simulation'):
+            (final_portfolio_values, _, _), (final_sp500_values, _, _) = run_simulation_fused(
+                n_paths, config.years, config.initial_value, config.withdrawal_rate,
+                [(prepared.weights, multi_asset_returns), (SP500_WEIGHTS, annual_sp500_returns)],
+                strategy=strategy_for(config), floor_pct=config.floor_pct, ceiling_pct=config.ceiling_pct,
+                inflation_rate=config.inflation_rate, recorders=[recorder, sp500_recorder],
+                progress=year_progress(profiler, 'portfolio_simulation')
+            )
+        with profile_phase(profiler, 'metrics'):
+            accumulator.add_paths(final_portfolio_values, final_sp500_values, recorder.max_drawdowns,
+                                  sp500_recorder.max_drawdowns, recorder.failure_years)
+        return accumulator
+
+    kernel = KERNELS[config.engine]
+    with profile_phase(profiler, 'portfolio_simulation'):
+        final_portfolio_values, _, _ = kernel(
+            n_paths, config.years, config.initial_value, config.withdrawal_rate,
+            prepared.weights, multi_asset_returns, strategy=strategy_for(config),
+            floor_pct=config.floor_pct, ceiling_pct=config.ceiling_pct,
+            inflation_rate=config.inflation_rate, recorder=recorder,
+            progress=year_progress(profiler, 'portfolio_simulation')
+        )
+    del multi_asset_returns
+
+    with profile_phase(profiler, 'sp500_simulation'):
+        final_sp500_values, _, _ = kernel(
+            n_paths, config.years, config.initial_value, config.withdrawal_rate,
+            SP500_WEIGHTS, annual_sp500_returns[:, :, np.newaxis], strategy=strategy_for(config),
+            floor_pct=config.floor_pct, ceiling_pct=config.ceiling_pct,
+            inflation_rate=config.inflation_rate, recorder=sp500_recorder,
+            progress=year_progress(profiler, 'sp500_simulation')
+        )
+
+    with profile_phase(profiler, 'metrics'):
+        accumulator.add_paths(final_portfolio_values, final_sp500_values, recorder.max_drawdowns,
+                              sp500_recorder.max_drawdowns, recorder.failure_years)
+    return accumulator
+
+
+def _simulate_chunk_task(config, prepared, entropy, start, stop, keep_sp500_paths, profiler=None,
+                         path_store=None):
+    """Process-pool entry point: one chunk, with the S&P paths reduced to drawdowns.
+
+    Streaming runs return the chunk's ``PathAccumulator`` instead. Returns
+    ``(chunk_result, profiler)`` so a worker's phase timings travel back to
+    the parent process. With a ``path_store`` the chunk's history is already
+    in the store's files, so its history entries are returned as None.
+    """
+    from .metrics import calculate_max_drawdown
+    from .profiling import profile_phase
+
+    if config.streaming:
+        return accumulate_chunk(config, prepared, entropy, start, stop, profiler=profiler), profiler
+    (final_values, withdrawals_history, values_over_time, final_sp500_values, sp500_values_over_time,
+     control_values) = simulate_chunk(config, prepared, entropy, start, stop, profiler, path_store)
+    with profile_phase(profiler, 'metrics'):
+        sp500_max_drawdowns = calculate_max_drawdown(sp500_values_over_time)
+    if not keep_sp500_paths:
+        sp500_values_over_time = None
+    if path_store is not None:
+        withdrawals_history = values_over_time = None
+    return (final_values, withdrawals_history, values_over_time, final_sp500_values, sp500_max_drawdowns,
+            sp500_values_over_time, control_values), profiler
+
+
+def simulate(config, prepared=None, log=None, profiler=None, path_store=None, checkpoint=None):
+    """Run one Monte Carlo simulation and return a ``SimulationResults``.
+
+    ``prepared`` defaults to the cached arrays for ``config.portfolio``; pass
+    a ``build_portfolio`` result to simulate a custom allocation. ``log``
+    receives progress messages (e.g. ``print``); the default is silent.
+    ``profiler`` (a ``swr.profiling.PhaseProfiler``) records wall time and
+    peak memory per phase, including worker processes, and is kept as
+    ``SimulationResults.profile``. ``path_store`` (a ``swr.paths.PathStore``)
+    makes the per-path arrays memory-mapped ``.npy`` files that the kernels
+    (in every worker) write into directly, described by a manifest written
+    once the run completes; it cannot be combined with streaming.
+    ``checkpoint`` (a ``swr.checkpoint.Checkpoint``) saves every completed
+    chunk and, when resuming, simulates only the chunks not yet saved.
+
+    Paths are simulated in chunks of ``config.effective_chunk_size`` paths,
+    on ``config.workers`` processes when more than one, and written into the
+    combined arrays in path order. Random returns come from per-block streams
+    spawned from ``config.seed`` (fresh OS entropy when None, recorded in
+    ``SimulationResults.seed``), so a given seed reproduces the same results
+    for any chunk size or worker count.
+
+    With ``config.streaming`` each chunk is reduced to a ``PathAccumulator``
+    (per-year quantile sketches plus counts) and the accumulators are merged;
+    no path history is allocated and quantiles are within the sketch's
+    bucket width (0.2% for dollar amounts).
+    """
+    from .metrics import compute_metrics
+    from .profiling import profile_phase
+
+    if path_store is not None and config.streaming:
+        raise ValueError("path_store needs per-path arrays; streaming runs keep none")
+    if path_store is not None and checkpoint is not None:
+        raise ValueError("path_store and checkpoint cannot be combined")
+    log = log or _silent
+    with profile_phase(profiler, 'setup'):
+        if prepared is None:
+            prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+        if checkpoint is not None:
+            entropy = checkpoint.begin(config, prepared)
+        else:
+            entropy = config.seed if config.seed is not None else np.random.SeedSequence().entropy
+
+    n_sims, n_years = config.simulations, config.years
+    chunks = list(iter_chunks(n_sims, config.effective_chunk_size))
+    log("Generating random returns for simulation...")
+    if config.fat_tails:
+        log("Using fat-tail distribution (multivariate Student's t, df=5) for black swan events")
+    else:
+        log("Using normal distribution (standard Monte Carlo)")
+    if len(chunks) > 1:
+        workers = f" on {config.workers} worker processes" if config.workers > 1 else ""
+        log(f"Running {n_sims:,} Monte Carlo simulations in {len(chunks):,} chunks "
+            f"of up to {config.effective_chunk_size:,} paths{workers}...")
+    else:
+        log(f"Running {n_sims:,} Monte Carlo simulations...")
+
+    keep_sp500_paths = len(chunks) == 1
+    done, accumulator = set(), None
+    if checkpoint is not None:
+        if config.streaming:
+            accumulator, n_done = checkpoint.load_accumulator()
+            done = set(range(n_done))
+        else:
+            done = set(checkpoint.completed_chunks())
+        if done:
+            log(f"Resuming from {checkpoint.directory}: {len(done):,} of {len(chunks):,} chunks already done")
+    pending = [chunk for index, chunk in enumerate(chunks) if index not in done]
+    if config.workers > 1 and len(pending) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Each worker fills its own profiler; they are merged as chunks arrive
+        child = profiler.child() if profiler is not None else None
+        tasks = [(config, prepared, entropy, start, stop, keep_sp500_paths, child, path_store)
+                 for start, stop in pending]
+        with ProcessPoolExecutor(max_workers=min(config.workers, len(pending))) as pool:
+            chunk_results = _merge_worker_profiles(pool.map(_simulate_chunk_task, *zip(*tasks)), profiler)
+            chunk_results = _checkpointed_chunks(config, checkpoint, chunks, done, chunk_results, accumulator)
+            results = _collect_chunks(config, prepared, chunks, chunk_results, path_store)
+    elif config.streaming:
+        # One accumulator for every chunk instead of one per chunk plus a merge
+        from .streaming import PathAccumulator
+
+        if accumulator is None:
+            accumulator = PathAccumulator(n_years, config.initial_value, config.inflation_rate)
+        for index, (start, stop) in enumerate(chunks):
+            if index in done:
+                continue
+            accumulate_chunk(config, prepared, entropy, start, stop, accumulator, profiler)
+            if checkpoint is not None:
+                checkpoint.save_accumulator(accumulator, index + 1)
+        results = SimulationResults(config=config, portfolio=prepared, accumulator=accumulator)
+    else:
+        tasks = [(config, prepared, entropy, start, stop, keep_sp500_paths, profiler, path_store)
+                 for start, stop in pending]
+        chunk_results = (_simulate_chunk_task(*task)[0] for task in tasks)
+        chunk_results = _checkpointed_chunks(config, checkpoint, chunks, done, chunk_results, accumulator)
+        results = _collect_chunks(config, prepared, chunks, chunk_results, path_store)
+    results.seed = entropy
+    results.profile = profiler
+
+    log("Calculating performance metrics...")
+    with profile_phase(profiler, 'metrics'):
+        results.metrics = compute_metrics(results)
+    if path_store is not None:
+        path_store.write_manifest(results)
+    return results
+
+
+def _merge_worker_profiles(task_results, profiler):
+    """Yield chunk results from ``_simulate_chunk_task`` outputs, merging worker profilers."""
+    for chunk, worker_profiler in task_results:
+        if profiler is not None:
+            profiler.merge(worker_profiler)
+        yield chunk
+
+
+def _checkpointed_chunks(config, checkpoint, chunks, done, computed, accumulator=None):
+    """Chunk results in path order: the ``done`` chunks from ``checkpoint``, the rest from ``computed``.
+
+    Each computed chunk is saved as it arrives. Streaming runs instead yield
+    the restored ``accumulator`` (if any) and then each new chunk's, saving
+    their running merge.
+    """
+    if checkpoint is None:
+        yield from computed
+        return
+    computed = iter(computed)
+    if config.streaming:
+        from .streaming import PathAccumulator
+
+        if accumulator is not None:
+            yield accumulator
+        running = PathAccumulator(config.years, config.initial_value, config.inflation_rate)
+        if accumulator is not None:
+            running.merge(accumulator)
+        for index in range(len(done), len(chunks)):
+            chunk = next(computed)
+            checkpoint.save_accumulator(running.merge(chunk), index + 1)
+            yield chunk
+        return
+    for index in range(len(chunks)):
+        if index in done:
+            yield checkpoint.load_chunk(index)
+        else:
+            chunk = next(computed)
+            checkpoint.save_chunk(index, chunk)
+            yield chunk
+
+
+def _collect_chunks(config, prepared, chunks, chunk_results, path_store=None):
+    """Merge per-chunk results, in path order, into one ``SimulationResults``.
+
+    With a ``path_store`` the combined arrays are its memory-mapped files;
+    the chunks have already written their history there.
+    """
+    n_sims, n_years = config.simulations, config.years
+    if config.streaming:
+        from .streaming import PathAccumulator
+
+        accumulator = PathAccumulator(n_years, config.initial_value, config.inflation_rate)
+        for chunk_accumulator in chunk_results:
+            accumulator.merge(chunk_accumulator)
+        return SimulationResults(config=config, portfolio=prepared, accumulator=accumulator)
+
+    if path_store is not None:
+        arrays = path_store.open('r+')
+    else:
+        arrays = {
+            'final_portfolio_values': np.empty(n_sims, dtype=config.dtype),
+            'withdrawals_history': np.empty((n_years, n_sims), dtype=config.dtype),
+            'portfolio_values_over_time': np.empty((n_years + 1, n_sims), dtype=config.dtype),
+            'final_sp500_values': np.empty(n_sims, dtype=config.dtype),
+            'sp500_max_drawdowns': np.empty(n_sims, dtype=config.dtype),
+        }
+    if config.control_variate:
+        arrays['control_values'] = np.empty(n_sims)
+    results = SimulationResults(config=config, portfolio=prepared, **arrays)
+    for (start, stop), chunk in zip(chunks, chunk_results):
+        (final_values, withdrawals_history, values_over_time, final_sp500_values, sp500_max_drawdowns,
+         results.sp500_values_over_time, control_values) = chunk
+        if control_values is not None:
+            results.control_values[start:stop] = control_values
+        results.final_portfolio_values[start:stop] = final_values
+        results.final_sp500_values[start:stop] = final_sp500_values
+        results.sp500_max_drawdowns[start:stop] = sp500_max_drawdowns
+        if withdrawals_history is not None:
+            results.withdrawals_history[:, start:stop] = withdrawals_history
+            results.portfolio_values_over_time[:, start:stop] = values_over_time
+    return results
+
+
+def _silent(message):
+    pass
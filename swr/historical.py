@@ -0,0 +1,248 @@
+"""
+Historical return sources: paths drawn from a table of actual annual
+returns instead of the parametric model.
+
+A history file holds one row per year and one column per ticker, as
+decimals (0.07 = 7%), plus an ``SP500`` column (``VOO`` or ``SPY`` also
+work) for the benchmark. A leading ``year`` column is optional:
+
+    year,VTI,VXUS,BND,SP500
+    2015,0.0036,-0.0439,0.0056,0.0138
+    2016,0.1264,0.0472,0.0256,0.1196
+
+A CSV is parsed once and stored as ``.npy`` in the cache directory, keyed
+by its contents. A ``.npy`` with a ``<name>.json`` sidecar (``{"columns":
+[...], "years": [...]}``, as written by ``save_history``) is used as is.
+Either way the table is memory-mapped, once per process. Each path is a
+column of year indices into the table, and a chunk's return tensor is one
+vectorized gather from it, so no data is copied per path.
+
+Like the preset means, historical returns are gross of fees: the
+portfolio's total fee is subtracted from every asset, and the S&P 500
+proxy's expense ratio plus the additional fee from the benchmark.
+
+Sources (``SimulationConfig.return_source``):
+
+- ``bootstrap``: every year of every path is a uniformly drawn historical
+  year, all assets from the same year so their co-movement is kept.
+- ``block_bootstrap``: stationary bootstrap (Politis & Romano) of runs of
+  consecutive years, wrapping around, with geometric lengths of mean
+  ``block_length``, which also keeps multi-year momentum and reversion.
+- ``rolling``: path i replays history from start year i mod (years of
+  data), wrapping around. It is deterministic; the seed is unused.
+
+Bootstrap indices are drawn per seed block like parametric returns, so
+results do not depend on chunking or worker count.
+"""
+
+import csv
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .presets import SP500_PROXY
+from .returns import SEED_BLOCK_SIZE, block_rng
+
+HISTORICAL_SOURCES = ('bootstrap', 'block_bootstrap', 'rolling')
+# Accepted names for the benchmark column, in order of preference
+BENCHMARK_COLUMNS = ('SP500', 'VOO', 'SPY')
+_YEAR_COLUMNS = ('year', 'years', 'date')
+
+
+@dataclass(frozen=True, eq=False)
+class ReturnHistory:
+    """A read-only table of annual returns, (years of data, columns)."""
+    path: Path
+    columns: tuple
+    years: Optional[tuple]
+    table: np.ndarray
+
+    @property
+    def n_periods(self):
+        return self.table.shape[0]
+
+    def describe(self):
+        span = f"{self.years[0]}-{self.years[-1]}" if self.years else f"{self.n_periods} years"
+        return f"{self.path.name}, {span}"
+
+    def benchmark_index(self):
+        for name in BENCHMARK_COLUMNS:
+            if name in self.columns:
+                return self.columns.index(name)
+        raise ValueError(f"{self.path.name} needs an S&P 500 column named {' or '.join(BENCHMARK_COLUMNS)}")
+
+    def returns_after_fees(self, prepared, dtype=np.float64):
+        """``(asset_table, sp500_column)`` after fees: (years of data, assets) and (years of data,)."""
+        missing = [ticker for ticker in prepared.asset_names if ticker not in self.columns]
+        if missing:
+            raise ValueError(f"{self.path.name} has no column for {', '.join(missing)} (in {prepared.name})")
+        asset_columns = [self.columns.index(ticker) for ticker in prepared.asset_names]
+        asset_table = self.table[:, asset_columns] - prepared.total_fee
+        sp500_column = self.table[:, self.benchmark_index()] - SP500_PROXY['er'] - prepared.additional_fee
+        return asset_table.astype(dtype), sp500_column.astype(dtype)
+
+
+def file_digest(path):
+    """SHA-256 of a history file (and a ``.npy``'s sidecar), to key caches on its contents."""
+    path = Path(path)
+    digest = hashlib.sha256(path.read_bytes())
+    sidecar = path.with_suffix('.json')
+    if path.suffix.lower() == '.npy' and sidecar.exists():
+        digest.update(sidecar.read_bytes())
+    return digest.hexdigest()
+
+
+def _replace_file(path, write):
+    """Write via ``write(file)`` to a temporary file, then move it over ``path``."""
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as file:
+        write(file)
+    os.replace(tmp_path, path)
+
+
+def save_history(path, table, columns, years=None):
+    """Write ``table`` (years of data, columns) as ``.npy`` with its ``.json`` sidecar."""
+    path = Path(path)
+    table = np.asarray(table, dtype=np.float64)
+    if table.ndim != 2 or table.shape[1] != len(columns):
+        raise ValueError(f"history table must be (years, {len(columns)} columns), got shape {table.shape}")
+    sidecar = {'columns': list(columns), 'years': None if years is None else [int(year) for year in years]}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _replace_file(path.with_suffix('.json'), lambda file: file.write(json.dumps(sidecar).encode()))
+    _replace_file(path, lambda file: np.save(file, table))
+    return path
+
+
+def _parse_value(text, path, line, column):
+    # Errors name the position only: the file's contents are never echoed
+    text = text.strip()
+    scale = 1.0
+    if text.endswith('%'):
+        text, scale = text[:-1], 0.01
+    try:
+        return float(text) * scale
+    except ValueError:
+        raise ValueError(f"{path.name} line {line}, column {column}: not a return "
+                         f"(decimals, or percents with %)") from None
+
+
+def read_history_csv(path):
+    """``(table, columns, years)`` from a CSV of annual returns (decimals, or percents with ``%``)."""
+    path = Path(path)
+    with open(path, newline='') as file:
+        rows = [row for row in csv.reader(file) if any(cell.strip() for cell in row)]
+    if len(rows) < 2:
+        raise ValueError(f"{path.name} needs a header row and at least one year of returns")
+    header = [name.strip() for name in rows[0]]
+    has_years = header[0].lower() in _YEAR_COLUMNS
+    columns = header[1:] if has_years else header
+
+    table, years = [], []
+    for line, row in enumerate(rows[1:], start=2):
+        if len(row) != len(header):
+            raise ValueError(f"{path.name} line {line}: expected {len(header)} values, got {len(row)}")
+        if has_years:
+            try:
+                years.append(int(float(row[0])))
+            except ValueError:
+                raise ValueError(f"{path.name} line {line}, column 1: not a year") from None
+            row = row[1:]
+        first_column = 2 if has_years else 1
+        table.append([_parse_value(cell, path, line, column) for column, cell in enumerate(row, start=first_column)])
+    return np.array(table, dtype=np.float64), columns, (years if has_years else None)
+
+
+@lru_cache(maxsize=None)
+def _load_history(path, mtime_ns, size):
+    if path.suffix.lower() == '.npy':
+        npy_path = path
+        if not path.with_suffix('.json').exists():
+            raise ValueError(f"{path.name} needs a {path.with_suffix('.json').name} sidecar naming its columns")
+    else:
+        from .cache import default_cache_dir
+
+        npy_path = default_cache_dir() / 'history' / f'{file_digest(path)}.npy'
+        if not npy_path.exists():
+            save_history(npy_path, *read_history_csv(path))
+    sidecar = json.loads(npy_path.with_suffix('.json').read_text())
+    table = np.load(npy_path, mmap_mode='r')
+    if table.ndim != 2 or table.shape[1] != len(sidecar['columns']) or table.shape[0] < 1:
+        raise ValueError(f"{path.name}: table shape {table.shape} does not match its "
+                         f"{len(sidecar['columns'])} sidecar columns")
+    if np.isnan(table).any():
+        raise ValueError(f"{path.name} has missing returns")
+    if table.min() <= -1:
+        raise ValueError(f"{path.name} has returns of -100% or worse; returns must be decimals (0.07 = 7%)")
+    years = tuple(sidecar['years']) if sidecar.get('years') else None
+    return ReturnHistory(path=path, columns=tuple(sidecar['columns']), years=years, table=table)
+
+
+def load_history(path):
+    """The memory-mapped ``ReturnHistory`` of a ``.csv`` or ``.npy`` file, loaded once per process."""
+    path = Path(path).resolve()
+    if not path.is_file():
+        raise ValueError(f"History file not found: {path}")
+    stat = path.stat()
+    return _load_history(path, stat.st_mtime_ns, stat.st_size)
+
+
+def check_history(config):
+    """Load ``config.history_file`` and check it has every column the run needs (ValueError if not)."""
+    from .engine import prepare_portfolio
+
+    prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+    load_history(config.history_file).returns_after_fees(prepared)
+
+
+def _bootstrap_indices(rng, n_periods, n_years, n_paths):
+    return rng.integers(n_periods, size=(n_years, n_paths), dtype=np.int32)
+
+
+def _block_bootstrap_indices(rng, n_periods, n_years, n_paths, block_length):
+    """Stationary bootstrap: each year starts a new run with probability 1/``block_length``."""
+    indices = rng.integers(n_periods, size=(n_years, n_paths), dtype=np.int32)
+    new_block = rng.random((n_years, n_paths)) < 1 / block_length
+    for year in range(1, n_years):
+        continued = (indices[year - 1] + 1) % n_periods
+        np.copyto(indices[year], continued, where=~new_block[year])
+    return indices
+
+
+def _rolling_indices(n_periods, n_years, start, stop):
+    paths = np.arange(start, stop, dtype=np.int64) % n_periods
+    years = np.arange(n_years, dtype=np.int64)[:, np.newaxis]
+    return ((paths + years) % n_periods).astype(np.int32)
+
+
+def path_indices(source, n_periods, n_years, n_sims, start, stop, entropy, block_length):
+    """(n_years, stop - start) historical year indices for paths [start, stop) of an ``n_sims``-path run."""
+    if source == 'rolling':
+        return _rolling_indices(n_periods, n_years, start, stop)
+    indices = np.empty((n_years, stop - start), dtype=np.int32)
+    for block in range(start // SEED_BLOCK_SIZE, (stop - 1) // SEED_BLOCK_SIZE + 1):
+        block_start = block * SEED_BLOCK_SIZE
+        block_stop = min(block_start + SEED_BLOCK_SIZE, n_sims)
+        rng = block_rng(entropy, block)
+        if source == 'bootstrap':
+            block_indices = _bootstrap_indices(rng, n_periods, n_years, block_stop - block_start)
+        else:
+            block_indices = _block_bootstrap_indices(rng, n_periods, n_years, block_stop - block_start,
+                                                     block_length)
+        lo, hi = max(start, block_start), min(stop, block_stop)
+        indices[:, lo - start:hi - start] = block_indices[:, lo - block_start:hi - block_start]
+    return indices
+
+
+def historical_chunk_returns(config, prepared, start, stop, entropy):
+    """``generate_chunk_returns`` counterpart for ``config``'s historical return source."""
+    history = load_history(config.history_file)
+    asset_table, sp500_column = history.returns_after_fees(prepared, config.dtype)
+    indices = path_indices(config.return_source, history.n_periods, config.years, config.simulations,
+                           start, stop, entropy, config.block_length)
+    return asset_table[indices], sp500_column[indices]
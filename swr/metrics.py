@@ -0,0 +1,369 @@
+"""
+Performance metrics derived from simulated paths (report section 7).
+
+Standard errors use batch means over seed blocks: every block of
+``SEED_BLOCK_SIZE`` paths is an independent replicate under each sampling
+method (antithetic pairs and Sobol scramblings never span blocks), so the
+spread of per-block estimates measures the precision of the full-run
+estimate whichever variance-reduction mode produced it. With
+``config.control_variate`` the depletion probability, average ending value
+and goal probabilities are regression-adjusted on each path's mean annual
+portfolio return, whose expectation is the analytic
+``exp_nominal_return``; quantiles are not adjusted.
+
+Every quantile is read off one sort of its array (``sorted_percentiles``,
+identical to ``np.percentile``), so an array is ordered once however many
+quantiles the report and exports need. The path history is scanned a year
+row at a time: each row is sorted once for the percentile bands, and
+drawdowns and failure years keep O(paths) running state.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .returns import SEED_BLOCK_SIZE
+
+# Use threshold for depletion check to handle floating point precision
+# Consider portfolio depleted if value is less than $1
+DEPLETION_THRESHOLD = 1.0
+
+RISK_FREE_RATE = 0.03
+
+GOALS = [1_500_000, 2_000_000, 3_000_000, 5_000_000, 10_000_000]
+
+# Percentile bands exported to paths_*_v3.csv
+PATH_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Estimates that get a standard error: field -> (statistic, label)
+STANDARD_ERROR_METRICS = {
+    'prob_depletion': ('mean', 'Probability of Depletion'),
+    'avg_end_nominal': ('mean', 'Average Ending Value'),
+    'med_end_nominal': (50, 'Median Ending Value'),
+    'p5_end_nominal': (5, '5th Percentile'),
+}
+
+
+@dataclass
+class SimulationMetrics:
+    """Summary statistics shown in the console report and written to outputs/.
+
+    Dollar amounts are nominal unless the field name says ``real``. Per-year
+    arrays have one entry per simulated year (withdrawals) or per year-end
+    including year 0 (``path_percentiles``). ``standard_errors`` maps the
+    fields in ``STANDARD_ERROR_METRICS`` to their estimated standard error
+    (NaN with fewer than two seed blocks; empty for streaming runs).
+    """
+    n_paths: int
+    avg_end_nominal: float
+    med_end_nominal: float
+    p5_end_nominal: float
+    p95_end_nominal: float
+    avg_end_real: float
+    med_end_real: float
+    p5_end_real: float
+    p95_end_real: float
+    prob_depletion: float
+    prob_beat_sp500_nominal: float
+    prob_beat_sp500_real: float
+    median_max_drawdown: float
+    p95_max_drawdown: float
+    n_depleted: int
+    median_failure_year: float
+    sharpe_ratio: float
+    sortino_ratio: float
+    goal_probabilities: dict
+    sp500_median_end_nominal: float
+    sp500_median_end_real: float
+    sp500_median_max_drawdown: float
+    withdrawals_mean: np.ndarray
+    withdrawals_median: np.ndarray
+    withdrawals_p5: np.ndarray
+    withdrawals_p95: np.ndarray
+    path_percentiles: dict
+    gross_return: float
+    fee_impact_total: float
+    fee_cost_on_initial: float
+    standard_errors: dict = field(default_factory=dict)
+
+
+def sorted_percentiles(sorted_values, percentiles, axis=-1):
+    """``np.percentile`` (linear method) of values already sorted along ``axis``.
+
+    Returns an array with a leading axis over ``percentiles``. Reading them
+    all off one sort replaces a partition pass per ``np.percentile`` call.
+    """
+    sorted_values = np.moveaxis(sorted_values, axis, 0)
+    n = sorted_values.shape[0]
+    virtual_index = (n - 1) * (np.asarray(percentiles, dtype=np.float64) / 100)
+    lower = np.floor(virtual_index).astype(np.intp)
+    upper = np.minimum(lower + 1, n - 1)
+    gamma = (virtual_index - lower).reshape((-1,) + (1,) * (sorted_values.ndim - 1))
+    below, above = sorted_values[lower], sorted_values[upper]
+    difference = above - below
+    # numpy's lerp: interpolate from the nearer neighbour
+    return np.where(gamma >= 0.5, above - difference * (1 - gamma), below + difference * gamma)
+
+
+def row_percentiles(history, percentiles):
+    """Percentiles of each row of ``history`` (a year of every path): (len(percentiles), rows).
+
+    Rows are sorted one at a time, so only one row's copy is allocated.
+    """
+    return np.stack([sorted_percentiles(np.sort(row), percentiles) for row in history], axis=1)
+
+
+def scan_paths(values_over_time, percentiles=()):
+    """One pass over the year-end rows: ``(bands, max_drawdowns, failure_years)``.
+
+    ``bands`` are ``row_percentiles`` of the values; each path's max
+    drawdown and first year below ``DEPLETION_THRESHOLD`` (``len(rows)``,
+    i.e. n_years + 1, if never) are updated row by row, allocating no
+    running-max, drawdown or depletion matrix the size of the history.
+    """
+    n_rows, n_sims = values_over_time.shape
+    bands = []
+    running_max = np.array(values_over_time[0])
+    max_drawdowns = np.zeros(n_sims, dtype=values_over_time.dtype)
+    drawdown = np.empty(n_sims, dtype=values_over_time.dtype)
+    failure_years = np.full(n_sims, n_rows, dtype=np.intp)
+    solvent = np.ones(n_sims, dtype=bool)
+    for row_index, row in enumerate(values_over_time):
+        np.maximum(running_max, row, out=running_max)
+        np.subtract(running_max, row, out=drawdown)
+        drawdown /= np.where(running_max == 0, 1, running_max)
+        np.maximum(max_drawdowns, drawdown, out=max_drawdowns)
+
+        newly_depleted = solvent & (row < DEPLETION_THRESHOLD)
+        failure_years[newly_depleted] = row_index
+        solvent &= ~newly_depleted
+        if percentiles:
+            bands.append(sorted_percentiles(np.sort(row), percentiles))
+    bands = np.stack(bands, axis=1) if percentiles else None
+    return bands, max_drawdowns, failure_years
+
+
+def calculate_max_drawdown(values_over_time):
+    """Largest peak-to-trough decline of each path (column) of ``values_over_time``."""
+    return scan_paths(values_over_time)[1]
+
+
+def find_failure_years(values_over_time, n_years):
+    """First year-end each path is depleted, ``n_years + 1`` if never."""
+    failure_years = scan_paths(values_over_time)[2]
+    failure_years[failure_years == len(values_over_time)] = n_years + 1
+    return failure_years
+
+
+def block_statistics(values, statistic, block_size=SEED_BLOCK_SIZE):
+    """``statistic`` ('mean' or a percentile) of each consecutive block of ``values``."""
+    starts = np.arange(0, len(values), block_size)
+    if statistic == 'mean':
+        return np.add.reduceat(values, starts, dtype=np.float64) / np.diff(np.append(starts, len(values)))
+    # Full blocks sorted as one (blocks, block_size) array; a short last block on its own
+    n_full = len(values) // block_size * block_size
+    full_blocks = np.sort(values[:n_full].reshape(-1, block_size), axis=1)
+    estimates = [sorted_percentiles(full_blocks, [statistic], axis=1)[0]]
+    if n_full < len(values):
+        estimates.append(sorted_percentiles(np.sort(values[n_full:]), [statistic]))
+    return np.concatenate(estimates)
+
+
+def batch_standard_error(block_estimates):
+    """Standard error of the full-run estimate from independent per-block estimates."""
+    if len(block_estimates) < 2:
+        return np.nan
+    return np.std(block_estimates, ddof=1) / np.sqrt(len(block_estimates))
+
+
+def control_variate_adjust(samples, controls, control_mean):
+    """Per-path ``samples`` minus the optimal multiple of the control's deviation from its mean."""
+    control_deviation = controls - control_mean
+    variance = np.dot(control_deviation, control_deviation)
+    if variance == 0:
+        return samples
+    beta = np.dot(samples - samples.mean(), control_deviation) / variance
+    return samples - beta * control_deviation
+
+
+def fee_impact(prepared, n_years, initial_value):
+    """Return (gross_return, fee_impact_total, fee_cost_on_initial) over the horizon."""
+    gross_return = prepared.gross_return
+    fee_impact_total = (1 + gross_return) ** n_years / (1 + prepared.exp_nominal_return) ** n_years - 1
+    return gross_return, fee_impact_total, initial_value * fee_impact_total
+
+
+# --- 7. CALCULATE METRICS ---
+def compute_metrics(results):
+    """Compute ``SimulationMetrics`` from a ``SimulationResults``."""
+    if results.accumulator is not None:
+        return metrics_from_accumulator(results.accumulator, results.portfolio)
+    config = results.config
+    n_years = config.years
+    n_sims = len(results.final_portfolio_values)
+    final_portfolio_values = results.final_portfolio_values
+    final_sp500_values = results.final_sp500_values
+    portfolio_values_over_time = results.portfolio_values_over_time
+    withdrawals_history = results.withdrawals_history
+
+    inflation_adjustor = (1 + config.inflation_rate) ** n_years
+    final_real_values = final_portfolio_values / inflation_adjustor
+    final_sp500_real = final_sp500_values / inflation_adjustor
+
+    # Per-path samples behind the means; regression-adjusted with a control variate
+    depleted_samples = (final_portfolio_values < DEPLETION_THRESHOLD).astype(np.float64)
+    final_samples = final_portfolio_values.astype(np.float64)
+    goal_samples = {goal: (final_portfolio_values >= goal).astype(np.float64) for goal in GOALS}
+    if config.control_variate and results.control_values is not None:
+        controls, control_mean = results.control_values, results.portfolio.exp_nominal_return
+        depleted_samples = control_variate_adjust(depleted_samples, controls, control_mean)
+        final_samples = control_variate_adjust(final_samples, controls, control_mean)
+        goal_samples = {goal: control_variate_adjust(samples, controls, control_mean)
+                        for goal, samples in goal_samples.items()}
+
+    prob_depletion = float(np.clip(depleted_samples.mean(), 0, 1))
+    avg_end_nominal = final_samples.mean()
+    prob_beat_sp500_nominal = np.sum(final_portfolio_values > final_sp500_values) / n_sims
+    prob_beat_sp500_real = np.sum(final_real_values > final_sp500_real) / n_sims
+
+    # One sort per array; every quantile is read off it
+    p5_end_nominal, med_end_nominal, p95_end_nominal = sorted_percentiles(
+        np.sort(final_portfolio_values), (5, 50, 95)
+    )
+    path_bands, portfolio_max_drawdowns, portfolio_failure_years = scan_paths(
+        portfolio_values_over_time, PATH_PERCENTILES
+    )
+    median_max_drawdown, p95_max_drawdown = sorted_percentiles(np.sort(portfolio_max_drawdowns), (50, 95))
+    withdrawals_p5, withdrawals_median, withdrawals_p95 = row_percentiles(withdrawals_history, (5, 50, 95))
+    sp500_median_end_nominal = sorted_percentiles(np.sort(final_sp500_values), (50,))[0]
+    sp500_median_max_drawdown = sorted_percentiles(np.sort(results.sp500_max_drawdowns), (50,))[0]
+    depleted_mask = portfolio_failure_years <= n_years
+
+    # Path arrays may be float32; moments and means accumulate in float64
+    annual_returns = (final_portfolio_values.astype(np.float64) / config.initial_value) ** (1/n_years) - 1
+
+    sharpe_ratio = (annual_returns.mean() - RISK_FREE_RATE) / annual_returns.std()
+
+    downside_returns = annual_returns - RISK_FREE_RATE
+    downside_returns[downside_returns > 0] = 0
+    downside_std = np.sqrt(np.mean(downside_returns ** 2))
+    sortino_ratio = (annual_returns.mean() - RISK_FREE_RATE) / downside_std if downside_std > 0 else np.inf
+
+    goal_probabilities = {goal: float(np.clip(samples.mean(), 0, 1)) for goal, samples in goal_samples.items()}
+
+    samples = {'prob_depletion': depleted_samples, 'avg_end_nominal': final_samples}
+    standard_errors = {}
+    for name, (statistic, _) in STANDARD_ERROR_METRICS.items():
+        values = samples.get(name, final_portfolio_values)
+        standard_errors[name] = batch_standard_error(block_statistics(values, statistic))
+
+    gross_return, fee_impact_total, fee_cost_on_initial = fee_impact(
+        results.portfolio, n_years, config.initial_value
+    )
+
+    return SimulationMetrics(
+        n_paths=n_sims,
+        avg_end_nominal=avg_end_nominal,
+        med_end_nominal=med_end_nominal,
+        p5_end_nominal=p5_end_nominal,
+        p95_end_nominal=p95_end_nominal,
+        avg_end_real=avg_end_nominal / inflation_adjustor,
+        med_end_real=med_end_nominal / inflation_adjustor,
+        p5_end_real=p5_end_nominal / inflation_adjustor,
+        p95_end_real=p95_end_nominal / inflation_adjustor,
+        prob_depletion=prob_depletion,
+        prob_beat_sp500_nominal=prob_beat_sp500_nominal,
+        prob_beat_sp500_real=prob_beat_sp500_real,
+        median_max_drawdown=median_max_drawdown,
+        p95_max_drawdown=p95_max_drawdown,
+        n_depleted=int(depleted_mask.sum()),
+        median_failure_year=np.median(portfolio_failure_years[depleted_mask]) if depleted_mask.any() else np.nan,
+        sharpe_ratio=sharpe_ratio,
+        sortino_ratio=sortino_ratio,
+        goal_probabilities=goal_probabilities,
+        sp500_median_end_nominal=sp500_median_end_nominal,
+        sp500_median_end_real=sp500_median_end_nominal / inflation_adjustor,
+        sp500_median_max_drawdown=sp500_median_max_drawdown,
+        withdrawals_mean=withdrawals_history.mean(axis=1, dtype=np.float64),
+        withdrawals_median=withdrawals_median,
+        withdrawals_p5=withdrawals_p5,
+        withdrawals_p95=withdrawals_p95,
+        path_percentiles=dict(zip(PATH_PERCENTILES, path_bands)),
+        gross_return=gross_return,
+        fee_impact_total=fee_impact_total,
+        fee_cost_on_initial=fee_cost_on_initial,
+        standard_errors=standard_errors,
+    )
+
+
+def _histogram_median(counts):
+    """Median (np.median convention) of integer values given as per-value counts."""
+    cumulative = np.cumsum(counts)
+    n = cumulative[-1]
+    lower = np.searchsorted(cumulative, (n - 1) // 2, side='right')
+    upper = np.searchsorted(cumulative, n // 2, side='right')
+    return (lower + upper) / 2
+
+
+def metrics_from_accumulator(accumulator, prepared):
+    """Compute ``SimulationMetrics`` from a streaming ``PathAccumulator``.
+
+    Counts, probabilities and means are exact; quantiles come from the
+    accumulator's sketches (within 0.2% for dollar amounts, 0.01 percentage
+    points for drawdowns).
+    """
+    n_years = accumulator.n_years
+    n_sims = accumulator.n_paths
+    inflation_adjustor = (1 + accumulator.inflation_rate) ** n_years
+
+    p5_end, med_end, p95_end = accumulator.values.quantiles([5, 50, 95], row=n_years)
+    avg_end = accumulator.values.mean(row=n_years)
+    median_max_drawdown, p95_max_drawdown = accumulator.max_drawdowns.quantiles([50, 95])
+    sp500_median_end = accumulator.sp500_final.quantiles([50])[0]
+
+    failure_counts = accumulator.failure_year_counts[:n_years + 1]
+    n_depleted = int(failure_counts.sum())
+
+    mean_return = accumulator.return_sum / n_sims
+    return_std = np.sqrt(max(accumulator.return_sq_sum / n_sims - mean_return ** 2, 0.0))
+    sharpe_ratio = (mean_return - RISK_FREE_RATE) / return_std
+    downside_std = np.sqrt(accumulator.downside_sq_sum / n_sims)
+    sortino_ratio = (mean_return - RISK_FREE_RATE) / downside_std if downside_std > 0 else np.inf
+
+    withdrawals = accumulator.withdrawals
+    gross_return, fee_impact_total, fee_cost_on_initial = fee_impact(
+        prepared, n_years, accumulator.initial_value
+    )
+
+    return SimulationMetrics(
+        n_paths=n_sims,
+        avg_end_nominal=avg_end,
+        med_end_nominal=med_end,
+        p5_end_nominal=p5_end,
+        p95_end_nominal=p95_end,
+        avg_end_real=avg_end / inflation_adjustor,
+        med_end_real=med_end / inflation_adjustor,
+        p5_end_real=p5_end / inflation_adjustor,
+        p95_end_real=p95_end / inflation_adjustor,
+        prob_depletion=accumulator.n_depleted_final / n_sims,
+        prob_beat_sp500_nominal=accumulator.n_beat_sp500_nominal / n_sims,
+        prob_beat_sp500_real=accumulator.n_beat_sp500_real / n_sims,
+        median_max_drawdown=median_max_drawdown,
+        p95_max_drawdown=p95_max_drawdown,
+        n_depleted=n_depleted,
+        median_failure_year=_histogram_median(failure_counts) if n_depleted else np.nan,
+        sharpe_ratio=sharpe_ratio,
+        sortino_ratio=sortino_ratio,
+        goal_probabilities={goal: count / n_sims for goal, count in accumulator.goal_counts.items()},
+        sp500_median_end_nominal=sp500_median_end,
+        sp500_median_end_real=sp500_median_end / inflation_adjustor,
+        sp500_median_max_drawdown=accumulator.sp500_max_drawdowns.quantiles([50])[0],
+        withdrawals_mean=withdrawals.sums.sum(axis=1) / withdrawals.counts.sum(axis=1),
+        withdrawals_median=withdrawals.quantile_rows(50),
+        withdrawals_p5=withdrawals.quantile_rows(5),
+        withdrawals_p95=withdrawals.quantile_rows(95),
+        path_percentiles={p: accumulator.values.quantile_rows(p) for p in PATH_PERCENTILES},
+        gross_return=gross_return,
+        fee_impact_total=fee_impact_total,
+        fee_cost_on_initial=fee_cost_on_initial,
+    )
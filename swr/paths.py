@@ -0,0 +1,142 @@
+"""
+Memory-mapped per-path export: raw annual values, withdrawals and final
+values as ``.npy`` files plus a JSON manifest.
+
+``PathStore.create`` lays the files out at their final size before a run;
+``simulate(..., path_store=store)`` then has the kernels record each chunk's
+year-ends straight into the files (from every worker process), so the full
+history is never built in RAM and copied out. ``open_paths`` maps a finished
+export read-only; slicing a year or a block of paths reads only those pages.
+
+History arrays are (years + 1, paths) for values and (years, paths) for
+withdrawals, like ``SimulationResults``: a year is one contiguous row, a
+single path is a strided column.
+"""
+
+import json
+import os
+from dataclasses import asdict
+from pathlib import Path
+
+import numpy as np
+
+from .engine import AnnualPathRecorder
+
+MANIFEST_NAME = 'manifest.json'
+# Bump when the file layout or manifest fields change
+PATHS_FORMAT = 1
+# Array name -> axes; values have a row per year-end including the start
+PATH_ARRAYS = {
+    'portfolio_values_over_time': ('year', 'path'),
+    'withdrawals_history': ('year', 'path'),
+    'final_portfolio_values': ('path',),
+    'final_sp500_values': ('path',),
+    'sp500_max_drawdowns': ('path',),
+}
+
+
+class PathStore:
+    """Directory of pre-sized ``.npy`` files the engine fills in place.
+
+    Only the directory, sizes and dtype are held, so a store pickles cheaply
+    to worker processes; each process maps the files itself.
+    """
+
+    def __init__(self, directory, n_years, n_sims, dtype='float64'):
+        self.directory = Path(directory)
+        self.n_years = n_years
+        self.n_sims = n_sims
+        self.dtype = np.dtype(dtype)
+
+    @classmethod
+    def create(cls, directory, config):
+        """Allocate empty files for ``config`` under ``directory`` (overwriting an older export)."""
+        store = cls(directory, config.years, config.simulations, config.dtype)
+        store.directory.mkdir(parents=True, exist_ok=True)
+        # A stale manifest would describe files that are about to change
+        (store.directory / MANIFEST_NAME).unlink(missing_ok=True)
+        for name in PATH_ARRAYS:
+            array = np.lib.format.open_memmap(store.path(name), mode='w+', dtype=store.dtype,
+                                              shape=store.shape(name))
+            del array
+        return store
+
+    def path(self, name):
+        return self.directory / f'{name}.npy'
+
+    def shape(self, name):
+        if name == 'portfolio_values_over_time':
+            return (self.n_years + 1, self.n_sims)
+        if name == 'withdrawals_history':
+            return (self.n_years, self.n_sims)
+        return (self.n_sims,)
+
+    def open(self, mode='r'):
+        """Map every array (``mode`` as for ``np.load(mmap_mode=...)``) into a name -> memmap dict."""
+        return {name: np.load(self.path(name), mmap_mode=mode) for name in PATH_ARRAYS}
+
+    def recorder(self, start, stop, initial_value):
+        """``AnnualPathRecorder`` writing year-ends of paths [start, stop) into the files."""
+        values = np.load(self.path('portfolio_values_over_time'), mmap_mode='r+')
+        withdrawals = np.load(self.path('withdrawals_history'), mmap_mode='r+')
+        return AnnualPathRecorder(self.n_years, stop - start, initial_value, self.dtype,
+                                  annual_values=values[:, start:stop],
+                                  annual_withdrawals=withdrawals[:, start:stop])
+
+    def write_manifest(self, results):
+        """Flush ``results``' mapped arrays and describe the export in ``manifest.json``.
+
+        The manifest is written last (atomically), so its presence marks a
+        complete export.
+        """
+        config = results.config
+        arrays = {}
+        for name, axes in PATH_ARRAYS.items():
+            array = getattr(results, name)
+            if isinstance(array, np.memmap):
+                array.flush()
+            arrays[name] = {
+                'file': self.path(name).name,
+                'shape': list(self.shape(name)),
+                'dtype': self.dtype.name,
+                'axes': list(axes),
+            }
+        manifest = {
+            'format': PATHS_FORMAT,
+            'portfolio': results.portfolio.name,
+            'seed': results.seed,
+            'config': asdict(config),
+            'arrays': arrays,
+        }
+        tmp_path = self.directory / f'{MANIFEST_NAME}.tmp'
+        tmp_path.write_text(json.dumps(manifest, indent=2))
+        os.replace(tmp_path, self.directory / MANIFEST_NAME)
+        return self.directory / MANIFEST_NAME
+
+
+def read_manifest(directory):
+    """Parsed ``manifest.json`` of an export; raises ``FileNotFoundError`` for an incomplete one."""
+    manifest = json.loads((Path(directory) / MANIFEST_NAME).read_text())
+    if manifest.get('format') != PATHS_FORMAT:
+        raise ValueError(f"Unsupported path export format {manifest.get('format')!r} "
+                         f"(expected {PATHS_FORMAT})")
+    return manifest
+
+
+def open_paths(directory, mode='r'):
+    """Map a finished export's arrays without loading them: name -> ``np.memmap``.
+
+        paths = open_paths('outputs/raw_paths_Classic_Three-Fund_Bogleheads_v3')
+        path_42 = paths['portfolio_values_over_time'][:, 42]
+        year_30 = paths['withdrawals_history'][29]
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        array = np.load(directory / spec['file'], mmap_mode=mode)
+        if list(array.shape) != spec['shape'] or array.dtype.name != spec['dtype']:
+            raise ValueError(f"{spec['file']} does not match the manifest "
+                             f"({array.shape} {array.dtype} vs {tuple(spec['shape'])} {spec['dtype']})")
+        arrays[name] = array
+    return arrays
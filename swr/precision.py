@@ -0,0 +1,91 @@
+"""
+float32 accuracy check: rerun a configuration in float64 on the same seed
+and compare the headline metrics.
+
+Depletion probability, median/P5/P95 and average ending values are stable
+in float32. Figures computed from the sub-dollar residue of depleted paths
+(Sharpe/Sortino ratios, beat-S&P probabilities when both portfolios are
+depleted) are not: float32 rounds that residue to zero far sooner than
+float64, so they are not part of the check.
+"""
+
+from dataclasses import dataclass, replace
+
+# Depletion probability: absolute difference (0.01 percentage points)
+DEPLETION_TOLERANCE = 1e-4
+# Dollar amounts: relative difference (0.01%), or within a dollar
+VALUE_RTOL = 1e-4
+VALUE_ATOL = 1.0
+
+# (SimulationMetrics field, label, is a dollar amount)
+HEADLINE_METRICS = (
+    ('prob_depletion', 'Probability of Depletion', False),
+    ('med_end_nominal', 'Median Ending Value', True),
+    ('p5_end_nominal', '5th Percentile', True),
+    ('p95_end_nominal', '95th Percentile', True),
+    ('avg_end_nominal', 'Average Ending Value', True),
+)
+
+
+@dataclass
+class MetricComparison:
+    """One headline metric in float32 and float64."""
+    label: str
+    value: float
+    reference: float
+    tolerance: float
+    is_dollars: bool
+
+    @property
+    def difference(self):
+        return abs(self.value - self.reference)
+
+    @property
+    def passed(self):
+        return self.difference <= self.tolerance
+
+
+@dataclass
+class PrecisionCheck:
+    """Output of ``validate_precision``."""
+    seed: int
+    comparisons: list
+
+    @property
+    def passed(self):
+        return all(comparison.passed for comparison in self.comparisons)
+
+    @property
+    def failures(self):
+        return [comparison for comparison in self.comparisons if not comparison.passed]
+
+
+def validate_precision(results, log=None):
+    """Compare a float32 ``SimulationResults`` against float64 on the same seed.
+
+    Runs the reference simulation with ``dtype='float64'`` and otherwise the
+    same configuration and ``results.seed``, so both runs use the same random
+    draws (float32 stores them rounded). Returns a ``PrecisionCheck``.
+    """
+    from .engine import simulate
+
+    config = replace(results.config, dtype='float64', seed=results.seed)
+    if log:
+        log("Validating float32 against a float64 run on the same seed...")
+    reference = simulate(config, prepared=results.portfolio)
+
+    comparisons = []
+    for field, label, is_dollars in HEADLINE_METRICS:
+        reference_value = float(getattr(reference.metrics, field))
+        if is_dollars:
+            tolerance = max(VALUE_RTOL * abs(reference_value), VALUE_ATOL)
+        else:
+            tolerance = DEPLETION_TOLERANCE
+        comparisons.append(MetricComparison(
+            label=label,
+            value=float(getattr(results.metrics, field)),
+            reference=reference_value,
+            tolerance=tolerance,
+            is_dollars=is_dollars,
+        ))
+    return PrecisionCheck(seed=results.seed, comparisons=comparisons)
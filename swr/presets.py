@@ -0,0 +1,126 @@
+"""
+Default simulation parameters and portfolio presets.
+"""
+
+import numpy as np
+
+# --- 1. SIMULATION PARAMETERS ---
+N_SIMULATIONS = 100_000      # Number of simulated paths
+N_YEARS = 50                 # Simulation duration in years
+INITIAL_VALUE = 1_000_000.0  # Starting portfolio value in dollars
+
+# Withdrawal parameters (decimal: 0.03 = 3%)
+# Uses constant dollar withdrawal strategy: withdraw X% of INITIAL portfolio value
+# in year 1, then adjust for inflation each subsequent year.
+# Note: Command-line argument accepts percentage (3.0) and converts to decimal
+WITHDRAWAL_RATE = 0.03  # 3% of initial portfolio value (as decimal)
+
+# Dynamic spending bounds (decimal, relative to inflation-adjusted prior year)
+DYNAMIC_FLOOR_PCT = 0.025
+DYNAMIC_CEILING_PCT = 0.05
+
+# Inflation (for real return comparison)
+INFLATION_RATE = 0.025  # 2.5% annual inflation
+
+# Investment fees (BEYOND individual ETF expense ratios)
+ADDITIONAL_FEE = 0.00  # 0.00% = DIY investor (just ETF expenses)
+                        # 0.0025 = 0.25% robo-advisor fee
+                        # 0.01 = 1.00% traditional advisor fee
+
+# Black swan modeling (optional)
+BLACK_SWAN_MODE = False  # Set to True to model fat tails
+
+# --- 2. PORTFOLIO DEFINITIONS ---
+
+def arithmetic_to_geometric(arith_mean, std_dev):
+    """Convert arithmetic mean to geometric mean."""
+    return arith_mean - (std_dev ** 2) / 2
+
+# Portfolio Preset 1: Dividend-Focused (Your Original)
+PORTFOLIO_1 = {
+    'name': 'Dividend-Focused Portfolio',
+    'description': 'Heavy dividend tilt with growth and treasuries',
+    'assets': {
+        'VTI':  {'arith_mean': 0.10,  'sd': 0.17, 'weight': 0.35, 'er': 0.0003, 'name': 'Vanguard Total Stock Market'},
+        'SCHG': {'arith_mean': 0.105, 'sd': 0.18, 'weight': 0.15, 'er': 0.0004, 'name': 'Schwab US Large-Cap Growth'},
+        'SCHD': {'arith_mean': 0.115, 'sd': 0.17, 'weight': 0.30, 'er': 0.0006, 'name': 'Schwab US Dividend Equity'},
+        'SGOV': {'arith_mean': 0.04,  'sd': 0.02, 'weight': 0.20, 'er': 0.0009, 'name': 'iShares 0-3 Month Treasury'}
+    },
+    'correlation': np.array([
+        [1.00, 0.90, 0.80, 0.10],  # VTI
+        [0.90, 1.00, 0.70, 0.10],  # SCHG
+        [0.80, 0.70, 1.00, 0.15],  # SCHD
+        [0.10, 0.10, 0.15, 1.00]   # SGOV
+    ])
+}
+
+# Portfolio Preset 2: Classic Three-Fund Bogleheads
+PORTFOLIO_2 = {
+    'name': 'Classic Three-Fund Bogleheads',
+    'description': 'The ultimate simple, diversified portfolio',
+    'assets': {
+        'VTI':  {'arith_mean': 0.10,  'sd': 0.17, 'weight': 0.54, 'er': 0.0003, 'name': 'Vanguard Total Stock Market'},
+        'VXUS': {'arith_mean': 0.08,  'sd': 0.18, 'weight': 0.26, 'er': 0.0007, 'name': 'Vanguard Total International Stock'},
+        'BND':  {'arith_mean': 0.04,  'sd': 0.03, 'weight': 0.20, 'er': 0.0003, 'name': 'Vanguard Total Bond Market'}
+    },
+    'correlation': np.array([
+        [1.00, 0.85, 0.15],  # VTI
+        [0.85, 1.00, 0.10],  # VXUS
+        [0.15, 0.10, 1.00]   # BND
+    ])
+}
+
+# Portfolio Preset 3: Golden Butterfly / All-Weather
+PORTFOLIO_3 = {
+    'name': 'Golden Butterfly (All-Weather)',
+    'description': 'Designed for all market conditions with gold',
+    'assets': {
+        'VTI':  {'arith_mean': 0.10,  'sd': 0.17, 'weight': 0.30, 'er': 0.0003, 'name': 'Vanguard Total Stock Market'},
+        'VXUS': {'arith_mean': 0.08,  'sd': 0.18, 'weight': 0.10, 'er': 0.0007, 'name': 'Vanguard Total International'},
+        'SHY':  {'arith_mean': 0.025, 'sd': 0.01, 'weight': 0.20, 'er': 0.0015, 'name': 'iShares 1-3 Year Treasury'},
+        'TLT':  {'arith_mean': 0.05,  'sd': 0.12, 'weight': 0.20, 'er': 0.0015, 'name': 'iShares 20+ Year Treasury'},
+        'GLD':  {'arith_mean': 0.045, 'sd': 0.16, 'weight': 0.20, 'er': 0.0040, 'name': 'SPDR Gold Trust'}
+    },
+    'correlation': np.array([
+        [1.00, 0.85, 0.10, -0.05, 0.00],  # VTI
+        [0.85, 1.00, 0.10, -0.05, 0.00],  # VXUS
+        [0.10, 0.10, 1.00,  0.40, 0.05],  # SHY
+        [-0.05, -0.05, 0.40, 1.00, 0.10],  # TLT
+        [0.00, 0.00, 0.05, 0.10, 1.00]    # GLD
+    ])
+}
+
+# Portfolio Preset 4: Modern Bogleheads with TIPS and REITs
+PORTFOLIO_4 = {
+    'name': 'Modern Bogleheads (TIPS & REITs)',
+    'description': 'Enhanced diversification with inflation protection',
+    'assets': {
+        'VTI':  {'arith_mean': 0.10,  'sd': 0.17, 'weight': 0.40, 'er': 0.0003, 'name': 'Vanguard Total Stock Market'},
+        'VXUS': {'arith_mean': 0.08,  'sd': 0.18, 'weight': 0.20, 'er': 0.0007, 'name': 'Vanguard Total International'},
+        'VNQ':  {'arith_mean': 0.09,  'sd': 0.20, 'weight': 0.10, 'er': 0.0012, 'name': 'Vanguard Real Estate ETF'},
+        'VTIP': {'arith_mean': 0.03,  'sd': 0.03, 'weight': 0.15, 'er': 0.0004, 'name': 'Vanguard Short-Term TIPS'},
+        'BND':  {'arith_mean': 0.04,  'sd': 0.03, 'weight': 0.15, 'er': 0.0003, 'name': 'Vanguard Total Bond Market'}
+    },
+    'correlation': np.array([
+        [1.00, 0.85, 0.75, 0.10, 0.15],  # VTI
+        [0.85, 1.00, 0.70, 0.10, 0.10],  # VXUS
+        [0.75, 0.70, 1.00, 0.20, 0.20],  # VNQ
+        [0.10, 0.10, 0.20, 1.00, 0.70],  # VTIP
+        [0.15, 0.10, 0.20, 0.70, 1.00]   # BND
+    ])
+}
+
+# All portfolios
+PORTFOLIOS = {
+    1: PORTFOLIO_1,
+    2: PORTFOLIO_2,
+    3: PORTFOLIO_3,
+    4: PORTFOLIO_4
+}
+
+# S&P 500 Proxy (for comparison)
+SP500_PROXY = {
+    'mean': arithmetic_to_geometric(0.10, 0.16),
+    'sd': 0.16,
+    'er': 0.0003  # VOO/SPY expense ratio
+}
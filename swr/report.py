@@ -0,0 +1,414 @@
+"""
+Console report (section 8) and CSV export (section 9).
+
+Tables are ``swr.tables.Table``; pandas is not needed to print or export.
+"""
+
+import numpy as np
+
+from .metrics import DEPLETION_THRESHOLD, GOALS, STANDARD_ERROR_METRICS
+from .returns import SEED_BLOCK_SIZE
+from .presets import arithmetic_to_geometric
+from .strategies import strategy_for
+from .tables import Table
+
+
+def portfolio_name_safe(name):
+    """File-name-safe version of a portfolio name used in outputs/."""
+    return name.replace(' ', '_').replace('/', '_')
+
+
+def build_results_table(metrics):
+    """Headline metrics table (formatted strings, as printed and exported)."""
+    results_data = {
+        "Metric": [
+            "Average Ending Value",
+            "Median Ending Value",
+            "5th Percentile",
+            "95th Percentile",
+            "Probability of Depletion",
+            "Median Max Drawdown",
+            "95th %ile Max Drawdown"
+        ],
+        "Nominal Value": [
+            f"${metrics.avg_end_nominal:,.0f}",
+            f"${metrics.med_end_nominal:,.0f}",
+            f"${metrics.p5_end_nominal:,.0f}",
+            f"${metrics.p95_end_nominal:,.0f}",
+            f"{metrics.prob_depletion:.2%}",
+            f"{metrics.median_max_drawdown:.1%}",
+            f"{metrics.p95_max_drawdown:.1%}"
+        ],
+        "Real Value (Today's $)": [
+            f"${metrics.avg_end_real:,.0f}",
+            f"${metrics.med_end_real:,.0f}",
+            f"${metrics.p5_end_real:,.0f}",
+            f"${metrics.p95_end_real:,.0f}",
+            "N/A",
+            "N/A",
+            "N/A"
+        ]
+    }
+    return Table(results_data)
+
+
+def build_withdrawals_table(metrics):
+    """Per-year withdrawal statistics."""
+    return Table({
+        "Year": np.arange(1, len(metrics.withdrawals_mean) + 1),
+        "Average": metrics.withdrawals_mean,
+        "Median": metrics.withdrawals_median,
+        "5th %ile": metrics.withdrawals_p5,
+        "95th %ile": metrics.withdrawals_p95
+    })
+
+
+def build_paths_table(metrics, inflation_rate):
+    """Year-end percentile bands of portfolio value, nominal and real."""
+    bands = metrics.path_percentiles
+    n_points = len(bands[50])
+    deflator = (1 + inflation_rate) ** np.arange(n_points)
+    return Table({
+        'Year': np.arange(n_points),
+        'P5_Nominal': bands[5],
+        'P25_Nominal': bands[25],
+        'P50_Nominal': bands[50],
+        'P75_Nominal': bands[75],
+        'P95_Nominal': bands[95],
+        'P5_Real': bands[5] / deflator,
+        'P50_Real': bands[50] / deflator,
+        'P95_Real': bands[95] / deflator,
+    })
+
+
+# --- 8. DISPLAY RESULTS ---
+def print_report(results):
+    """Print the full console report for a ``SimulationResults``."""
+    config = results.config
+    prepared = results.portfolio
+    metrics = results.metrics
+    n_years = config.years
+    initial_value = config.initial_value
+    withdrawal_rate = config.withdrawal_rate
+
+    print("\n" + "="*70)
+    print("MONTE CARLO PORTFOLIO RETIREMENT SIMULATOR v3.2")
+    print("="*70)
+    print(f"\n--- Selected Portfolio: {prepared.name} ---")
+    print(f"Description: {prepared.description}\n")
+
+    print("--- Simulation Setup ---")
+    print(f"Initial Portfolio Value: ${initial_value:,.0f}")
+
+    strategy = strategy_for(config)
+    print(f"Withdrawal Strategy: {strategy.label}")
+    for line in strategy.describe(config):
+        print(line)
+
+    print(f"  - Timing: Returns applied first, withdrawals at END of month")
+    print(f"Simulation: {metrics.n_paths:,} paths over {n_years} years ({n_years * 12:,} months)")
+    print(f"Rebalancing: Annual rebalancing to target weights")
+    print(f"Return Type: Geometric means (volatility-adjusted)")
+    print(f"Distribution: {describe_distribution(config)}")
+    if results.seed is not None:
+        print(f"Random Seed: {results.seed}")
+    if config.streaming:
+        print(f"Statistics: Streaming sketches (percentiles within 0.2%)")
+    if config.dtype != 'float64':
+        print(f"Precision: {config.dtype}")
+    if config.sampling != 'standard' or config.control_variate:
+        print(f"Variance Reduction: {describe_variance_reduction(config)}")
+    if config.benchmark_correlation is not None:
+        print(f"S&P 500 Benchmark: shocks correlated {config.benchmark_correlation:+.2f} with the portfolio's")
+    print()
+
+    print("--- Portfolio Allocation ---")
+    for ticker, params in prepared.assets.items():
+        geom_before_fees = arithmetic_to_geometric(params['arith_mean'], params['sd'])
+        geom_after_fees = geom_before_fees - params['er'] - prepared.additional_fee
+        print(f"{ticker:5s}: {params['weight']:5.1%} | ER: {params['er']:.4%} | "
+              f"Arith: {params['arith_mean']:5.1%} | Geom: {geom_before_fees:5.1%} | "
+              f"After Fees: {geom_after_fees:5.1%} | Vol: {params['sd']:5.1%}")
+
+    print("\n--- Fee Breakdown ---")
+    print(f"Portfolio Blended Expense Ratio: {prepared.blended_er:.4%}")
+    if prepared.additional_fee > 0:
+        print(f"Additional Advisor/Platform Fee: {prepared.additional_fee:.4%}")
+    print(f"Total Annual Fee: {prepared.total_fee:.4%}")
+    print(f"Gross Return (before all fees): {metrics.gross_return:.2%}")
+    print(f"Net Return (after all fees): {prepared.exp_nominal_return:.2%}")
+    print(f"Fee drag over {n_years} years: {metrics.fee_impact_total:.1%}")
+    print(f"Cost of fees on ${initial_value:,.0f}: ${metrics.fee_cost_on_initial:,.0f}")
+
+    print("\n" + "-"*70)
+    print("\n--- PORTFOLIO PERFORMANCE SUMMARY ---")
+    print(build_results_table(metrics).to_string())
+
+    if metrics.standard_errors:
+        print_standard_errors(metrics, config)
+    if results.adaptive is not None:
+        print_adaptive_run(results.adaptive)
+
+    print("\n" + "-"*70)
+    print("\n--- WITHDRAWAL ANALYSIS ---")
+    withdrawals_df = build_withdrawals_table(metrics)
+    print("First 10 Years:")
+    print(withdrawals_df.head(10).to_string(float_format=lambda x: f'${x:,.0f}'))
+    print("\nLast 10 Years:")
+    print(withdrawals_df.tail(10).to_string(float_format=lambda x: f'${x:,.0f}'))
+
+    print("\n" + "-"*70)
+    print("\n--- RISK METRICS ---")
+    print(f"Portfolio Sharpe Ratio: {metrics.sharpe_ratio:.2f}")
+    print(f"Portfolio Sortino Ratio: {metrics.sortino_ratio:.2f}")
+    print(f"Median Maximum Drawdown: {metrics.median_max_drawdown:.1%}")
+    print(f"Worst Drawdown (95th %ile): {metrics.p95_max_drawdown:.1%}")
+
+    if metrics.n_depleted:
+        print(f"\nPortfolios Depleted: {metrics.n_depleted:,} ({metrics.n_depleted / metrics.n_paths:.2%})")
+        print(f"Median Failure Year: {metrics.median_failure_year:.0f}")
+    else:
+        print(f"\nPortfolios Depleted: None (0.00%)")
+
+    print("\n" + "-"*70)
+    print("\n--- GOAL PROBABILITY ANALYSIS ---")
+    print("Probability of reaching target by end of simulation:")
+    for goal in GOALS:
+        prob = metrics.goal_probabilities[goal]
+        print(f"  ${goal:>10,}: {prob:>6.1%}")
+
+    print("\n" + "-"*70)
+    print("\n--- BENCHMARK COMPARISON (S&P 500) ---")
+    print(f"S&P 500 Median Ending (Nominal): ${metrics.sp500_median_end_nominal:,.0f}")
+    print(f"S&P 500 Median Ending (Real):    ${metrics.sp500_median_end_real:,.0f}")
+    print(f"Portfolio Beats S&P 500 (Nominal): {metrics.prob_beat_sp500_nominal:.1%}")
+    print(f"Portfolio Beats S&P 500 (Real):    {metrics.prob_beat_sp500_real:.1%}")
+    print(f"S&P 500 Median Max Drawdown: {metrics.sp500_median_max_drawdown:.1%}")
+
+    print("\n" + "-"*70)
+    print("\n--- EXPECTED RETURNS ---")
+    print(f"Portfolio Exp. Nominal (before fees): {metrics.gross_return:.2%}")
+    print(f"Portfolio Exp. Nominal (after fees):  {prepared.exp_nominal_return:.2%}")
+    print(f"Portfolio Exp. Real (after fees):     {prepared.exp_real_return:.2%}")
+
+
+def describe_distribution(config):
+    """One-line description of where the returns come from."""
+    if config.return_source == 'parametric':
+        return 'Multivariate Student t (df=5) - Fat tails' if config.fat_tails else 'Normal - Standard Monte Carlo'
+    from .historical import load_history
+
+    history = load_history(config.history_file).describe()
+    sources = {
+        'bootstrap': f"Historical bootstrap of single years ({history})",
+        'block_bootstrap': f"Historical block bootstrap, mean block {config.block_length:g} years ({history})",
+        'rolling': f"Rolling historical sequences ({history})",
+    }
+    return sources[config.return_source]
+
+
+def describe_variance_reduction(config):
+    """One-line description of the sampling method and control variate."""
+    methods = {
+        'standard': "Independent draws",
+        'antithetic': "Antithetic pairs",
+        'qmc': "Scrambled Sobol quasi-Monte Carlo",
+    }
+    description = methods[config.sampling]
+    if config.control_variate:
+        description += " + control variate (mean portfolio return)"
+    return description
+
+
+def print_standard_errors(metrics, config):
+    """Standard error of each estimate in ``STANDARD_ERROR_METRICS``, with relative precision."""
+    n_blocks = -(-metrics.n_paths // SEED_BLOCK_SIZE)
+    print(f"\nStandard errors ({describe_variance_reduction(config)}; "
+          f"batch means over {n_blocks:,} blocks of {SEED_BLOCK_SIZE:,} paths):")
+    for field, (_, label) in STANDARD_ERROR_METRICS.items():
+        value = getattr(metrics, field)
+        error = metrics.standard_errors[field]
+        if field == 'prob_depletion':
+            print(f"  {label:26s} {value:>14.2%} ± {error:.3%}")
+        else:
+            # Depleted quantiles sit at a sub-dollar residue; a relative error is meaningless there
+            relative = f" ({error / value:.2%})" if value >= DEPLETION_THRESHOLD else ""
+            print(f"  {label:26s} {f'${value:,.0f}':>14s} ± ${error:,.0f}{relative}")
+
+
+def print_adaptive_run(adaptive):
+    """Paths used by an adaptive run and each tracked interval against its target."""
+    outcome = "all targets met" if adaptive.converged else "path cap reached before every target was met"
+    print(f"\nAdaptive run length: {adaptive.n_paths:,} of at most {adaptive.max_paths:,} paths "
+          f"({adaptive.n_batches} batches of up to {adaptive.batch_size:,}; {outcome})")
+    print(f"  {'Metric':20s} {'Estimate':>14s} {f'{adaptive.confidence:.0%} CI ±':>12s} {'Target ±':>12s}  Status")
+    for metric in adaptive.tracked:
+        status = "OK (depleted)" if metric.in_depleted_tail else "OK" if metric.met else "WIDE"
+        print(f"  {metric.name:20s} {metric.format(metric.estimate):>14s} {metric.format(metric.half_width):>12s} "
+              f"{metric.format(metric.target):>12s}  {status}")
+
+
+# --- 9. EXPORT TO CSV ---
+def export_csv(results, output_dir):
+    """Write results/withdrawals/paths CSVs to ``output_dir``; return the file names."""
+    metrics = results.metrics
+    output_dir.mkdir(exist_ok=True)
+    name_safe = portfolio_name_safe(results.portfolio.name)
+
+    files = [
+        f'results_{name_safe}_v3.csv',
+        f'withdrawals_{name_safe}_v3.csv',
+        f'paths_{name_safe}_v3.csv',
+    ]
+    build_results_table(metrics).to_csv(output_dir / files[0])
+    build_withdrawals_table(metrics).to_csv(output_dir / files[1])
+    build_paths_table(metrics, results.config.inflation_rate).to_csv(output_dir / files[2])
+    return files
+
+
+def _swr_text(rate, limit=""):
+    """A solved rate as a percentage, or "none" where no rate meets its success level."""
+    return f"{limit}{rate:.2%}" if np.isfinite(rate) else "none"
+
+
+def build_swr_table(solution):
+    """Max safe withdrawal rate per target success level, with its confidence interval."""
+    rows = {"Target Success": [], "Max SWR": [], "CI Low": [], "CI High": [], "Year 1 Withdrawal": []}
+    for swr in solution.rates:
+        limit = "≥" if swr.at_search_limit else ""
+        rows["Target Success"].append(f"{swr.target_success:.1%}")
+        rows["Max SWR"].append(_swr_text(swr.rate, limit))
+        rows["CI Low"].append(_swr_text(swr.ci_low))
+        rows["CI High"].append(_swr_text(swr.ci_high, limit))
+        rows["Year 1 Withdrawal"].append(f"${solution.config.initial_value * swr.rate:,.0f}"
+                                         if swr.feasible else "none")
+    return Table(rows)
+
+
+def print_swr_report(solution):
+    """Print the safe-withdrawal-rate solver output for an ``SWRSolution``."""
+    config = solution.config
+    prepared = solution.portfolio
+    strategy = strategy_for(config).label
+
+    print("\n" + "="*70)
+    print("SAFE WITHDRAWAL RATE SOLVER v3.2")
+    print("="*70)
+    print(f"\n--- Selected Portfolio: {prepared.name} ---")
+    print(f"Withdrawal Strategy: {strategy}")
+    print(f"Simulation: {config.simulations:,} paths over {config.years} years")
+    print(f"Distribution: {describe_distribution(config)}")
+    print(f"Random Seed: {solution.seed}")
+    print(f"Search: {solution.n_evaluations} evaluations on one set of returns "
+          f"(common random numbers), resolution 0.01%")
+    print()
+    print(f"--- MAXIMUM SAFE WITHDRAWAL RATE ({solution.confidence:.0%} confidence interval) ---")
+    print(build_swr_table(solution).to_string())
+    for swr in solution.rates:
+        if not swr.feasible:
+            print(f"\nNo withdrawal rate reaches {swr.target_success:.1%} success: even at 0% the "
+                  f"strategy's own spending (e.g. its floor) depletes too many paths")
+    if solution.path_rates is None:
+        print(f"\n{strategy} is not monotone in the rate: success was counted on a grid of rates")
+    else:
+        # Percentiles next to NO_SUSTAINABLE_RATE (-inf) paths come out NaN, shown as "none"
+        with np.errstate(invalid='ignore'):
+            median, fifth = np.median(solution.path_rates), np.percentile(solution.path_rates, 5)
+        print(f"\nPer-path sustainable rate: median {_swr_text(median)}, 5th %ile {_swr_text(fifth)}")
+
+
+def export_swr_csv(solution, output_dir):
+    """Write the solver table to ``output_dir``; return the file names."""
+    output_dir.mkdir(exist_ok=True)
+    name_safe = portfolio_name_safe(solution.portfolio.name)
+    files = [f'swr_{name_safe}_{solution.config.strategy}_v3.csv']
+    build_swr_table(solution).to_csv(output_dir / files[0])
+    return files
+
+
+def print_precision_check(check):
+    """Print the float32 vs float64 comparison from ``validate_precision``."""
+    print("\n" + "-"*70)
+    print(f"\n--- PRECISION CHECK (float32 vs float64, seed {check.seed}) ---")
+    rows = {"Metric": [], "float32": [], "float64": [], "Difference": [], "Tolerance": [], "Status": []}
+    for comparison in check.comparisons:
+        if comparison.is_dollars:
+            formatted = [f"${x:,.2f}" for x in (comparison.value, comparison.reference,
+                                                comparison.difference, comparison.tolerance)]
+        else:
+            formatted = [f"{x:.4%}" for x in (comparison.value, comparison.reference,
+                                              comparison.difference, comparison.tolerance)]
+        rows["Metric"].append(comparison.label)
+        for column, text in zip(("float32", "float64", "Difference", "Tolerance"), formatted):
+            rows[column].append(text)
+        rows["Status"].append("OK" if comparison.passed else "FAIL")
+    print(Table(rows).to_string())
+    if check.passed:
+        print("\nfloat32 results match float64 within tolerance.")
+    else:
+        print(f"\nWARNING: {len(check.failures)} metric(s) differ from float64 beyond tolerance; "
+              f"rerun with --dtype float64.")
+
+
+def print_sensitivity_report(analysis):
+    """Print the sensitivity table of a ``swr.sensitivity.SensitivityAnalysis``.
+
+    Rates are shown per +1 percentage point, correlations per +0.10.
+    """
+    config = analysis.config
+    print("\n" + "="*70)
+    print("DEPLETION PROBABILITY SENSITIVITY")
+    print("="*70)
+    print(f"\n--- Selected Portfolio: {analysis.portfolio.name} ---")
+    print(f"Withdrawal Strategy: {strategy_for(config).label} at {config.withdrawal_rate:.1%}")
+    print(f"Simulation: {config.simulations:,} paths over {config.years} years, {analysis.n_scenarios} scenarios "
+          f"on shared draws (common random numbers)")
+    print(f"Random Seed: {analysis.seed}")
+    print(f"Base Depletion Probability: {analysis.base_probability:.2%} (±{analysis.base_standard_error:.2%})")
+    print()
+    rows = {"Parameter": [], "Value": [], "Bump": [], "Down": [], "Up": [], "Change": [], "Std Error": []}
+    for sensitivity in analysis.sensitivities:
+        parameter = sensitivity.parameter
+        is_correlation = parameter.kind == 'correlation'
+        unit = 0.10 if is_correlation else 0.01
+        rows["Parameter"].append(parameter.name)
+        rows["Value"].append(f"{parameter.value:.2f}" if is_correlation else f"{parameter.value:.2%}")
+        rows["Bump"].append(f"±{parameter.bump:.2f}" if is_correlation else f"±{parameter.bump:.2%}")
+        rows["Down"].append(f"{sensitivity.prob_down:.2%}")
+        rows["Up"].append(f"{sensitivity.prob_up:.2%}")
+        rows["Change"].append(f"{sensitivity.derivative * unit:+.2%} per +{'0.10' if is_correlation else '1pp'}")
+        rows["Std Error"].append(f"±{sensitivity.standard_error * unit:.2%}")
+    print(Table(rows).to_string())
+
+
+def print_batch_report(table):
+    """Print the combined scenario table from ``swr.batch.build_batch_table``."""
+    print("\n" + "="*70)
+    print(f"BATCH SCENARIO RESULTS ({len(table)} scenarios)")
+    print("="*70)
+    shown = table[['scenario', 'prob_depletion', 'se_prob_depletion', 'med_end_nominal', 'p5_end_nominal',
+                   'median_max_drawdown', 'withdrawal_year1_median']]
+    print(shown.to_string(formatters={
+        'prob_depletion': '{:.2%}'.format,
+        'se_prob_depletion': lambda x: f"±{x:.2%}",
+        'med_end_nominal': '${:,.0f}'.format,
+        'p5_end_nominal': '${:,.0f}'.format,
+        'median_max_drawdown': '{:.1%}'.format,
+        'withdrawal_year1_median': '${:,.0f}'.format,
+    }))
+
+
+def print_profile(profile):
+    """Print the per-phase table from ``PhaseProfiler.to_dict()``.
+
+    Worker-process phases are summed, so with --workers the phase total can
+    exceed the wall time.
+    """
+    print("\n" + "-"*70)
+    print(f"\n--- PROFILE ({profile['wall_seconds']:.2f}s wall, {profile['phase_seconds']:.2f}s in phases) ---")
+    print(f"{'Phase':22s} {'Seconds':>9s} {'Share':>7s} {'Calls':>6s} {'Traced MB':>10s} {'RSS MB':>8s}")
+    for phase in profile['phases']:
+        share = phase['seconds'] / profile['phase_seconds'] if profile['phase_seconds'] else 0.0
+        traced = f"{phase['traced_peak_mb']:10.1f}" if phase['traced_peak_mb'] is not None else f"{'n/a':>10s}"
+        rss = f"{phase['rss_peak_mb']:8.0f}" if phase['rss_peak_mb'] is not None else f"{'n/a':>8s}"
+        print(f"{phase['name']:22s} {phase['seconds']:9.3f} {share:7.1%} {phase['calls']:6d} {traced} {rss}")
@@ -0,0 +1,273 @@
+"""
+Random annual return generation for the portfolio assets and the S&P 500 proxy.
+
+Besides independent draws (``'standard'``) two variance-reduction samplers
+are available, both applied per seed block so results stay independent of
+chunking: ``'antithetic'`` pairs every path with its mirror image about the
+mean (paths 2k and 2k + 1), and ``'qmc'`` maps a scrambled Sobol sequence
+through the inverse normal (or t) CDF and the Cholesky factor of
+``cov_matrix``. Each seed block is an independent scrambling, so block-level
+estimates give an honest standard error (see ``swr.metrics``).
+
+S&P 500 draws are independent of the portfolio's unless a
+``benchmark_correlation`` is given; the benchmark's shock is then mixed with
+the portfolio's standardized return shock (see ``correlate_benchmark``).
+``chunk_returns`` dispatches on ``SimulationConfig.return_source``: the
+parametric draws here, or resampled history from ``swr.historical``.
+
+Fat-tail asset returns are multivariate Student t: normal shocks through the
+portfolio's Cholesky factor, all assets of a path-year scaled by one shared
+chi-square mixing variable. Each asset is still ``sd * t(df)`` around its
+mean, but the assets keep ``cov_matrix``'s correlations and crash together.
+The S&P 500 proxy draws its own t variates.
+"""
+
+import numpy as np
+
+from .presets import SP500_PROXY
+
+# Cap returns at realistic bounds to prevent mathematical impossibilities:
+# can't lose more than 95% in a year, and cap gains at 500%
+RETURN_FLOOR = -0.95
+RETURN_CAP = 5.0
+
+# Degrees of freedom for the fat-tail (Student's t) mode
+FAT_TAIL_DF = 5
+
+# Paths are drawn in fixed blocks of this many paths, block ``i`` from its own
+# stream ``SeedSequence(seed, spawn_key=(i,))``. A path's returns therefore
+# depend only on the seed and its index, never on chunking or worker count.
+SEED_BLOCK_SIZE = 1_000
+
+
+
+# --- 6. GENERATE RANDOM RETURNS ---
+def generate_returns(prepared, n_years, n_sims, fat_tails=False, rng=None, sampling='standard',
+                     benchmark_correlation=None, scratch=None, out=None):
+    """Draw annual returns for the portfolio assets and the S&P 500 proxy.
+
+    Returns ``(multi_asset_returns, annual_sp500_returns)`` shaped
+    (n_years, n_sims, n_assets) and (n_years, n_sims), clipped to
+    [RETURN_FLOOR, RETURN_CAP]. ``sampling`` is one of
+    ``swr.engine.SAMPLING_METHODS``; with ``benchmark_correlation`` the S&P
+    500 returns pass through ``correlate_benchmark``. Standard fat-tail
+    draws take their float64 work arrays from ``scratch`` (a
+    ``ShockScratch``) if given; the asset returns are then a view into it,
+    valid until its next use, unless ``out`` (an array or view of their
+    shape, float64 or float32) is given to clip them into.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if sampling == 'antithetic':
+        returns = _antithetic_returns(prepared, n_years, n_sims, fat_tails, rng)
+    elif sampling == 'qmc':
+        returns = _sobol_returns(prepared, n_years, n_sims, fat_tails, rng)
+    else:
+        returns = _independent_returns(prepared, n_years, n_sims, fat_tails, rng, scratch, out)
+    if benchmark_correlation is None:
+        return returns
+    multi_asset_returns, annual_sp500_returns = returns
+    return multi_asset_returns, correlate_benchmark(prepared, multi_asset_returns, annual_sp500_returns,
+                                                    benchmark_correlation, fat_tails)
+
+
+class ShockScratch:
+    """Reusable float64 work arrays for fat-tail draws of up to ``max_paths`` paths.
+
+    ``generate_chunk_returns`` keeps one per chunk, so its seed blocks
+    reuse the same memory instead of allocating per block.
+    """
+
+    def __init__(self, n_years, n_assets, max_paths):
+        self.n_years, self.n_assets = n_years, n_assets
+        self._buffers = np.empty((2, n_years * max_paths * n_assets))
+
+    def arrays(self, n_sims):
+        """(shocks, deviations) views shaped (n_years, n_sims, n_assets)."""
+        size = self.n_years * n_sims * self.n_assets
+        shape = (self.n_years, n_sims, self.n_assets)
+        return self._buffers[0, :size].reshape(shape), self._buffers[1, :size].reshape(shape)
+
+
+def multivariate_t_deviations(prepared, rng, n_years, n_sims, shocks=None, out=None):
+    """Zero-mean multivariate t asset deviations, (n_years, n_sims, n_assets).
+
+    Standard normal shocks z (drawn into ``shocks`` if given) become
+    ``(L z) * sqrt(df / W)``, with L the Cholesky factor of ``cov_matrix``
+    and one chi-square(df) variable W per path-year shared by all assets.
+    The result goes to ``out`` if given (neither may overlap the other).
+    """
+    size = (n_years, n_sims, len(prepared.weights))
+    shocks = rng.standard_normal(size) if shocks is None else rng.standard_normal(out=shocks)
+    mixing = rng.chisquare(FAT_TAIL_DF, size=size[:2])
+    np.divide(FAT_TAIL_DF, mixing, out=mixing)
+    np.sqrt(mixing, out=mixing)
+    out = np.matmul(shocks, prepared.cholesky.T, out=out)
+    out *= mixing[..., np.newaxis]
+    return out
+
+
+def _t_sp500_returns(prepared, rng, n_years, n_sims):
+    """The S&P 500 proxy's own t returns, scaled, shifted and clipped in place."""
+    annual_sp500_returns = rng.standard_t(df=FAT_TAIL_DF, size=(n_years, n_sims))
+    annual_sp500_returns *= SP500_PROXY['sd']
+    annual_sp500_returns += prepared.sp500_mean_after_fees
+    return np.clip(annual_sp500_returns, RETURN_FLOOR, RETURN_CAP, out=annual_sp500_returns)
+
+
+def _independent_returns(prepared, n_years, n_sims, fat_tails, rng, scratch=None, out=None):
+    """Independent draws (``sampling='standard'``)."""
+    mean_returns_after_fees = prepared.mean_returns_after_fees
+
+    if fat_tails:
+        shocks, deviations = scratch.arrays(n_sims) if scratch is not None else (None, None)
+        deviations = multivariate_t_deviations(prepared, rng, n_years, n_sims, shocks, deviations)
+        deviations += mean_returns_after_fees
+        # The clip stores the returns (in ``out``'s dtype), so the scratch is never copied out
+        multi_asset_returns = np.clip(deviations, RETURN_FLOOR, RETURN_CAP,
+                                      out=deviations if out is None else out)
+        annual_sp500_returns = _t_sp500_returns(prepared, rng, n_years, n_sims)
+    else:
+        multi_asset_returns = rng.multivariate_normal(
+            mean_returns_after_fees, prepared.cov_matrix, size=(n_years, n_sims)
+        )
+        # Cap returns at realistic bounds even for normal distribution
+        multi_asset_returns = np.clip(multi_asset_returns, RETURN_FLOOR, RETURN_CAP)
+
+        annual_sp500_returns = rng.normal(
+            prepared.sp500_mean_after_fees, SP500_PROXY['sd'], size=(n_years, n_sims)
+        )
+        annual_sp500_returns = np.clip(annual_sp500_returns, RETURN_FLOOR, RETURN_CAP)
+
+    return multi_asset_returns, annual_sp500_returns
+
+
+def correlate_benchmark(prepared, multi_asset_returns, annual_sp500_returns, correlation, fat_tails=False):
+    """S&P 500 returns whose shock has ``correlation`` with the portfolio's return shock.
+
+    Each path-year's portfolio shock (return at target weights minus its
+    mean, over its volatility) is mixed with the independent S&P 500 shock
+    as ``correlation * portfolio + sqrt(1 - correlation**2) * sp500``, which
+    keeps the S&P 500 mean and volatility. Fat-tail shocks are in t units on
+    both sides (multivariate t deviations scale with ``cov_matrix`` like
+    normal ones), so the same mix applies. Deterministic per path, so
+    chunking and the samplers' structure (mirrored pairs, Sobol strata)
+    carry over.
+    """
+    weights = prepared.weights
+    portfolio_sd = np.sqrt(weights @ prepared.cov_matrix @ weights)
+    portfolio_shock = (multi_asset_returns - prepared.mean_returns_after_fees) @ weights / portfolio_sd
+    sp500_shock = (annual_sp500_returns - prepared.sp500_mean_after_fees) / SP500_PROXY['sd']
+    shock = correlation * portfolio_shock + np.sqrt(1 - correlation ** 2) * sp500_shock
+    return np.clip(prepared.sp500_mean_after_fees + shock * SP500_PROXY['sd'], RETURN_FLOOR, RETURN_CAP)
+
+
+def _finish_returns(prepared, asset_deviations, sp500_deviations):
+    """Add the means to zero-mean deviations and clip, as ``generate_returns`` does."""
+    multi_asset_returns = np.clip(asset_deviations + prepared.mean_returns_after_fees, RETURN_FLOOR, RETURN_CAP)
+    annual_sp500_returns = np.clip(sp500_deviations + prepared.sp500_mean_after_fees, RETURN_FLOOR, RETURN_CAP)
+    return multi_asset_returns, annual_sp500_returns
+
+
+def _antithetic_returns(prepared, n_years, n_sims, fat_tails, rng):
+    """Half the paths drawn as in ``generate_returns``; path 2k + 1 mirrors path 2k about the mean."""
+    n_assets = len(prepared.mean_returns_after_fees)
+    n_pairs = -(-n_sims // 2)
+    if fat_tails:
+        half_assets = multivariate_t_deviations(prepared, rng, n_years, n_pairs)
+        half_sp500 = rng.standard_t(df=FAT_TAIL_DF, size=(n_years, n_pairs)) * SP500_PROXY['sd']
+    else:
+        half_assets = rng.multivariate_normal(np.zeros(n_assets), prepared.cov_matrix, size=(n_years, n_pairs))
+        half_sp500 = rng.normal(0.0, SP500_PROXY['sd'], size=(n_years, n_pairs))
+
+    asset_deviations = np.empty((n_years, n_sims, n_assets))
+    sp500_deviations = np.empty((n_years, n_sims))
+    asset_deviations[:, 0::2] = half_assets
+    asset_deviations[:, 1::2] = -half_assets[:, :n_sims // 2]
+    sp500_deviations[:, 0::2] = half_sp500
+    sp500_deviations[:, 1::2] = -half_sp500[:, :n_sims // 2]
+    return _finish_returns(prepared, asset_deviations, sp500_deviations)
+
+
+def _sobol_returns(prepared, n_years, n_sims, fat_tails, rng):
+    """Scrambled Sobol points, one dimension per (year, asset or S&P 500), through the inverse CDF.
+
+    Asset shocks are correlated with the Cholesky factor of ``cov_matrix``.
+    With fat tails each year has one more dimension, the shared chi-square
+    mixing variable of the multivariate t (see ``multivariate_t_deviations``),
+    and the S&P 500 takes t variates.
+    """
+    from scipy.special import chdtri, ndtri, stdtrit
+    from scipy.stats import qmc
+
+    n_assets = len(prepared.mean_returns_after_fees)
+    n_dims = n_assets + 2 if fat_tails else n_assets + 1
+    sobol = qmc.Sobol(d=n_years * n_dims, scramble=True, seed=rng)
+    # Draw a power-of-two prefix (Sobol's balance properties) and keep n_sims points
+    points = sobol.random_base2(max(int(np.ceil(np.log2(n_sims))), 0))[:n_sims]
+    # Scrambled points can land exactly on 0; keep the inverse CDF finite
+    np.clip(points, np.finfo(np.float64).tiny, 1 - np.finfo(np.float64).epsneg, out=points)
+    points = points.reshape(n_sims, n_years, n_dims).transpose(1, 0, 2)
+
+    asset_deviations = ndtri(points[:, :, :n_assets]) @ prepared.cholesky.T
+    if fat_tails:
+        asset_deviations *= np.sqrt(FAT_TAIL_DF / chdtri(FAT_TAIL_DF, points[:, :, n_assets + 1]))[..., np.newaxis]
+        sp500_deviations = stdtrit(FAT_TAIL_DF, points[:, :, n_assets]) * SP500_PROXY['sd']
+    else:
+        sp500_deviations = ndtri(points[:, :, n_assets]) * SP500_PROXY['sd']
+    return _finish_returns(prepared, asset_deviations, sp500_deviations)
+
+
+def block_rng(entropy, block_index):
+    """Generator for seed block ``block_index`` of a run seeded with ``entropy``."""
+    return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(block_index,)))
+
+
+def generate_chunk_returns(prepared, n_years, n_sims, start, stop, entropy, fat_tails=False, dtype=np.float64,
+                           sampling='standard', benchmark_correlation=None):
+    """Returns for paths [start, stop) of an ``n_sims``-path run seeded with ``entropy``.
+
+    Each overlapping seed block is drawn from its own stream; a block that
+    straddles the chunk boundary is drawn in full and sliced, so any chunking
+    reproduces the single-block draws exactly. Blocks are drawn in float64
+    and stored as ``dtype``, so a float32 run sees the same draws rounded.
+    Standard fat-tail blocks share one ``ShockScratch`` per chunk, and a
+    block that lies wholly in the chunk is clipped straight into it.
+    """
+    n_paths = stop - start
+    multi_asset_returns = np.empty((n_years, n_paths, len(prepared.weights)), dtype=dtype)
+    annual_sp500_returns = np.empty((n_years, n_paths), dtype=dtype)
+    scratch = None
+    if fat_tails and sampling == 'standard':
+        scratch = ShockScratch(n_years, len(prepared.weights), min(SEED_BLOCK_SIZE, n_sims))
+
+    for block in range(start // SEED_BLOCK_SIZE, (stop - 1) // SEED_BLOCK_SIZE + 1):
+        block_start = block * SEED_BLOCK_SIZE
+        block_stop = min(block_start + SEED_BLOCK_SIZE, n_sims)
+        lo, hi = max(start, block_start), min(stop, block_stop)
+        # correlate_benchmark must see the float64 returns, so float32 then takes the copy
+        direct = (scratch is not None and (lo, hi) == (block_start, block_stop)
+                  and (dtype == np.float64 or benchmark_correlation is None))
+        block_assets, block_sp500 = generate_returns(
+            prepared, n_years, block_stop - block_start, fat_tails=fat_tails,
+            rng=block_rng(entropy, block), sampling=sampling, benchmark_correlation=benchmark_correlation,
+            scratch=scratch, out=multi_asset_returns[:, lo - start:hi - start] if direct else None
+        )
+        if not direct:
+            multi_asset_returns[:, lo - start:hi - start] = block_assets[:, lo - block_start:hi - block_start]
+        annual_sp500_returns[:, lo - start:hi - start] = block_sp500[:, lo - block_start:hi - block_start]
+
+    return multi_asset_returns, annual_sp500_returns
+
+
+def chunk_returns(config, prepared, start, stop, entropy):
+    """Returns for paths [start, stop) of ``config``'s run, from its ``return_source``."""
+    if config.return_source != 'parametric':
+        from .historical import historical_chunk_returns
+
+        return historical_chunk_returns(config, prepared, start, stop, entropy)
+    return generate_chunk_returns(
+        prepared, config.years, config.simulations, start, stop, entropy,
+        fat_tails=config.fat_tails, dtype=config.dtype, sampling=config.sampling,
+        benchmark_correlation=config.benchmark_correlation
+    )
@@ -0,0 +1,281 @@
+"""
+Sensitivity of the depletion probability to the model inputs: each asset's
+``arith_mean`` and ``sd``, each correlation entry, inflation and the
+additional fee.
+
+One set of standard-normal shocks (scaled by the multivariate t's shared
+chi-square mixing with fat tails) is drawn per chunk of paths. Every scenario maps the shocks through its own means and
+Cholesky factor instead of re-sampling: the base inputs, and each parameter
+bumped down and up. All scenarios are stacked along the path axis and run
+as one kernel call per chunk, with inflation as a per-path vector. The
+central difference (P(up) - P(down)) / (2 * bump) of each parameter is then
+taken path by path on common random numbers. Only paths that change outcome
+between the two bumps contribute, so the derivatives are smooth. Their
+standard errors are batch means over seed blocks (see ``swr.metrics``).
+
+The draws are shared with no other mode, so the base depletion probability
+agrees with ``simulate()`` on the same seed only within sampling error.
+"""
+
+import copy
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+
+from .engine import KERNELS, _silent, build_portfolio, iter_chunks, prepare_portfolio
+from .metrics import DEPLETION_THRESHOLD, batch_standard_error, block_statistics
+from .presets import PORTFOLIOS
+from .returns import FAT_TAIL_DF, RETURN_CAP, RETURN_FLOOR, SEED_BLOCK_SIZE, block_rng
+from .strategies import strategy_for
+from .tables import Table
+
+# Absolute bump per parameter kind (decimals; correlations in correlation units)
+DEFAULT_BUMPS = {
+    'arith_mean': 0.005,
+    'sd': 0.01,
+    'correlation': 0.05,
+    'inflation_rate': 0.0025,
+    'additional_fee': 0.001,
+}
+# Shocks and stacked scenario returns per chunk stay within this many bytes
+# when config.chunk_size is not set
+CHUNK_MEMORY_BUDGET = 256 * 2**20
+
+
+@dataclass
+class ModelParameter:
+    """One bumped input: ``kind`` from ``DEFAULT_BUMPS``, with its asset(s) if any."""
+    name: str
+    kind: str
+    value: float
+    bump: float
+    assets: tuple = ()
+
+
+@dataclass
+class Sensitivity:
+    """Depletion probability at the two bumps and the central-difference derivative."""
+    parameter: ModelParameter
+    prob_down: float
+    prob_up: float
+    derivative: float
+    standard_error: float
+
+
+@dataclass
+class SensitivityAnalysis:
+    """Output of ``analyze_sensitivity``."""
+    config: 'SimulationConfig'
+    portfolio: 'PreparedPortfolio'
+    base_probability: float
+    base_standard_error: float
+    sensitivities: list
+    n_scenarios: int
+    seed: int
+
+
+def model_parameters(config, bumps=None):
+    """``ModelParameter`` for every input of ``config``'s portfolio, bumped by ``DEFAULT_BUMPS`` or ``bumps``."""
+    bumps = {**DEFAULT_BUMPS, **(bumps or {})}
+    unknown = sorted(set(bumps) - set(DEFAULT_BUMPS))
+    if unknown:
+        raise ValueError(f"Unknown bump kind(s) {', '.join(unknown)} (choose from {', '.join(DEFAULT_BUMPS)})")
+    portfolio = PORTFOLIOS[config.portfolio]
+    assets = portfolio['assets']
+    parameters = []
+    for ticker, params in assets.items():
+        for kind in ('arith_mean', 'sd'):
+            parameters.append(ModelParameter(f'{ticker} {kind}', kind, params[kind], bumps[kind], (ticker,)))
+    names = list(assets)
+    for i, j in combinations(range(len(names)), 2):
+        parameters.append(ModelParameter(f'corr {names[i]}/{names[j]}', 'correlation',
+                                         float(portfolio['correlation'][i][j]), bumps['correlation'],
+                                         (names[i], names[j])))
+    parameters.append(ModelParameter('inflation_rate', 'inflation_rate', config.inflation_rate,
+                                     bumps['inflation_rate']))
+    parameters.append(ModelParameter('additional_fee', 'additional_fee', config.additional_fee,
+                                     bumps['additional_fee']))
+    for parameter in parameters:
+        if parameter.bump <= 0:
+            raise ValueError(f"bump for {parameter.kind} must be positive")
+    return parameters
+
+
+@dataclass
+class _ScenarioInputs:
+    """What one scenario needs to turn shocks into returns."""
+    means: np.ndarray
+    scale: np.ndarray
+    inflation_rate: float
+
+
+def _scenario_inputs(config, parameter=None, step=0.0):
+    """Means and shock scaling (transposed Cholesky factor) with one input moved."""
+    portfolio = copy.deepcopy(PORTFOLIOS[config.portfolio])
+    additional_fee, inflation_rate = config.additional_fee, config.inflation_rate
+    kind = parameter.kind if parameter is not None else None
+    if kind in ('arith_mean', 'sd'):
+        portfolio['assets'][parameter.assets[0]][kind] += step
+        if portfolio['assets'][parameter.assets[0]]['sd'] <= 0:
+            raise ValueError(f"{parameter.name} bump leaves a non-positive volatility; use a smaller bump")
+    elif kind == 'correlation':
+        names = list(portfolio['assets'])
+        i, j = names.index(parameter.assets[0]), names.index(parameter.assets[1])
+        correlation = np.array(portfolio['correlation'], dtype=np.float64)
+        correlation[i, j] = correlation[j, i] = correlation[i, j] + step
+        portfolio['correlation'] = correlation
+    elif kind == 'inflation_rate':
+        inflation_rate += step
+    elif kind == 'additional_fee':
+        additional_fee += step
+
+    try:
+        prepared = build_portfolio(portfolio, additional_fee, inflation_rate)
+    except np.linalg.LinAlgError:
+        raise ValueError(f"{parameter.name} bump makes the correlation matrix not positive definite; "
+                         f"use a smaller correlation bump") from None
+    return _ScenarioInputs(prepared.mean_returns_after_fees, prepared.cholesky.T, inflation_rate)
+
+
+def _chunk_shocks(config, n_assets, start, stop, entropy):
+    """(n_years, stop - start, n_assets) standard shocks for paths [start, stop), per seed block.
+
+    With fat tails every path-year's shocks share one ``sqrt(df / W)`` factor
+    (W chi-square), which commutes with the scenarios' Cholesky factors.
+    """
+    shocks = np.empty((config.years, stop - start, n_assets))
+    for block in range(start // SEED_BLOCK_SIZE, (stop - 1) // SEED_BLOCK_SIZE + 1):
+        block_start = block * SEED_BLOCK_SIZE
+        block_stop = min(block_start + SEED_BLOCK_SIZE, config.simulations)
+        rng = block_rng(entropy, block)
+        size = (config.years, block_stop - block_start, n_assets)
+        block_shocks = rng.standard_normal(size)
+        if config.fat_tails:
+            block_shocks *= np.sqrt(FAT_TAIL_DF / rng.chisquare(FAT_TAIL_DF, size=size[:2]))[..., np.newaxis]
+        lo, hi = max(start, block_start), min(stop, block_stop)
+        shocks[:, lo - start:hi - start] = block_shocks[:, lo - block_start:hi - block_start]
+    return shocks
+
+
+def _sensitivity_chunk_task(config, weights, scenarios, entropy, start, stop):
+    """Depleted flags, (n_scenarios, stop - start), for paths [start, stop) under every scenario."""
+    n_paths = stop - start
+    shocks = _chunk_shocks(config, len(weights), start, stop, entropy)
+    stacked = np.empty((config.years, n_paths * len(scenarios), len(weights)), dtype=config.dtype)
+    for number, scenario in enumerate(scenarios):
+        returns = stacked[:, number * n_paths:(number + 1) * n_paths]
+        np.clip(shocks @ scenario.scale + scenario.means, RETURN_FLOOR, RETURN_CAP, out=returns, casting='unsafe')
+    del shocks
+    inflation = np.repeat([scenario.inflation_rate for scenario in scenarios], n_paths)
+
+    final_values, _, _ = KERNELS[config.engine](
+        n_paths * len(scenarios), config.years, config.initial_value, config.withdrawal_rate,
+        weights, stacked, strategy=strategy_for(config), floor_pct=config.floor_pct,
+        ceiling_pct=config.ceiling_pct, inflation_rate=inflation
+    )
+    return (final_values < DEPLETION_THRESHOLD).reshape(len(scenarios), n_paths)
+
+
+def _default_chunk_size(config, n_assets, n_scenarios):
+    """Whole seed blocks whose stacked returns fit ``CHUNK_MEMORY_BUDGET``."""
+    bytes_per_path = config.years * n_assets * (8 + n_scenarios * np.dtype(config.dtype).itemsize)
+    blocks = max(CHUNK_MEMORY_BUDGET // (bytes_per_path * SEED_BLOCK_SIZE), 1)
+    return int(blocks * SEED_BLOCK_SIZE)
+
+
+def analyze_sensitivity(config, bumps=None, prepared=None, log=None):
+    """Central-difference sensitivities of the depletion probability to every model input.
+
+    ``bumps`` overrides ``DEFAULT_BUMPS`` per parameter kind. Portfolio,
+    strategy, horizon, engine, seed, chunking and workers apply as in
+    ``simulate()``; chunks default to a size whose stacked scenarios fit
+    ``CHUNK_MEMORY_BUDGET``. Derivatives are per unit of the parameter
+    (decimals), e.g. 0.5 means +0.005 depletion probability per +1% of
+    mean return. Returns a ``SensitivityAnalysis``.
+    """
+    if config.sampling != 'standard' or config.control_variate or config.return_source != 'parametric':
+        raise ValueError("sensitivity analysis draws its own standard shocks; it needs parametric returns "
+                         "with standard sampling and no control variate")
+    log = log or _silent
+    if prepared is None:
+        prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+    entropy = config.seed if config.seed is not None else np.random.SeedSequence().entropy
+    parameters = model_parameters(config, bumps)
+    scenarios = [_scenario_inputs(config)]
+    for parameter in parameters:
+        scenarios += [_scenario_inputs(config, parameter, -parameter.bump),
+                      _scenario_inputs(config, parameter, parameter.bump)]
+
+    n_assets = len(prepared.weights)
+    chunk_size = config.chunk_size or _default_chunk_size(config, n_assets, len(scenarios))
+    chunks = list(iter_chunks(config.simulations, chunk_size))
+    log(f"Bumping {len(parameters)} inputs: {len(scenarios)} scenarios on shared draws over "
+        f"{config.simulations:,} paths, one kernel pass per chunk ({len(chunks)} chunks)...")
+    tasks = [(config, prepared.weights, scenarios, entropy, start, stop) for start, stop in chunks]
+    if config.workers > 1 and len(chunks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(config.workers, len(chunks))) as pool:
+            depleted = np.concatenate(list(pool.map(_sensitivity_chunk_task, *zip(*tasks))), axis=1)
+    else:
+        depleted = np.concatenate([_sensitivity_chunk_task(*task) for task in tasks], axis=1)
+
+    base = depleted[0].astype(np.float64)
+    sensitivities = []
+    for number, parameter in enumerate(parameters):
+        down, up = depleted[1 + 2 * number], depleted[2 + 2 * number]
+        path_differences = (up.astype(np.float64) - down) / (2 * parameter.bump)
+        sensitivities.append(Sensitivity(
+            parameter=parameter,
+            prob_down=float(down.mean()),
+            prob_up=float(up.mean()),
+            derivative=float(path_differences.mean()),
+            standard_error=float(batch_standard_error(block_statistics(path_differences, 'mean'))),
+        ))
+    return SensitivityAnalysis(
+        config=config,
+        portfolio=prepared,
+        base_probability=float(base.mean()),
+        base_standard_error=float(batch_standard_error(block_statistics(base, 'mean'))),
+        sensitivities=sensitivities,
+        n_scenarios=len(scenarios),
+        seed=entropy,
+    )
+
+
+def build_sensitivity_table(analysis):
+    """One row per parameter: value, bump, depletion at each bump, derivative and its standard error."""
+    rows = []
+    for sensitivity in analysis.sensitivities:
+        parameter = sensitivity.parameter
+        rows.append({
+            'parameter': parameter.name,
+            'kind': parameter.kind,
+            'value': parameter.value,
+            'bump': parameter.bump,
+            'prob_depletion_down': sensitivity.prob_down,
+            'prob_depletion_up': sensitivity.prob_up,
+            'derivative': sensitivity.derivative,
+            'standard_error': sensitivity.standard_error,
+        })
+    return Table.from_rows(rows)
+
+
+def export_sensitivity(analysis, output_dir, export_format='csv'):
+    """Write the table as ``sensitivity_<portfolio>_<strategy>_v3.csv`` or ``.parquet``; return the file names."""
+    from .report import portfolio_name_safe
+
+    table = build_sensitivity_table(analysis)
+    output_dir.mkdir(exist_ok=True)
+    name_safe = portfolio_name_safe(analysis.portfolio.name)
+    file_name = f'sensitivity_{name_safe}_{analysis.config.strategy}_v3.{export_format}'
+    if export_format == 'parquet':
+        from .columnar import run_metadata, write_dataframe_parquet
+
+        metadata = run_metadata(analysis.config, analysis.portfolio, analysis.seed, 'sensitivity')
+        metadata['base_prob_depletion'] = analysis.base_probability
+        write_dataframe_parquet(table.to_pandas(), metadata, output_dir / file_name)
+    else:
+        table.to_csv(output_dir / file_name)
+    return [file_name]
@@ -0,0 +1,558 @@
+"""
+HTTP simulation service: a long-running JSON API over a pool of warm worker
+processes.
+
+    python -m swr.server --host 0.0.0.0 --port 8000 --workers 4
+
+Endpoints (JSON in and out):
+
+    GET  /health             status, pool size, queued and running jobs
+    GET  /portfolios         preset numbers and names
+    POST /simulate           run a config and wait; 200 with the finished job
+    POST /jobs               queue a config; 202 with the job (poll its id)
+    GET  /jobs/<id>          status, progress and, once done, the metrics
+    GET  /jobs/<id>/events   NDJSON progress events until the job finishes
+
+A request body is an object of ``SimulationConfig`` fields (decimals, as in
+the Python API; ``workers`` is ignored since jobs share the pool) plus an
+optional ``"series": true`` for the per-year withdrawal and path-percentile
+arrays. ``history_file`` (for a historical ``return_source``) is a file name
+inside the directory given by ``--history-dir``; without one, requests that
+name a file are refused, so clients cannot make the server read arbitrary
+paths. Workers start once, with the simulation modules imported and every
+preset's portfolio arrays prepared, so a request pays only for its paths.
+
+A job is split into chunks of whole seed blocks spread over the pool, so
+seeded results match ``simulate()`` exactly, and progress (paths done, plus
+the depletion rate so far) is reported as chunks finish. Identical in-flight
+requests - the same ``swr.cache.cache_key``, i.e. the config minus
+``workers`` and ``chunk_size`` - share one job; unseeded duplicates share
+one fresh draw. The most recent finished jobs stay readable by id.
+
+Standard library only; nothing outside this process is needed.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+import typing
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import asdict, fields, replace
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+from .engine import (
+    SimulationConfig,
+    _collect_chunks,
+    _silent,
+    _simulate_chunk_task,
+    iter_chunks,
+    prepare_portfolio,
+)
+from .metrics import DEPLETION_THRESHOLD, SimulationMetrics, compute_metrics
+from .presets import PORTFOLIOS
+from .returns import SEED_BLOCK_SIZE
+
+DEFAULT_PORT = 8000
+# Jobs waiting for a coordinator beyond this are refused with 503
+DEFAULT_MAX_QUEUED = 64
+# Largest run one request may ask for (its chunks never exceed its paths)
+DEFAULT_MAX_SIMULATIONS = 1_000_000
+DEFAULT_MAX_YEARS = 100
+# Finished jobs kept for GET /jobs/<id>
+MAX_FINISHED_JOBS = 256
+# Seconds between keep-alive events on /events while nothing changes
+EVENT_HEARTBEAT = 15.0
+# Per-request output options that are not SimulationConfig fields
+_OUTPUT_OPTIONS = ('series',)
+_IGNORED_FIELDS = ('workers',)
+
+
+# --- WORKER SIDE ---
+def _warm_worker():
+    """Pool initializer: import the simulation modules and prepare every preset."""
+    from . import metrics, returns, streaming  # noqa: F401
+
+    for portfolio in PORTFOLIOS:
+        prepare_portfolio(portfolio)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _job_chunk_task(config, entropy, start, stop):
+    """One chunk of a job; the portfolio comes from the worker's warm preset cache."""
+    prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+    return _simulate_chunk_task(config, prepared, entropy, start, stop, False)[0]
+
+
+# --- JSON CONVERSION ---
+def resolve_history_file(name, history_dir):
+    """Path of a request's ``history_file`` inside ``history_dir``; ``ValueError`` for anything else."""
+    if history_dir is None:
+        raise ValueError("history_file is not accepted by this server (it was started without --history-dir)")
+    if not isinstance(name, str) or not name:
+        raise ValueError("history_file must be a file name")
+    root = Path(history_dir).resolve()
+    # resolve() follows symlinks and '..', so anything leading outside the directory is caught
+    path = (root / name).resolve()
+    if not path.is_relative_to(root) or not path.is_file():
+        raise ValueError(f"history_file {name!r} is not a file in the server's history directory")
+    return str(path)
+
+
+def _check_field_type(field, value):
+    """``ValueError`` unless ``value`` (from JSON) fits ``field``'s annotation.
+
+    Counts must be integers (not booleans or 10.5) and numbers finite, so a
+    client's mistake is refused here rather than failing inside a job.
+    """
+    optional = typing.get_origin(field.type) is typing.Union
+    expected = typing.get_args(field.type)[0] if optional else field.type
+    if value is None and optional:
+        return
+    if expected is bool:
+        valid = isinstance(value, bool)
+    elif expected is int:
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    elif expected is float:
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+    else:
+        valid = isinstance(value, expected)
+    if not valid:
+        kind = {bool: "true or false", int: "an integer", float: "a finite number"}.get(expected, "a string")
+        raise ValueError(f"{field.name} must be {kind}{' or null' if optional else ''} (got {value!r})")
+
+
+def config_from_json(body, history_dir=None):
+    """``(SimulationConfig, options)`` from a request object; raises ``ValueError`` on bad input.
+
+    Every field's JSON type is checked against ``SimulationConfig``.
+    ``history_file`` is resolved inside ``history_dir`` (refused without one).
+    """
+    if not isinstance(body, dict):
+        raise ValueError("request body must be a JSON object of SimulationConfig fields")
+    values = dict(body)
+    options = {name: values.pop(name) for name in _OUTPUT_OPTIONS if name in values}
+    for name in _IGNORED_FIELDS:
+        values.pop(name, None)
+    known = {field.name: field for field in fields(SimulationConfig)}
+    unknown = sorted(set(values) - set(known))
+    if unknown:
+        raise ValueError(f"unknown field(s) {', '.join(unknown)}")
+    for name, value in values.items():
+        _check_field_type(known[name], value)
+    if values.get('history_file') is not None:
+        values['history_file'] = resolve_history_file(values['history_file'], history_dir)
+    config = SimulationConfig(**values)
+    if config.history_file is not None:
+        from .historical import check_history
+
+        check_history(config)
+    return config, options
+
+
+def _json_number(value):
+    """Float for JSON; NaN and infinities (no JSON spelling) become null."""
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def metrics_to_json(metrics, series=False):
+    """JSON-ready ``SimulationMetrics``: scalars always, per-year arrays with ``series``."""
+    document = {}
+    for field in fields(SimulationMetrics):
+        value = getattr(metrics, field.name)
+        if field.name == 'path_percentiles':
+            if series:
+                document[field.name] = {str(percentile): [_json_number(v) for v in band]
+                                        for percentile, band in value.items()}
+        elif isinstance(value, np.ndarray):
+            if series:
+                document[field.name] = [_json_number(v) for v in value]
+        elif isinstance(value, dict):
+            document[field.name] = {str(key): _json_number(v) for key, v in value.items()}
+        elif field.name in ('n_paths', 'n_depleted'):
+            document[field.name] = int(value)
+        else:
+            document[field.name] = _json_number(value)
+    return document
+
+
+# --- JOBS ---
+class Job:
+    """One simulation request; ``condition`` is notified on every change."""
+
+    def __init__(self, key, config):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.config = config
+        self.status = 'queued'
+        self.created = time.time()
+        self.started = self.finished = None
+        self.paths_done = 0
+        self.chunks_done = self.chunks_total = 0
+        self.partial_prob_depletion = None
+        self.results = None
+        self.error = None
+        self.version = 0
+        self.condition = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ('done', 'failed')
+
+    def update(self, **changes):
+        with self.condition:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes (or ``timeout`` seconds); return whether it has."""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.done, timeout)
+
+    def to_json(self, series=False):
+        document = {
+            'job_id': self.id,
+            'status': self.status,
+            'config': asdict(self.config),
+            'progress': {
+                'paths': self.paths_done,
+                'simulations': self.config.simulations,
+                'chunks': self.chunks_done,
+                'chunks_total': self.chunks_total,
+                'prob_depletion': self.partial_prob_depletion,
+            },
+        }
+        if self.started is not None:
+            end = self.finished if self.finished is not None else time.time()
+            document['elapsed_seconds'] = round(end - self.started, 3)
+        if self.status == 'done':
+            document['portfolio'] = self.results.portfolio.name
+            document['seed'] = self.results.seed
+            document['metrics'] = metrics_to_json(self.results.metrics, series)
+        elif self.status == 'failed':
+            document['error'] = self.error
+        return document
+
+
+def job_chunks(config, workers):
+    """Path ranges of a job: ``config.chunk_size``, or four per worker in whole seed blocks."""
+    chunk_size = config.chunk_size
+    if chunk_size is None:
+        per_chunk = -(-config.simulations // (4 * workers))
+        chunk_size = -(-per_chunk // SEED_BLOCK_SIZE) * SEED_BLOCK_SIZE
+    return list(iter_chunks(config.simulations, chunk_size))
+
+
+class SimulationService:
+    """Warm process pool plus job bookkeeping; the HTTP layer is a thin wrapper.
+
+    At most ``workers`` jobs run at once (their chunks interleave on the
+    pool); up to ``max_queued`` more wait in order. Usable in-process:
+
+        service = SimulationService(workers=2)
+        job, _ = service.submit(SimulationConfig(portfolio=2, seed=42))
+        job.wait()
+        service.shutdown()
+    """
+
+    def __init__(self, workers=None, max_queued=DEFAULT_MAX_QUEUED,
+                 max_simulations=DEFAULT_MAX_SIMULATIONS, log=None, history_dir=None,
+                 max_years=DEFAULT_MAX_YEARS):
+        from .cache import cache_key
+
+        self._cache_key = cache_key
+        self.workers = workers or os.cpu_count() or 1
+        self.history_dir = history_dir
+        self.max_queued = max_queued
+        self.max_simulations = max_simulations
+        self.max_years = max_years
+        self.log = log or _silent
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        self._coordinators = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='swr-job')
+        # Resolved by shutdown(); coordinators wait on it alongside their chunks
+        self._stopping = Future()
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._in_flight = {}
+        for portfolio in PORTFOLIOS:
+            prepare_portfolio(portfolio)
+
+    def warm(self):
+        """Start every worker process now instead of on the first request."""
+        for future in [self._pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+        self.log(f"{self.workers} warm worker process(es) ready")
+
+    def counts(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ('queued', 'running', 'done', 'failed')}
+
+    def submit(self, config):
+        """Queue ``config``; return ``(job, deduplicated)``.
+
+        Raises ``ValueError`` for a run over ``max_simulations`` or
+        ``max_years`` and ``OverflowError`` when the queue is full.
+        """
+        if config.simulations > self.max_simulations:
+            raise ValueError(f"simulations is limited to {self.max_simulations:,} on this server")
+        if config.years > self.max_years:
+            raise ValueError(f"years is limited to {self.max_years:,} on this server")
+        key = self._cache_key(config)
+        with self._lock:
+            job = self._in_flight.get(key)
+            if job is not None:
+                return job, True
+            if sum(other.status == 'queued' for other in self._jobs.values()) >= self.max_queued:
+                raise OverflowError("job queue is full; retry later")
+            job = Job(key, config)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+            self._forget_finished()
+        self._coordinators.submit(self._run, job)
+        return job, False
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _run(self, job):
+        """Coordinator thread: fan the job's chunks out to the pool and collect them in order."""
+        config = job.config
+        try:
+            if self._stopping.done():
+                raise RuntimeError("server is shutting down")
+            prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+            entropy = config.seed if config.seed is not None else np.random.SeedSequence().entropy
+            chunks = job_chunks(config, self.workers)
+            job.update(status='running', started=time.time(), chunks_total=len(chunks))
+            futures = {self._pool.submit(_job_chunk_task, config, entropy, start, stop): index
+                       for index, (start, stop) in enumerate(chunks)}
+            chunk_results = [None] * len(chunks)
+            depleted = 0
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending | {self._stopping}, return_when=FIRST_COMPLETED)
+                if self._stopping in finished:
+                    for future in pending:
+                        future.cancel()
+                    raise RuntimeError("server is shutting down")
+                pending.discard(self._stopping)
+                progress = {}
+                for future in finished:
+                    index = futures[future]
+                    chunk_results[index] = future.result()
+                    if not config.streaming:
+                        depleted += int(np.count_nonzero(chunk_results[index][0] < DEPLETION_THRESHOLD))
+                paths_done = sum(stop - start for (start, stop), chunk in zip(chunks, chunk_results)
+                                 if chunk is not None)
+                if not config.streaming:
+                    progress['partial_prob_depletion'] = depleted / paths_done
+                job.update(paths_done=paths_done, chunks_done=len(chunks) - len(pending), **progress)
+
+            results = _collect_chunks(config, prepared, chunks, chunk_results)
+            del chunk_results
+            results.seed = entropy
+            results.metrics = compute_metrics(results)
+            # Only the metrics are served; release the per-path arrays
+            results = replace(results, final_portfolio_values=None, withdrawals_history=None,
+                              portfolio_values_over_time=None, final_sp500_values=None,
+                              sp500_max_drawdowns=None, sp500_values_over_time=None,
+                              control_values=None, accumulator=None)
+            job.update(status='done', results=results, finished=time.time())
+            self.log(f"job {job.id}: {config.simulations:,} paths in {job.finished - job.started:.2f}s")
+        except Exception as exc:
+            job.update(status='failed', error=f"{type(exc).__name__}: {exc}", finished=time.time())
+            self.log(f"job {job.id} failed: {job.error}")
+        finally:
+            with self._lock:
+                if self._in_flight.get(job.key) is job:
+                    del self._in_flight[job.key]
+
+    def shutdown(self):
+        """Fail unfinished jobs, wait for their coordinators, then stop the worker processes."""
+        if not self._stopping.done():
+            self._stopping.set_result(None)
+        self._coordinators.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            unfinished = [job for job in self._jobs.values() if not job.done]
+        # Jobs whose coordinator never started
+        for job in unfinished:
+            job.update(status='failed', error="RuntimeError: server is shutting down", finished=time.time())
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+# --- HTTP LAYER ---
+class SimulationRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'swr-server'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, document):
+        payload = json.dumps(document).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error(self, status, message):
+        self._send_json(status, {'error': message})
+
+    def _series(self):
+        return self.path.partition('?')[2] in ('series=1', 'series=true')
+
+    def do_GET(self):
+        route = self.path.partition('?')[0].rstrip('/')
+        if route == '/health':
+            self._send_json(HTTPStatus.OK, {'status': 'ok', 'workers': self.service.workers,
+                                            'jobs': self.service.counts()})
+        elif route == '/portfolios':
+            self._send_json(HTTPStatus.OK, {str(number): preset['name'] for number, preset in PORTFOLIOS.items()})
+        elif route.startswith('/jobs/'):
+            job_id, _, tail = route[len('/jobs/'):].partition('/')
+            job = self.service.get(job_id)
+            if job is None:
+                self._send_error(HTTPStatus.NOT_FOUND, f"no job {job_id!r}")
+            elif tail == 'events':
+                self._stream_events(job)
+            elif tail:
+                self._send_error(HTTPStatus.NOT_FOUND, f"unknown path {self.path!r}")
+            else:
+                self._send_json(HTTPStatus.OK, job.to_json(self._series()))
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, f"unknown path {self.path!r}")
+
+    def do_POST(self):
+        route = self.path.partition('?')[0].rstrip('/')
+        if route not in ('/simulate', '/jobs'):
+            self._send_error(HTTPStatus.NOT_FOUND, f"unknown path {self.path!r}")
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            config, options = config_from_json(json.loads(self.rfile.read(length) or b'{}'),
+                                               self.service.history_dir)
+            job, deduplicated = self.service.submit(config)
+        except OverflowError as exc:
+            self._send_error(HTTPStatus.SERVICE_UNAVAILABLE, str(exc))
+            return
+        except ValueError as exc:  # includes json.JSONDecodeError
+            self._send_error(HTTPStatus.BAD_REQUEST, str(exc))
+            return
+        series = bool(options.get('series'))
+        if route == '/jobs':
+            document = job.to_json(series)
+            document['deduplicated'] = deduplicated
+            self._send_json(HTTPStatus.ACCEPTED, document)
+            return
+        job.wait()
+        document = job.to_json(series)
+        document['deduplicated'] = deduplicated
+        status = HTTPStatus.OK if job.status == 'done' else HTTPStatus.INTERNAL_SERVER_ERROR
+        self._send_json(status, document)
+
+    def _stream_events(self, job):
+        """One JSON line per change (or heartbeat) until the job finishes; the last line has the metrics."""
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        series = self._series()
+        seen = -1
+        try:
+            while True:
+                with job.condition:
+                    job.condition.wait_for(lambda: job.version != seen, EVENT_HEARTBEAT)
+                    seen = job.version
+                    document = job.to_json(series)
+                self.wfile.write(json.dumps(document).encode() + b'\n')
+                self.wfile.flush()
+                if document['status'] in ('done', 'failed'):
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+
+class SimulationServer(ThreadingHTTPServer):
+    """``ThreadingHTTPServer`` carrying the ``SimulationService`` its handlers use."""
+    daemon_threads = True
+
+    def __init__(self, address, service, quiet=False):
+        super().__init__(address, SimulationRequestHandler)
+        self.service = service
+        self.quiet = quiet
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m swr.server',
+        description='Serve Monte Carlo simulations as a JSON API over warm worker processes.',
+    )
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Interface to bind (default: 127.0.0.1; 0.0.0.0 in Docker)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: one per CPU)')
+    parser.add_argument('--max-queued', type=int, default=DEFAULT_MAX_QUEUED,
+                        help=f'Queued jobs before new ones get 503 (default: {DEFAULT_MAX_QUEUED})')
+    parser.add_argument('--max-simulations', type=int, default=DEFAULT_MAX_SIMULATIONS,
+                        help=f'Largest run one request may ask for (default: {DEFAULT_MAX_SIMULATIONS:,})')
+    parser.add_argument('--max-years', type=int, default=DEFAULT_MAX_YEARS,
+                        help=f'Longest horizon one request may ask for (default: {DEFAULT_MAX_YEARS})')
+    parser.add_argument('--history-dir', type=Path, default=None,
+                        help='Directory of return history files that requests may name as history_file '
+                             '(default: none; historical return sources are refused)')
+    parser.add_argument('--quiet', action='store_true',
+                        help='Do not log each HTTP request')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    log = lambda message: print(message, file=sys.stderr, flush=True)  # noqa: E731
+    service = SimulationService(args.workers, args.max_queued, args.max_simulations, log=log,
+                                history_dir=args.history_dir, max_years=args.max_years)
+    service.warm()
+    server = SimulationServer((args.host, args.port), service, quiet=args.quiet)
+    log(f"Serving simulations on http://{args.host}:{server.server_port} "
+        f"({service.workers} workers; Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
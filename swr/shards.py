@@ -0,0 +1,193 @@
+"""
+Shard-and-merge for runs spread over several machines: each shard simulates
+one slice of a seeded run's paths and writes a compact partial result, and
+``merge_shards`` combines the shards into the run's ``SimulationResults``.
+
+    for index in range(8):                                # one per node or container
+        write_shard(simulate_shard(config, index, 8), f'shard_{index}.npz')
+    # ... then on one machine:
+    results = merge_shards([read_shard(f'shard_{index}.npz') for index in range(8)])
+
+Shards are whole seed blocks of the path space, and every block draws from
+its own stream spawned from the seed (``swr.returns.block_rng``), so shard i
+simulates exactly the paths i of a single-machine run with the same seed.
+
+A shard file is a compressed ``.npz`` of the shard's ``PathAccumulator``:
+per-year value and withdrawal sketches, drawdown sketches, the failure-year
+histogram and the depletion, goal and beat-S&P counts, plus a JSON ``meta``
+entry identifying the run (a ``swr.cache.cache_key`` of its config).
+Merging adds counts, so the counts behind depletion, goal and beat-S&P
+probabilities are exact; sketch quantiles match a streaming run to
+floating-point rounding.
+"""
+
+import json
+import os
+import zipfile
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+
+import numpy as np
+
+from . import __version__
+from .engine import (
+    SimulationConfig,
+    SimulationResults,
+    _merge_worker_profiles,
+    _simulate_chunk_task,
+    _silent,
+    accumulate_chunk,
+    iter_chunks,
+    prepare_portfolio,
+)
+from .returns import SEED_BLOCK_SIZE
+from .streaming import PathAccumulator
+
+# Bump when the arrays or meta fields of a shard file change
+SHARD_FORMAT = 1
+
+
+@dataclass
+class Shard:
+    """Partial result of shard ``index`` of ``count``: paths [start, stop) of ``config``'s run.
+
+    ``index`` is 0-based; messages, file names and the CLI number shards from 1.
+    """
+    config: SimulationConfig
+    index: int
+    count: int
+    start: int
+    stop: int
+    key: str
+    accumulator: PathAccumulator
+
+
+def shard_paths(simulations, index, count):
+    """Paths ``(start, stop)`` of shard ``index`` of ``count``, split in whole seed blocks."""
+    n_blocks = -(-simulations // SEED_BLOCK_SIZE)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be between 0 and count - 1 (got {index} of {count})")
+    if count > n_blocks:
+        raise ValueError(f"{count} shards need at least {count * SEED_BLOCK_SIZE:,} simulations "
+                         f"({SEED_BLOCK_SIZE:,}-path seed blocks)")
+    start = index * n_blocks // count * SEED_BLOCK_SIZE
+    stop = min((index + 1) * n_blocks // count * SEED_BLOCK_SIZE, simulations)
+    return start, stop
+
+
+def simulate_shard(config, index, count, prepared=None, log=None, profiler=None):
+    """Simulate shard ``index`` of ``count`` of a seeded ``config`` and return its ``Shard``.
+
+    The shard runs streaming (only sketches and counts are kept), in chunks
+    of ``chunk_size`` paths on ``workers`` processes as ``simulate`` would
+    for a run of the shard's size.
+    """
+    from .cache import cache_key
+    from .profiling import profile_phase
+
+    if config.seed is None:
+        raise ValueError("Shards need a seed, so that every shard simulates part of the same run")
+    config = replace(config, streaming=True)
+    start, stop = shard_paths(config.simulations, index, count)
+    log = log or _silent
+    with profile_phase(profiler, 'setup'):
+        if prepared is None:
+            prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+        key = cache_key(config, prepared)
+
+    # Chunk the shard's paths as simulate() would chunk a run of that size
+    chunk_size = replace(config, simulations=stop - start).effective_chunk_size
+    chunks = [(start + chunk_start, start + chunk_stop)
+              for chunk_start, chunk_stop in iter_chunks(stop - start, chunk_size)]
+    log(f"Shard {index + 1}/{count}: simulating paths {start:,}-{stop - 1:,} "
+        f"of {config.simulations:,} in {len(chunks):,} chunk(s)...")
+    accumulator = PathAccumulator(config.years, config.initial_value, config.inflation_rate)
+    if config.workers > 1 and len(chunks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        child = profiler.child() if profiler is not None else None
+        tasks = [(config, prepared, config.seed, chunk_start, chunk_stop, False, child)
+                 for chunk_start, chunk_stop in chunks]
+        with ProcessPoolExecutor(max_workers=min(config.workers, len(chunks))) as pool:
+            for chunk_accumulator in _merge_worker_profiles(pool.map(_simulate_chunk_task, *zip(*tasks)),
+                                                            profiler):
+                accumulator.merge(chunk_accumulator)
+    else:
+        for chunk_start, chunk_stop in chunks:
+            accumulate_chunk(config, prepared, config.seed, chunk_start, chunk_stop, accumulator, profiler)
+    return Shard(config=config, index=index, count=count, start=start, stop=stop, key=key,
+                 accumulator=accumulator)
+
+
+def write_shard(shard, path):
+    """Write ``shard`` to a compressed ``.npz`` file at ``path`` (replaced atomically)."""
+    path = Path(path)
+    arrays, scalars = shard.accumulator.state()
+    meta = {
+        'format': SHARD_FORMAT,
+        'swr_version': __version__,
+        'index': shard.index,
+        'count': shard.count,
+        'start': shard.start,
+        'stop': shard.stop,
+        'key': shard.key,
+        'config': asdict(shard.config),
+        'accumulator': scalars,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as file:
+        np.savez_compressed(file, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_shard(path):
+    """The ``Shard`` in a ``write_shard`` file."""
+    if not zipfile.is_zipfile(path):
+        raise ValueError(f"{path} is not a shard file")
+    with np.load(path, allow_pickle=False) as data:
+        if 'meta' not in data.files:
+            raise ValueError(f"{path} is not a shard file")
+        meta = json.loads(str(data['meta']))
+        if meta.get('format') != SHARD_FORMAT:
+            raise ValueError(f"{path}: unsupported shard format {meta.get('format')!r} (expected {SHARD_FORMAT})")
+        arrays = {name: data[name] for name in data.files if name != 'meta'}
+    return Shard(config=SimulationConfig(**meta['config']), index=meta['index'], count=meta['count'],
+                 start=meta['start'], stop=meta['stop'], key=meta['key'],
+                 accumulator=PathAccumulator.from_state(arrays, meta['accumulator']))
+
+
+def merge_shards(shards, prepared=None, log=None):
+    """Combine every shard of one run into its ``SimulationResults`` (with metrics).
+
+    Raises ValueError unless the shards come from the same run and cover
+    each index of their count exactly once.
+    """
+    from .metrics import compute_metrics
+
+    log = log or _silent
+    if not shards:
+        raise ValueError("No shards to merge")
+    first = shards[0]
+    if any(shard.key != first.key or shard.count != first.count for shard in shards):
+        raise ValueError("Shards come from different runs (configuration, seed, shard count or swr version differ)")
+    indices = sorted(shard.index for shard in shards)
+    duplicates = sorted({index + 1 for index in indices if indices.count(index) > 1})
+    if duplicates:
+        raise ValueError(f"Shard(s) {', '.join(map(str, duplicates))} of {first.count} given more than once")
+    missing = sorted(set(range(first.count)) - set(indices))
+    if missing:
+        raise ValueError(f"Missing shard(s) {', '.join(str(index + 1) for index in missing)} of {first.count}")
+
+    config = first.config
+    log(f"Merging {first.count} shards of {config.simulations:,} paths...")
+    accumulator = PathAccumulator(config.years, config.initial_value, config.inflation_rate)
+    for shard in sorted(shards, key=lambda shard: shard.index):
+        accumulator.merge(shard.accumulator)
+    if prepared is None:
+        prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+    results = SimulationResults(config=config, portfolio=prepared, accumulator=accumulator, seed=config.seed)
+    log("Calculating performance metrics...")
+    results.metrics = compute_metrics(results)
+    return results
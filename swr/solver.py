@@ -0,0 +1,272 @@
+"""
+Safe-withdrawal-rate solver using common random numbers.
+
+Instead of one full run per candidate rate, each chunk's returns are drawn
+once and every path is bisected on its own withdrawal rate inside the
+rebalancing kernel (the rate is a per-path vector). That
+yields each path's maximum sustainable rate; the highest rate meeting a
+target success level is then an order statistic of those per-path rates,
+with a distribution-free confidence interval from the binomial
+distribution of order statistics.
+
+Bisecting a path assumes it survives every rate below one it survives.
+Strategies whose ``monotone_in_rate`` is False (``guardrails``) are solved
+on a grid of rates instead: every chunk's returns are still drawn once,
+success is counted at each grid rate, and the answer is the highest rate
+whose measured success meets the target, so a run at that rate reproduces
+it.
+"""
+
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Optional
+
+import numpy as np
+
+from .engine import KERNELS, _silent, iter_chunks, prepare_portfolio
+from .metrics import DEPLETION_THRESHOLD
+from .strategies import strategy_for
+
+# Search interval and resolution for the per-path bisection (decimals)
+SWR_SEARCH_LOW = 0.0
+SWR_SEARCH_HIGH = 0.20
+SWR_TOLERANCE = 1e-4
+# Coarse steps of the grid search for strategies not monotone in the rate
+SWR_GRID_STEPS = (0.01, 0.001)
+# Per-path rate of a path that depletes even at SWR_SEARCH_LOW (e.g. on a spending floor alone)
+NO_SUSTAINABLE_RATE = -np.inf
+
+
+@dataclass
+class SafeWithdrawalRate:
+    """Highest withdrawal rate meeting ``target_success``, with its confidence interval.
+
+    Any of the three rates is NO_SUSTAINABLE_RATE when even SWR_SEARCH_LOW
+    misses its success level.
+    """
+    target_success: float
+    rate: float
+    ci_low: float
+    ci_high: float
+
+    @property
+    def at_search_limit(self):
+        """True when the rate is pinned to the top of the search interval."""
+        return self.rate >= SWR_SEARCH_HIGH - SWR_TOLERANCE
+
+    @property
+    def feasible(self):
+        """False when no rate in the search interval meets the target success."""
+        return self.rate >= SWR_SEARCH_LOW
+
+
+@dataclass
+class SWRSolution:
+    """Output of ``solve_safe_withdrawal_rate``.
+
+    ``path_rates`` is None for a grid search, which has no per-path rates;
+    paths that deplete at every rate hold NO_SUSTAINABLE_RATE.
+    """
+    config: 'SimulationConfig'
+    portfolio: 'PreparedPortfolio'
+    path_rates: Optional[np.ndarray]
+    rates: list
+    confidence: float
+    n_evaluations: int
+    seed: int
+
+
+def _bisect_chunk(config, prepared, entropy, start, stop, n_iterations):
+    """Per-path maximum sustainable withdrawal rate for paths [start, stop)."""
+    from .returns import chunk_returns
+
+    n_paths = stop - start
+    multi_asset_returns, _ = chunk_returns(config, prepared, start, stop, entropy)
+    kernel = KERNELS[config.engine]
+    low = np.full(n_paths, SWR_SEARCH_LOW)
+    high = np.full(n_paths, SWR_SEARCH_HIGH)
+
+    # Paths that deplete at the bottom of the interval have no sustainable rate
+    final_values, _, _ = kernel(
+        n_paths, config.years, config.initial_value, low, prepared.weights, multi_asset_returns,
+        strategy=strategy_for(config), floor_pct=config.floor_pct, ceiling_pct=config.ceiling_pct,
+        inflation_rate=config.inflation_rate
+    )
+    unsustainable = final_values < DEPLETION_THRESHOLD
+
+    # Paths that survive the top of the interval are censored there
+    final_values, _, _ = kernel(
+        n_paths, config.years, config.initial_value, high, prepared.weights, multi_asset_returns,
+        strategy=strategy_for(config), floor_pct=config.floor_pct, ceiling_pct=config.ceiling_pct,
+        inflation_rate=config.inflation_rate
+    )
+    survived = final_values >= DEPLETION_THRESHOLD
+    low[survived] = SWR_SEARCH_HIGH
+
+    for _ in range(n_iterations):
+        mid = (low + high) / 2
+        final_values, _, _ = kernel(
+            n_paths, config.years, config.initial_value, mid, prepared.weights, multi_asset_returns,
+            strategy=strategy_for(config), floor_pct=config.floor_pct, ceiling_pct=config.ceiling_pct,
+            inflation_rate=config.inflation_rate
+        )
+        survived = final_values >= DEPLETION_THRESHOLD
+        low = np.where(survived, mid, low)
+        high = np.where(survived, high, mid)
+
+    # ``low`` is the highest rate each path was verified to survive
+    low[unsustainable] = NO_SUSTAINABLE_RATE
+    return low
+
+
+def _failure_chunk(config, prepared, entropy, start, stop, rates):
+    """Number of paths in [start, stop) that deplete at each of ``rates``."""
+    from .returns import chunk_returns
+
+    n_paths = stop - start
+    multi_asset_returns, _ = chunk_returns(config, prepared, start, stop, entropy)
+    kernel = KERNELS[config.engine]
+    failures = np.empty(len(rates), dtype=np.int64)
+    for index, rate in enumerate(rates):
+        final_values, _, _ = kernel(
+            n_paths, config.years, config.initial_value, rate, prepared.weights, multi_asset_returns,
+            strategy=strategy_for(config), floor_pct=config.floor_pct, ceiling_pct=config.ceiling_pct,
+            inflation_rate=config.inflation_rate
+        )
+        failures[index] = np.count_nonzero(final_values < DEPLETION_THRESHOLD)
+    return failures
+
+
+def _count_failures(config, prepared, entropy, chunks, rates):
+    """Depleted paths of the whole run at each of ``rates``, summed over ``chunks``."""
+    tasks = [(config, prepared, entropy, start, stop, rates) for start, stop in chunks]
+    if config.workers > 1 and len(chunks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(config.workers, len(chunks))) as pool:
+            return sum(pool.map(_failure_chunk, *zip(*tasks)))
+    return sum(_failure_chunk(*task) for task in tasks)
+
+
+def _failure_limits(n, target_success, confidence):
+    """Paths allowed to fail at the rate and at the ends of its CI (see ``rate_for_success``)."""
+    k = int(np.floor(n * (1 - target_success) + 1e-9))
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    spread = z * np.sqrt(n * target_success * (1 - target_success))
+    lower = int(np.clip(np.floor(k - spread), 0, n - 1))
+    upper = int(np.clip(np.ceil(k + spread), 0, n - 1))
+    return k, lower, upper
+
+
+def _solve_on_grid(config, prepared, entropy, chunks, targets, confidence):
+    """Rates for ``targets`` from success counted on a grid of rates; returns (rates, n_evaluations).
+
+    Each pass steps through the interval found by the one before at one of
+    SWR_GRID_STEPS and then SWR_TOLERANCE: above the highest rate within
+    each failure limit, up to the next step. Every answer is the highest
+    evaluated rate within its limit, so it never rests on an assumed
+    monotonicity.
+    """
+    n_ticks = int(round((SWR_SEARCH_HIGH - SWR_SEARCH_LOW) / SWR_TOLERANCE))
+    steps = [int(round(step / SWR_TOLERANCE)) for step in SWR_GRID_STEPS] + [1]
+    limits = [_failure_limits(config.simulations, target, confidence) for target in targets]
+
+    failures = {}
+
+    def rate_at(tick):
+        # Rounded so that the solved rate is the decimal a user would type back in
+        return round(SWR_SEARCH_LOW + tick * SWR_TOLERANCE, 10)
+
+    def highest_tick(limit):
+        return max((tick for tick, count in failures.items() if count <= limit), default=None)
+
+    ticks = set(range(0, n_ticks + 1, steps[0]))
+    for previous, step in zip(steps, steps[1:] + [None]):
+        ticks = sorted(ticks.difference(failures))
+        failures.update(zip(ticks, _count_failures(config, prepared, entropy, chunks,
+                                                   [rate_at(tick) for tick in ticks])))
+        if step is None:
+            break
+        ticks = set()
+        for limit in {limit for target_limits in limits for limit in target_limits}:
+            top = highest_tick(limit)
+            if top is not None:
+                ticks.update(range(top + step, min(top + previous, n_ticks + 1), step))
+
+    def highest_rate(limit):
+        top = highest_tick(limit)
+        return NO_SUSTAINABLE_RATE if top is None else rate_at(top)
+
+    rates = [SafeWithdrawalRate(target_success=target, rate=highest_rate(k),
+                                ci_low=highest_rate(lower), ci_high=highest_rate(upper))
+             for target, (k, lower, upper) in zip(targets, limits)]
+    return rates, len(failures)
+
+
+def solve_safe_withdrawal_rate(config, targets=(0.95,), prepared=None, confidence=0.95, log=None):
+    """Highest withdrawal rate with at least each ``targets`` success probability.
+
+    ``config.withdrawal_rate`` is ignored; everything else (portfolio,
+    strategy, horizon, seed, chunking, workers) applies as in ``simulate()``.
+    A path succeeds if it ends above DEPLETION_THRESHOLD. Strategies that
+    ignore the rate (``vpw``, ``rmd``) are rejected. Paths are bisected on
+    their own rate when the strategy is ``monotone_in_rate``; otherwise
+    (``guardrails``) success is counted on a grid of rates, which costs
+    several times more kernel runs. Returns an ``SWRSolution``.
+    """
+    strategy = strategy_for(config)
+    if not strategy.uses_withdrawal_rate:
+        raise ValueError(f"the {config.strategy!r} strategy does not use a withdrawal rate to solve for")
+    log = log or _silent
+    if prepared is None:
+        prepared = prepare_portfolio(config.portfolio, config.additional_fee, config.inflation_rate)
+    entropy = config.seed if config.seed is not None else np.random.SeedSequence().entropy
+    chunks = list(iter_chunks(config.simulations, config.effective_chunk_size))
+
+    if not strategy.monotone_in_rate:
+        log(f"Solving safe withdrawal rate on {config.simulations:,} paths "
+            f"(grid of rates on shared returns; {strategy.name} is not monotone in the rate)...")
+        rates, n_evaluations = _solve_on_grid(config, prepared, entropy, chunks, targets, confidence)
+        return SWRSolution(config=config, portfolio=prepared, path_rates=None, rates=rates,
+                           confidence=confidence, n_evaluations=n_evaluations, seed=entropy)
+
+    n_iterations = int(np.ceil(np.log2((SWR_SEARCH_HIGH - SWR_SEARCH_LOW) / SWR_TOLERANCE)))
+    log(f"Solving safe withdrawal rate on {config.simulations:,} paths "
+        f"({n_iterations + 2} evaluations on shared returns)...")
+    tasks = [(config, prepared, entropy, start, stop, n_iterations) for start, stop in chunks]
+    if config.workers > 1 and len(chunks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(config.workers, len(chunks))) as pool:
+            path_rates = np.concatenate(list(pool.map(_bisect_chunk, *zip(*tasks))))
+    else:
+        path_rates = np.concatenate([_bisect_chunk(*task) for task in tasks])
+
+    return SWRSolution(
+        config=config,
+        portfolio=prepared,
+        path_rates=path_rates,
+        rates=[rate_for_success(path_rates, target, confidence) for target in targets],
+        confidence=confidence,
+        n_evaluations=n_iterations + 2,
+        seed=entropy,
+    )
+
+
+def rate_for_success(path_rates, target_success, confidence=0.95):
+    """Highest rate that at least ``target_success`` of the paths sustain, with a CI.
+
+    The rate is the (floor(n * (1 - target)) + 1)-th smallest per-path rate.
+    The interval brackets that order statistic by the normal approximation
+    to its binomial rank distribution. Where that statistic is a path with
+    NO_SUSTAINABLE_RATE, no rate meets the level.
+    """
+    sorted_rates = np.sort(path_rates)
+    # Number of paths allowed to fail at the solved rate and at the ends of the CI
+    k, lower, upper = _failure_limits(len(sorted_rates), target_success, confidence)
+    return SafeWithdrawalRate(
+        target_success=target_success,
+        rate=float(sorted_rates[min(k, len(sorted_rates) - 1)]),
+        ci_low=float(sorted_rates[lower]),
+        ci_high=float(sorted_rates[upper]),
+    )
@@ -0,0 +1,268 @@
+"""
+Withdrawal strategies: rules that set each year's spending for every path at
+once.
+
+A strategy is a ``WithdrawalStrategy`` whose ``annual_withdrawals(plan,
+year_index, portfolio_values, last_year_spending)`` takes whole per-path
+vectors (the January balances after that month's returns and the previous
+year's spending) and returns the year's withdrawal for every path. The
+kernels call it once per simulated year; the rest of the year, clamping at
+zero and rebalancing are the kernels' business. ``plan`` is the run's
+``WithdrawalPlan``: horizon, starting value, withdrawal rate and dynamic
+bounds (scalars, or per-path arrays on a scenario axis) and inflation.
+
+Built-in rules:
+
+- ``constant``: the initial rate of the starting value, inflation-adjusted.
+- ``dynamic``: Vanguard dynamic spending, the rate of the current balance
+  kept within ``floor_pct`` / ``ceiling_pct`` of last year's real spending.
+- ``guardrails``: Guyton-Klinger. Last year's spending plus inflation, cut
+  by ``adjustment`` when it exceeds the initial rate of the current balance
+  by more than ``band`` (not in the final 15 years), raised by
+  ``adjustment`` when it falls more than ``band`` below.
+- ``vpw``: variable percentage withdrawal, the balance paid out as an
+  annuity at ``real_return`` over the years left.
+- ``rmd``: the balance divided by the years left, like a required minimum
+  distribution with the horizon as life expectancy.
+- ``floor_upside``: the rate of the current balance, but never less than an
+  inflation-adjusted ``floor_rate`` of the starting value.
+
+``vpw`` and ``rmd`` pay out over the years left plus one, so a path that
+earns the expected return still holds a year of spending at the horizon
+instead of running down to exactly zero, which the metrics would count as
+depletion.
+
+Register a subclass under a new name with ``register_strategy``; the name
+is then valid for ``SimulationConfig.strategy``. Worker processes see
+strategies registered at import time of a module they also import.
+"""
+
+from dataclasses import dataclass
+from typing import Union
+
+import numpy as np
+
+# Guyton-Klinger skip the capital preservation cut this close to the horizon
+GUARDRAIL_FINAL_YEARS = 15
+
+
+@dataclass
+class WithdrawalPlan:
+    """Per-run inputs of a withdrawal rule; rates may be per-path arrays."""
+    n_sims: int
+    n_years: int
+    initial_value: float
+    withdrawal_rate: Union[float, np.ndarray]
+    floor_pct: Union[float, np.ndarray]
+    ceiling_pct: Union[float, np.ndarray]
+    inflation_rate: float
+    dtype: np.dtype
+
+    @property
+    def initial_withdrawal(self):
+        return self.initial_value * self.withdrawal_rate
+
+    def years_left(self, year_index):
+        """Years still to be funded, this one included."""
+        return self.n_years - year_index
+
+
+class WithdrawalStrategy:
+    """Base class for withdrawal rules (see the module docstring).
+
+    ``uses_withdrawal_rate`` is False for rules that ignore the rate, which
+    the safe-withdrawal-rate solver cannot search over. ``monotone_in_rate``
+    is False for rules under which a path can survive a higher rate but
+    fail a lower one; the solver then scans a grid of rates instead of
+    bisecting each path.
+    """
+    name = None
+    label = None
+    uses_withdrawal_rate = True
+    monotone_in_rate = True
+
+    @classmethod
+    def from_config(cls, config):
+        """The strategy with its parameters from a ``SimulationConfig``."""
+        return cls()
+
+    def annual_withdrawals(self, plan, year_index, portfolio_values, last_year_spending):
+        """Withdrawals for ``year_index`` (0-based) as a new (n_sims,) array of ``plan.dtype``."""
+        raise NotImplementedError
+
+    def describe(self, config):
+        """Report lines under the "Withdrawal Strategy" heading."""
+        return [f"  - Target Rate: {config.withdrawal_rate:.1%}"]
+
+
+class ConstantDollar(WithdrawalStrategy):
+    name = 'constant'
+    label = 'Constant Dollar (Traditional SWR)'
+
+    def annual_withdrawals(self, plan, year_index, portfolio_values, last_year_spending):
+        annual_withdrawal = plan.initial_withdrawal * ((1 + plan.inflation_rate) ** year_index)
+        return np.full(plan.n_sims, annual_withdrawal, dtype=plan.dtype)
+
+    def describe(self, config):
+        return [
+            f"  - Year 1: ${config.initial_value * config.withdrawal_rate:,.0f} total "
+            f"({config.withdrawal_rate:.1%} of initial)",
+            f"  - Year 2+: Inflation-adjusted ({config.inflation_rate:.1%} annual)",
+            f"  - Monthly: Fixed amount divided by 12",
+        ]
+
+
+class DynamicSpending(WithdrawalStrategy):
+    name = 'dynamic'
+    label = 'Dynamic Spending (Vanguard Method)'
+
+    def annual_withdrawals(self, plan, year_index, portfolio_values, last_year_spending):
+        raw_spending = portfolio_values * plan.withdrawal_rate
+        if year_index == 0:
+            return raw_spending
+        inflation_adjusted_last = last_year_spending * (1 + plan.inflation_rate)
+        floor = inflation_adjusted_last * (1 - plan.floor_pct)
+        ceiling = inflation_adjusted_last * (1 + plan.ceiling_pct)
+        return np.where(raw_spending < floor, floor, np.where(raw_spending > ceiling, ceiling, raw_spending))
+
+    def describe(self, config):
+        return [
+            f"  - Target Rate: {config.withdrawal_rate:.1%} of portfolio balance",
+            f"  - Floor: -{config.floor_pct:.1%} below inflation-adjusted prior year",
+            f"  - Ceiling: +{config.ceiling_pct:.1%} above inflation-adjusted prior year",
+            f"  - Adjusts annually based on portfolio performance",
+        ]
+
+
+class Guardrails(WithdrawalStrategy):
+    name = 'guardrails'
+    label = 'Guyton-Klinger Guardrails'
+    # The guardrails move with the rate, so cuts and raises fall in different years
+    monotone_in_rate = False
+
+    def __init__(self, band=0.20, adjustment=0.10):
+        self.band = band
+        self.adjustment = adjustment
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(band=config.guardrail_band, adjustment=config.guardrail_adjustment)
+
+    def annual_withdrawals(self, plan, year_index, portfolio_values, last_year_spending):
+        if year_index == 0:
+            return np.full(plan.n_sims, plan.initial_withdrawal, dtype=plan.dtype)
+        proposed = last_year_spending * (1 + plan.inflation_rate)
+        # Compare spending with the guardrail rates of the balance (no division by depleted balances)
+        upper = portfolio_values * (plan.withdrawal_rate * (1 + self.band))
+        lower = portfolio_values * (plan.withdrawal_rate * (1 - self.band))
+        factor = np.where(proposed < lower, 1 + self.adjustment, 1.0)
+        if plan.years_left(year_index) > GUARDRAIL_FINAL_YEARS:
+            factor = np.where(proposed > upper, 1 - self.adjustment, factor)
+        return (proposed * factor).astype(plan.dtype, copy=False)
+
+    def describe(self, config):
+        return [
+            f"  - Year 1: ${config.initial_value * config.withdrawal_rate:,.0f} "
+            f"({config.withdrawal_rate:.1%} of initial), then inflation-adjusted",
+            f"  - Cut {self.adjustment:.0%} when spending exceeds {config.withdrawal_rate * (1 + self.band):.2%} "
+            f"of the balance (until the last {GUARDRAIL_FINAL_YEARS} years)",
+            f"  - Raise {self.adjustment:.0%} when spending falls below "
+            f"{config.withdrawal_rate * (1 - self.band):.2%} of the balance",
+        ]
+
+
+def annuity_rate(real_return, n_years):
+    """Fraction of a balance paid out each year to spend it over ``n_years`` at ``real_return``."""
+    if real_return == 0:
+        return 1 / n_years
+    return real_return / (1 - (1 + real_return) ** -n_years)
+
+
+class VariablePercentage(WithdrawalStrategy):
+    name = 'vpw'
+    label = 'Variable Percentage Withdrawal (VPW)'
+    uses_withdrawal_rate = False
+
+    def __init__(self, real_return=0.04):
+        self.real_return = real_return
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(real_return=config.vpw_return)
+
+    def annual_withdrawals(self, plan, year_index, portfolio_values, last_year_spending):
+        return portfolio_values * annuity_rate(self.real_return, plan.years_left(year_index) + 1)
+
+    def describe(self, config):
+        return [
+            f"  - Year 1: {annuity_rate(self.real_return, config.years + 1):.2%} of portfolio balance",
+            f"  - Each year: the balance as an annuity at {self.real_return:.1%} real over the years left",
+        ]
+
+
+class RequiredMinimumDistribution(WithdrawalStrategy):
+    name = 'rmd'
+    label = 'RMD-Style (balance / years left)'
+    uses_withdrawal_rate = False
+
+    def annual_withdrawals(self, plan, year_index, portfolio_values, last_year_spending):
+        return portfolio_values / (plan.years_left(year_index) + 1)
+
+    def describe(self, config):
+        return [
+            f"  - Year 1: {1 / (config.years + 1):.2%} of portfolio balance",
+            f"  - Each year: the balance divided by the years left plus one",
+        ]
+
+
+class FloorAndUpside(WithdrawalStrategy):
+    name = 'floor_upside'
+    label = 'Floor and Upside'
+
+    def __init__(self, floor_rate=0.03):
+        self.floor_rate = floor_rate
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(floor_rate=config.spending_floor)
+
+    def annual_withdrawals(self, plan, year_index, portfolio_values, last_year_spending):
+        floor = plan.initial_value * self.floor_rate * ((1 + plan.inflation_rate) ** year_index)
+        return np.maximum(portfolio_values * plan.withdrawal_rate, floor).astype(plan.dtype, copy=False)
+
+    def describe(self, config):
+        return [
+            f"  - Target Rate: {config.withdrawal_rate:.1%} of portfolio balance",
+            f"  - Floor: ${config.initial_value * self.floor_rate:,.0f} ({self.floor_rate:.1%} of initial), "
+            f"inflation-adjusted",
+        ]
+
+
+STRATEGIES = {}
+
+
+def register_strategy(strategy_class):
+    """Make a ``WithdrawalStrategy`` subclass available under its ``name``; returns the class."""
+    if not strategy_class.name:
+        raise ValueError("a withdrawal strategy needs a name")
+    STRATEGIES[strategy_class.name] = strategy_class
+    return strategy_class
+
+
+for _strategy in (ConstantDollar, DynamicSpending, Guardrails, VariablePercentage,
+                  RequiredMinimumDistribution, FloorAndUpside):
+    register_strategy(_strategy)
+
+
+def get_strategy(strategy):
+    """A ``WithdrawalStrategy`` instance: ``strategy`` itself, or the registered name with default parameters."""
+    if isinstance(strategy, WithdrawalStrategy):
+        return strategy
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown withdrawal strategy {strategy!r} (choose from {', '.join(STRATEGIES)})")
+    return STRATEGIES[strategy]()
+
+
+def strategy_for(config):
+    """The ``WithdrawalStrategy`` of a ``SimulationConfig``, with its parameters."""
+    return STRATEGIES[config.strategy].from_config(config)
@@ -0,0 +1,241 @@
+"""
+Streaming statistics: mergeable quantile sketches and the per-path running
+state needed to report a run without keeping any path history.
+
+``StreamingRecorder`` plugs into ``run_simulation_with_rebalancing`` as its
+``recorder``: every year-end is folded into per-year sketches while only
+O(paths) running state (peak value, max drawdown, failure year) is kept.
+At the end of a chunk the running state is folded into a ``PathAccumulator``,
+which merges across chunks and worker processes by adding counts.
+"""
+
+import numpy as np
+
+from .metrics import DEPLETION_THRESHOLD, GOALS, RISK_FREE_RATE
+
+# Dollar buckets grow by (1 + a) / (1 - a); quantiles fall inside one bucket,
+# i.e. within about 2a (0.2%) of the exact value
+DEFAULT_RELATIVE_ACCURACY = 0.001
+# Dollar range covered by the log buckets; values below go to a zero bucket,
+# values above are counted in the top bucket
+SKETCH_MIN_VALUE = 1.0
+SKETCH_MAX_VALUE = 1e15
+# Bucket width for drawdown fractions in [0, 1]
+DRAWDOWN_RESOLUTION = 1e-4
+
+
+class _BucketSketch:
+    """Rows of bucketed counts and sums; subclasses choose the bucket mapping.
+
+    Each row is an independent sketch (e.g. one per simulated year). Keeping
+    the sum of values per bucket lets a quantile return the mean of the
+    values in its bucket, which is exact whenever those values are equal
+    (e.g. constant-dollar withdrawals) and otherwise within the bucket width.
+    """
+
+    def __init__(self, n_rows, n_buckets):
+        self.counts = np.zeros((n_rows, n_buckets), dtype=np.int64)
+        self.sums = np.zeros((n_rows, n_buckets), dtype=np.float64)
+
+    def add(self, row, values):
+        """Add an array of values to sketch ``row``."""
+        buckets = self._buckets(values)
+        n_buckets = self.counts.shape[1]
+        self.counts[row] += np.bincount(buckets, minlength=n_buckets)
+        self.sums[row] += np.bincount(buckets, weights=values, minlength=n_buckets)
+
+    def merge(self, other):
+        """Add another sketch with identical parameters into this one."""
+        if self.counts.shape != other.counts.shape:
+            raise ValueError("cannot merge sketches with different shapes")
+        self.counts += other.counts
+        self.sums += other.sums
+        return self
+
+    def count(self, row=0):
+        return int(self.counts[row].sum())
+
+    def mean(self, row=0):
+        return self.sums[row].sum() / self.counts[row].sum()
+
+    def quantiles(self, percentiles, row=0):
+        """Percentiles (0-100) of sketch ``row`` with ``np.percentile``'s linear interpolation."""
+        counts = self.counts[row]
+        cumulative = np.cumsum(counts)
+        n = cumulative[-1]
+        ranks = np.asarray(percentiles, dtype=np.float64) / 100 * (n - 1)
+        lower = np.floor(ranks)
+        values_lo = self._rank_values(lower, cumulative, row)
+        values_hi = self._rank_values(np.minimum(lower + 1, n - 1), cumulative, row)
+        return values_lo + (ranks - lower) * (values_hi - values_lo)
+
+    def quantile_rows(self, percentile):
+        """One percentile for every row."""
+        return np.array([self.quantiles([percentile], row)[0] for row in range(self.counts.shape[0])])
+
+    def _rank_values(self, ranks, cumulative, row):
+        buckets = np.searchsorted(cumulative, ranks, side='right')
+        return self.sums[row, buckets] / self.counts[row, buckets]
+
+
+class QuantileSketch(_BucketSketch):
+    """Log-bucketed sketch for non-negative dollar amounts.
+
+    Buckets grow geometrically by gamma = (1 + a) / (1 - a), so every
+    quantile in [SKETCH_MIN_VALUE, SKETCH_MAX_VALUE] is within one bucket
+    (relative error below 2a); amounts below SKETCH_MIN_VALUE (depleted
+    portfolios) share bucket 0.
+    """
+
+    def __init__(self, n_rows=1, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.log_gamma = np.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        n_buckets = int(np.ceil(np.log(SKETCH_MAX_VALUE / SKETCH_MIN_VALUE) / self.log_gamma)) + 2
+        super().__init__(n_rows, n_buckets)
+
+    def _buckets(self, values):
+        with np.errstate(divide='ignore'):
+            scaled = np.log(np.maximum(values, SKETCH_MIN_VALUE) / SKETCH_MIN_VALUE) / self.log_gamma
+        buckets = np.ceil(scaled).astype(np.intp) + 1
+        buckets[values < SKETCH_MIN_VALUE] = 0
+        return np.minimum(buckets, self.counts.shape[1] - 1)
+
+
+class LinearSketch(_BucketSketch):
+    """Fixed-width buckets over [0, 1], for drawdown fractions."""
+
+    def __init__(self, n_rows=1, resolution=DRAWDOWN_RESOLUTION):
+        self.resolution = resolution
+        super().__init__(n_rows, int(round(1 / resolution)) + 1)
+
+    def _buckets(self, values):
+        buckets = np.floor(values / self.resolution).astype(np.intp)
+        return np.clip(buckets, 0, self.counts.shape[1] - 1)
+
+
+class PathAccumulator:
+    """Mergeable summary of any number of simulated paths.
+
+    Holds everything ``metrics_from_accumulator`` needs: per-year value and
+    withdrawal sketches, drawdown sketches, a failure-year histogram and the
+    exact counts and moments behind depletion, goal, beat-S&P, Sharpe and
+    Sortino figures. Memory does not depend on the number of paths.
+    """
+
+    def __init__(self, n_years, initial_value, inflation_rate):
+        self.n_years = n_years
+        self.initial_value = initial_value
+        self.inflation_rate = inflation_rate
+        self.n_paths = 0
+        self.values = QuantileSketch(n_years + 1)
+        self.withdrawals = QuantileSketch(n_years)
+        self.sp500_final = QuantileSketch(1)
+        self.max_drawdowns = LinearSketch(1)
+        self.sp500_max_drawdowns = LinearSketch(1)
+        # failure_year_counts[y] = paths first below the threshold at year-end y
+        # (index n_years + 1 counts paths that never deplete)
+        self.failure_year_counts = np.zeros(n_years + 2, dtype=np.int64)
+        self.n_depleted_final = 0
+        self.n_beat_sp500_nominal = 0
+        self.n_beat_sp500_real = 0
+        self.goal_counts = {goal: 0 for goal in GOALS}
+        self.return_sum = 0.0
+        self.return_sq_sum = 0.0
+        self.downside_sq_sum = 0.0
+
+    def add_paths(self, final_values, final_sp500_values, max_drawdowns, sp500_max_drawdowns, failure_years):
+        """Fold the per-path end state of one chunk into the summary."""
+        inflation_adjustor = (1 + self.inflation_rate) ** self.n_years
+        self.n_paths += len(final_values)
+        self.sp500_final.add(0, final_sp500_values)
+        self.max_drawdowns.add(0, max_drawdowns)
+        self.sp500_max_drawdowns.add(0, sp500_max_drawdowns)
+        self.failure_year_counts += np.bincount(failure_years, minlength=self.n_years + 2)
+        self.n_depleted_final += int(np.sum(final_values < DEPLETION_THRESHOLD))
+        self.n_beat_sp500_nominal += int(np.sum(final_values > final_sp500_values))
+        self.n_beat_sp500_real += int(np.sum(final_values / inflation_adjustor > final_sp500_values / inflation_adjustor))
+        for goal in GOALS:
+            self.goal_counts[goal] += int(np.sum(final_values >= goal))
+
+        annual_returns = (final_values / self.initial_value) ** (1/self.n_years) - 1
+        downside_returns = np.minimum(annual_returns - RISK_FREE_RATE, 0)
+        self.return_sum += annual_returns.sum()
+        self.return_sq_sum += (annual_returns ** 2).sum()
+        self.downside_sq_sum += (downside_returns ** 2).sum()
+
+    def merge(self, other):
+        """Add another accumulator for the same run parameters into this one."""
+        for name in ('values', 'withdrawals', 'sp500_final', 'max_drawdowns', 'sp500_max_drawdowns'):
+            getattr(self, name).merge(getattr(other, name))
+        self.failure_year_counts += other.failure_year_counts
+        for name in ('n_paths', 'n_depleted_final', 'n_beat_sp500_nominal', 'n_beat_sp500_real',
+                     'return_sum', 'return_sq_sum', 'downside_sq_sum'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for goal in GOALS:
+            self.goal_counts[goal] += other.goal_counts[goal]
+        return self
+
+    def state(self):
+        """``(arrays, scalars)``: the summary as named arrays and JSON-serialisable scalars."""
+        arrays = {'failure_year_counts': self.failure_year_counts}
+        for name in _SKETCH_NAMES:
+            sketch = getattr(self, name)
+            arrays[f'{name}.counts'] = sketch.counts
+            arrays[f'{name}.sums'] = sketch.sums
+        scalars = {name: getattr(self, name) for name in _SCALAR_NAMES}
+        scalars['goal_counts'] = {str(goal): count for goal, count in self.goal_counts.items()}
+        return arrays, scalars
+
+    @classmethod
+    def from_state(cls, arrays, scalars):
+        """Rebuild an accumulator from ``state()``, exactly."""
+        accumulator = cls(scalars['n_years'], scalars['initial_value'], scalars['inflation_rate'])
+        for name in _SKETCH_NAMES:
+            sketch = getattr(accumulator, name)
+            if arrays[f'{name}.counts'].shape != sketch.counts.shape:
+                raise ValueError(f"{name} sketch has shape {arrays[f'{name}.counts'].shape}, "
+                                 f"expected {sketch.counts.shape}")
+            sketch.counts = np.array(arrays[f'{name}.counts'], dtype=np.int64)
+            sketch.sums = np.array(arrays[f'{name}.sums'], dtype=np.float64)
+        accumulator.failure_year_counts = np.array(arrays['failure_year_counts'], dtype=np.int64)
+        for name in _SCALAR_NAMES[3:]:
+            setattr(accumulator, name, scalars[name])
+        accumulator.goal_counts = {goal: scalars['goal_counts'][str(goal)] for goal in GOALS}
+        return accumulator
+
+
+_SKETCH_NAMES = ('values', 'withdrawals', 'sp500_final', 'max_drawdowns', 'sp500_max_drawdowns')
+# Constructor arguments first, then the running totals
+_SCALAR_NAMES = ('n_years', 'initial_value', 'inflation_rate', 'n_paths', 'n_depleted_final',
+                 'n_beat_sp500_nominal', 'n_beat_sp500_real', 'return_sum', 'return_sq_sum', 'downside_sq_sum')
+
+
+class DrawdownRecorder:
+    """Recorder that tracks only each path's running peak and max drawdown."""
+
+    def __init__(self, n_sims, initial_value):
+        self.running_max = np.full(n_sims, initial_value, dtype=np.float64)
+        self.max_drawdowns = np.zeros(n_sims, dtype=np.float64)
+
+    def record_year(self, year_index, portfolio_values, withdrawals):
+        self.running_max = np.maximum(self.running_max, portfolio_values)
+        drawdown = (self.running_max - portfolio_values) / np.where(self.running_max == 0, 1, self.running_max)
+        self.max_drawdowns = np.maximum(self.max_drawdowns, drawdown)
+
+
+class StreamingRecorder(DrawdownRecorder):
+    """Recorder that folds each year-end straight into a ``PathAccumulator``'s sketches."""
+
+    def __init__(self, accumulator, n_sims):
+        super().__init__(n_sims, accumulator.initial_value)
+        self.accumulator = accumulator
+        n_years = accumulator.n_years
+        initial = np.full(n_sims, accumulator.initial_value, dtype=np.float64)
+        accumulator.values.add(0, initial)
+        self.failure_years = np.where(initial < DEPLETION_THRESHOLD, 0, n_years + 1)
+
+    def record_year(self, year_index, portfolio_values, withdrawals):
+        super().record_year(year_index, portfolio_values, withdrawals)
+        self.accumulator.values.add(year_index + 1, portfolio_values)
+        self.accumulator.withdrawals.add(year_index, withdrawals)
+        newly_depleted = (portfolio_values < DEPLETION_THRESHOLD) & (self.failure_years > self.accumulator.n_years)
+        self.failure_years[newly_depleted] = year_index + 1
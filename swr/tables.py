@@ -0,0 +1,109 @@
+"""
+Plain-Python tables for the console report and CSV export.
+
+A ``Table`` holds named columns of equal length (lists or NumPy arrays) and
+covers what the report needs from a DataFrame: right-aligned ``to_string``
+with per-column formatters, ``head``/``tail``, column selection and
+``to_csv``. It keeps pandas out of the default CLI path, where importing it
+costs more than a small simulation. ``to_pandas`` converts when a caller
+wants a DataFrame (and for Parquet export).
+
+CSV output matches ``DataFrame.to_csv(index=False)``: NumPy scalars are
+written with ``str`` (shortest round-trip digits), missing floats as empty
+fields.
+"""
+
+import csv
+import math
+from numbers import Integral, Real
+
+
+def _is_float(value):
+    """True for Python and NumPy floats (not ints or bools)."""
+    return isinstance(value, Real) and not isinstance(value, Integral)
+
+
+def _csv_cell(value):
+    if value is None or (_is_float(value) and math.isnan(value)):
+        return ''
+    return str(value)
+
+
+class Table:
+    """Named columns of equal length, in order."""
+
+    def __init__(self, columns):
+        self._columns = dict(columns)
+        lengths = {len(values) for values in self._columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"table columns differ in length: {sorted(lengths)}")
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Table from a list of dicts sharing the first row's keys."""
+        names = list(rows[0]) if rows else []
+        return cls({name: [row[name] for row in rows] for name in names})
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, key):
+        """A column's values, or a ``Table`` of a list of column names."""
+        if isinstance(key, str):
+            return self._columns[key]
+        return Table({name: self._columns[name] for name in key})
+
+    def items(self):
+        return self._columns.items()
+
+    def _rows(self, rows):
+        return Table({name: values[rows] for name, values in self._columns.items()})
+
+    def head(self, n=5):
+        return self._rows(slice(0, n))
+
+    def tail(self, n=5):
+        return self._rows(slice(max(self._length - n, 0), self._length))
+
+    def to_string(self, float_format=None, formatters=None):
+        """Right-aligned text with a header row, like ``DataFrame.to_string(index=False)``.
+
+        ``formatters`` maps column names to a function of one value;
+        ``float_format`` formats float values of the other columns.
+        """
+        formatters = formatters or {}
+        text_columns = []
+        for name, values in self._columns.items():
+            formatter = formatters.get(name)
+            # Like pandas, numeric columns without a formatter keep a sign column in the header
+            numeric = formatter is None and len(values) and isinstance(values[0], Real)
+            cells = [f' {name}' if numeric else name]
+            for value in values:
+                if formatter is not None:
+                    cells.append(formatter(value))
+                elif float_format is not None and _is_float(value):
+                    cells.append(float_format(value))
+                else:
+                    cells.append(str(value))
+            width = max(len(cell) for cell in cells)
+            text_columns.append([cell.rjust(width) for cell in cells])
+        return '\n'.join(' '.join(row) for row in zip(*text_columns))
+
+    def to_csv(self, path):
+        """Write a header row and one row per record to ``path``."""
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file, lineterminator='\n')
+            writer.writerow(self._columns)
+            for row in zip(*self._columns.values()):
+                writer.writerow([_csv_cell(value) for value in row])
+
+    def to_pandas(self):
+        """The table as a pandas DataFrame."""
+        import pandas as pd
+
+        return pd.DataFrame(self._columns)
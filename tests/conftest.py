@@ -0,0 +1,53 @@
+"""Comparisons of ``SimulationResults`` shared by the reproducibility tests."""
+
+from dataclasses import fields
+
+import numpy as np
+import pytest
+
+from swr.checkpoint import CHUNK_ARRAYS
+from swr.metrics import SimulationMetrics
+
+
+def _same(a, b, exact):
+    """Whether two metric values (scalars, arrays or dicts of them) are equal, NaN matching NaN."""
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(a[key], b[key], exact) for key in a)
+    if a is None or b is None:
+        return a is b
+    if exact:
+        return np.array_equal(a, b, equal_nan=True)
+    return np.allclose(a, b, rtol=1e-9, atol=0, equal_nan=True)
+
+
+def _assert_same_metrics(expected, actual, exact=True):
+    different = [field.name for field in fields(SimulationMetrics)
+                 if not _same(getattr(expected, field.name), getattr(actual, field.name), exact)]
+    assert not different, f"metrics differ: {', '.join(different)}"
+
+
+def _assert_same_results(expected, actual):
+    """Bit-identical per-path arrays, streaming summaries and metrics."""
+    for name in CHUNK_ARRAYS:
+        a, b = getattr(expected, name), getattr(actual, name)
+        assert (a is None) == (b is None), f"{name}: present in only one run"
+        if a is not None:
+            assert np.array_equal(a, b), f"{name} differs"
+    assert (expected.accumulator is None) == (actual.accumulator is None)
+    if expected.accumulator is not None:
+        (arrays, scalars), (other_arrays, other_scalars) = expected.accumulator.state(), actual.accumulator.state()
+        assert scalars == other_scalars
+        assert arrays.keys() == other_arrays.keys()
+        for name in arrays:
+            assert np.array_equal(arrays[name], other_arrays[name]), f"accumulator {name} differs"
+    _assert_same_metrics(expected.metrics, actual.metrics)
+
+
+@pytest.fixture
+def assert_same_results():
+    return _assert_same_results
+
+
+@pytest.fixture
+def assert_same_metrics():
+    return _assert_same_metrics
@@ -0,0 +1,62 @@
+"""
+A run interrupted after some chunks and resumed from its checkpoint gives
+results bit-identical to an uninterrupted run, streaming or not, on one or
+several workers.
+"""
+
+from dataclasses import replace
+
+import pytest
+
+from swr.checkpoint import Checkpoint
+from swr.engine import SimulationConfig, simulate
+
+CONFIG = SimulationConfig(portfolio=2, simulations=4_000, years=15, seed=11, chunk_size=1_000)
+INTERRUPT_AFTER = 2
+
+
+class Preempted(Exception):
+    pass
+
+
+class InterruptedCheckpoint(Checkpoint):
+    """A checkpoint whose run is preempted once ``after`` chunks are saved."""
+
+    def __init__(self, directory, after):
+        super().__init__(directory)
+        self.after = after
+        self.saved = 0
+
+    def _saved_one(self):
+        self.saved += 1
+        if self.saved == self.after:
+            raise Preempted
+
+    def save_chunk(self, index, chunk):
+        super().save_chunk(index, chunk)
+        self._saved_one()
+
+    def save_accumulator(self, accumulator, n_chunks):
+        super().save_accumulator(accumulator, n_chunks)
+        self._saved_one()
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+@pytest.mark.parametrize('workers', [1, 2])
+def test_resume_matches_uninterrupted_run(tmp_path, assert_same_results, streaming, workers):
+    config = replace(CONFIG, streaming=streaming, workers=workers)
+    with pytest.raises(Preempted):
+        simulate(config, checkpoint=InterruptedCheckpoint(tmp_path, INTERRUPT_AFTER))
+
+    checkpoint = Checkpoint(tmp_path, resume=True)
+    if not streaming:
+        assert checkpoint.completed_chunks() == list(range(INTERRUPT_AFTER))
+    resumed = simulate(config, checkpoint=checkpoint)
+    assert_same_results(simulate(config), resumed)
+
+
+def test_resume_refuses_a_different_run(tmp_path):
+    with pytest.raises(Preempted):
+        simulate(CONFIG, checkpoint=InterruptedCheckpoint(tmp_path, INTERRUPT_AFTER))
+    with pytest.raises(ValueError, match='different run'):
+        simulate(replace(CONFIG, withdrawal_rate=0.05), checkpoint=Checkpoint(tmp_path, resume=True))
@@ -0,0 +1,56 @@
+"""
+A seeded run gives the same paths for any chunk size or worker count, and
+the shards of a run merge into its streaming result.
+"""
+
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from swr.engine import SimulationConfig, simulate
+from swr.shards import merge_shards, read_shard, simulate_shard, write_shard
+
+CONFIG = SimulationConfig(portfolio=2, simulations=3_500, years=15, seed=5, chunk_size=1_000)
+
+
+@pytest.mark.parametrize('changes', [
+    {'chunk_size': 700},
+    {'chunk_size': 2_500},
+    {'workers': 2},
+    {'workers': 3, 'chunk_size': 500},
+], ids=lambda changes: ','.join(f'{name}={value}' for name, value in changes.items()))
+def test_chunking_and_workers_do_not_change_results(assert_same_results, changes):
+    assert_same_results(simulate(CONFIG), simulate(replace(CONFIG, **changes)))
+
+
+def test_streaming_chunking_keeps_counts_exact(assert_same_metrics):
+    # Sketch sums add up in a different order, so only the counts are exact
+    config = replace(CONFIG, streaming=True)
+    expected, actual = simulate(config), simulate(replace(config, chunk_size=700, workers=2))
+    (arrays, scalars), (other_arrays, other_scalars) = expected.accumulator.state(), actual.accumulator.state()
+    for name in arrays:
+        if not name.endswith('.sums'):
+            assert np.array_equal(arrays[name], other_arrays[name]), f"accumulator {name} differs"
+    assert scalars['n_depleted_final'] == other_scalars['n_depleted_final']
+    assert scalars['goal_counts'] == other_scalars['goal_counts']
+    assert_same_metrics(expected.metrics, actual.metrics, exact=False)
+
+
+def test_merged_shards_match_a_streaming_run(tmp_path, assert_same_metrics):
+    count = 3
+    paths = [write_shard(simulate_shard(CONFIG, index, count), tmp_path / f'shard_{index}.npz')
+             for index in range(count)]
+    merged = merge_shards([read_shard(path) for path in reversed(paths)])
+    streaming = simulate(replace(CONFIG, streaming=True))
+
+    assert merged.metrics.n_depleted == streaming.metrics.n_depleted
+    assert merged.metrics.prob_depletion == streaming.metrics.prob_depletion
+    assert merged.metrics.goal_probabilities == streaming.metrics.goal_probabilities
+    assert_same_metrics(streaming.metrics, merged.metrics, exact=False)
+
+
+def test_merge_refuses_an_incomplete_set(tmp_path):
+    shards = [simulate_shard(CONFIG, index, 3) for index in (0, 2)]
+    with pytest.raises(ValueError, match='Missing shard'):
+        merge_shards(shards)
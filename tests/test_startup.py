@@ -0,0 +1,44 @@
+"""
+CLI startup budgets: ``--list-portfolios`` and a 1,000-path run, each in a
+fresh interpreter, must finish within their wall-time budgets without
+importing pandas, SciPy or pyarrow.
+
+    python -m pytest tests/test_startup.py
+
+``SWR_STARTUP_BUDGET_SCALE=2`` doubles the budgets on a slow machine (as
+``python -m swr.benchmark startup --budget-scale 2`` does).
+"""
+
+import os
+
+import pytest
+
+from swr.benchmark import HEAVY_MODULES, STARTUP_COMMANDS, check_startup
+
+BUDGET_SCALE = float(os.environ.get('SWR_STARTUP_BUDGET_SCALE', '1'))
+
+
+@pytest.fixture(scope='module')
+def startup_results():
+    return {result['name']: result for result in check_startup(scale=BUDGET_SCALE)}
+
+
+@pytest.mark.parametrize('name', list(STARTUP_COMMANDS))
+def test_command_succeeds(startup_results, name):
+    result = startup_results[name]
+    assert result['returncode'] == 0, result['error']
+
+
+@pytest.mark.parametrize('name', list(STARTUP_COMMANDS))
+def test_within_budget(startup_results, name):
+    result = startup_results[name]
+    assert result['seconds'] <= result['budget'], (
+        f"{name} took {result['seconds']:.3f} s (fastest run), budget {result['budget']:.3f} s")
+
+
+@pytest.mark.parametrize('name', list(STARTUP_COMMANDS))
+def test_no_heavy_imports(startup_results, name):
+    result = startup_results[name]
+    assert not result['heavy_modules'], (
+        f"{name} imported {', '.join(result['heavy_modules'])} (none of {', '.join(HEAVY_MODULES)} allowed)")
+